@@ -12,16 +12,38 @@ except Exception:
 
 try:
     from .gemini_image_node import GeminiImageGenerator as GeminiImageGeneratorV1  # type: ignore
+    from .gemini_session_node import GeminiChatSession as GeminiChatSessionV1  # type: ignore
+    from .gemini_bulk_node import GeminiBulkGenerator as GeminiBulkGeneratorV1  # type: ignore
+    from .gemini_sweep_node import GeminiPromptSweep as GeminiPromptSweepV1  # type: ignore
+    from .gemini_batch_node import GeminiBatchCollect as GeminiBatchCollectV1  # type: ignore
+    from .gemini_batch_node import GeminiBatchSubmit as GeminiBatchSubmitV1  # type: ignore
     NODE_CLASS_MAPPINGS = {
         "Gemini Image Generator (Custom API)": GeminiImageGeneratorV1,
+        "Gemini Chat Session (Custom API)": GeminiChatSessionV1,
+        "Gemini Bulk Generator (Custom API)": GeminiBulkGeneratorV1,
+        "Gemini Prompt Sweep (Custom API)": GeminiPromptSweepV1,
+        "Gemini Batch Submit (Custom API)": GeminiBatchSubmitV1,
+        "Gemini Batch Collect (Custom API)": GeminiBatchCollectV1,
     }
     NODE_DISPLAY_NAME_MAPPINGS = {
         "Gemini Image Generator (Custom API)": "Gemini Image Generator (Custom API)",
+        "Gemini Chat Session (Custom API)": "Gemini Chat Session (Custom API)",
+        "Gemini Bulk Generator (Custom API)": "Gemini Bulk Generator (Custom API)",
+        "Gemini Prompt Sweep (Custom API)": "Gemini Prompt Sweep (Custom API)",
+        "Gemini Batch Submit (Custom API)": "Gemini Batch Submit (Custom API)",
+        "Gemini Batch Collect (Custom API)": "Gemini Batch Collect (Custom API)",
     }
 except Exception:
     NODE_CLASS_MAPPINGS = {}
     NODE_DISPLAY_NAME_MAPPINGS = {}
 
+# Prometheus-format metrics at GET /gemini/metrics when loaded by the ComfyUI server
+try:
+    from .metrics import register_route as _register_metrics_route
+    _register_metrics_route()
+except Exception:
+    pass
+
 __all__ = [name for name in [
     "GeminiExtension",
     "comfy_entrypoint",
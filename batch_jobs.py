@@ -0,0 +1,147 @@
+"""Gemini Batch API jobs for large, non-interactive workloads.
+
+Instead of one synchronous ``generate_content`` call per image, many
+requests are packaged inline into one ``client.batches`` job, which Google
+runs asynchronously at batch pricing and outside the per-minute limits. The
+submit node returns a job handle right away; the collect node polls the job
+with backoff (awaiting, not blocking, on the V3 node) and decodes every
+returned inline image into one IMAGE batch.
+
+Inline jobs are limited to about 20 MB of requests; larger reference sets
+belong in the bulk node instead.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from .cancellation import POLL_SECONDS, check_interrupted
+from .response_parts import ResponseParts
+from .scheduler import get_scheduler
+
+BATCH_JOB_TYPE = "GEMINI_BATCH_JOB"
+DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+DEFAULT_POLL_SECONDS = 10.0
+MAX_POLL_SECONDS = 300.0
+
+
+@dataclass(frozen=True)
+class BatchJobHandle:
+    name: str
+    model: str
+    count: int
+    # Kept out of repr so the key never lands in logs
+    api_key: str = field(default="", repr=False)
+
+
+def state_name(job) -> str:
+    state = getattr(job, "state", None)
+    return getattr(state, "name", None) or str(state or "JOB_STATE_UNSPECIFIED")
+
+
+def is_done(job) -> bool:
+    return state_name(job) in DONE_STATES
+
+
+def build_requests(prompts: list[str], references, response_modalities: str, aspect_ratio: str) -> list[dict]:
+    """Inline request dicts for ``batches.create``; ``references`` (EncodedImage) go with every prompt."""
+    modalities = ["IMAGE"] if response_modalities == "Image" else ["TEXT", "IMAGE"]
+    image_parts = [{"inline_data": {"data": ref.data, "mime_type": ref.mime_type}} for ref in references]
+    return [
+        {
+            "contents": [{"role": "user", "parts": [{"text": prompt}] + image_parts}],
+            "config": {"response_modalities": modalities, "image_config": {"aspect_ratio": aspect_ratio}},
+        }
+        for prompt in prompts
+    ]
+
+
+def submit(client, model: str, requests: list[dict], display_name: str = ""):
+    """Create the batch job; the scheduler retries transient failures of the create call."""
+    config = {"display_name": display_name} if display_name else None
+    return get_scheduler().call(lambda: client.batches.create(model=model, src=requests, config=config))
+
+
+async def asubmit(client, model: str, requests: list[dict], display_name: str = ""):
+    config = {"display_name": display_name} if display_name else None
+    return await get_scheduler().acall(lambda: client.aio.batches.create(model=model, src=requests, config=config))
+
+
+def _next_interval(interval: float) -> float:
+    return min(MAX_POLL_SECONDS, interval * 1.5)
+
+
+def _pause(seconds: float) -> None:
+    """Sleep between polls in short slices so Interrupt stops the wait at once."""
+    end = time.monotonic() + seconds
+    while (left := end - time.monotonic()) > 0:
+        check_interrupted()
+        time.sleep(min(POLL_SECONDS, left))
+    check_interrupted()
+
+
+async def _apause(seconds: float) -> None:
+    end = time.monotonic() + seconds
+    while (left := end - time.monotonic()) > 0:
+        check_interrupted()
+        await asyncio.sleep(min(POLL_SECONDS, left))
+    check_interrupted()
+
+
+def wait_for(client, name: str, timeout: float, interval: float = DEFAULT_POLL_SECONDS):
+    """Poll until the job finishes or ``timeout`` seconds pass; returns the last job state seen."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get_scheduler().call(lambda: client.batches.get(name=name))
+        remaining = deadline - time.monotonic()
+        if is_done(job) or remaining <= 0:
+            return job
+        print(f"Gemini batch {name}: {state_name(job)}, next check in {min(interval, remaining):.0f}s")
+        _pause(min(interval, remaining))
+        interval = _next_interval(interval)
+
+
+async def await_job(client, name: str, timeout: float, interval: float = DEFAULT_POLL_SECONDS):
+    """Async :func:`wait_for`; waiting yields the event loop instead of holding a thread."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await get_scheduler().acall(lambda: client.aio.batches.get(name=name))
+        remaining = deadline - time.monotonic()
+        if is_done(job) or remaining <= 0:
+            return job
+        print(f"Gemini batch {name}: {state_name(job)}, next check in {min(interval, remaining):.0f}s")
+        await _apause(min(interval, remaining))
+        interval = _next_interval(interval)
+
+
+def job_results(job) -> list[tuple[ResponseParts | None, str | None]]:
+    """``(parts, error)`` per inline request of a finished job, in submission order."""
+    dest = getattr(job, "dest", None)
+    results = []
+    for item in getattr(dest, "inlined_responses", None) or []:
+        error = getattr(item, "error", None)
+        response = getattr(item, "response", None)
+        if error is not None or response is None:
+            results.append((None, str(getattr(error, "message", None) or error or "No response")))
+        else:
+            results.append((ResponseParts.from_result(response), None))
+    return results
+
+
+def result_images(results) -> list[bytes]:
+    return [data for parts, _ in results if parts is not None for data in parts.images]
+
+
+def describe(job, results) -> str:
+    lines = [f"Gemini batch {job.name}: {state_name(job)}"]
+    if results:
+        ok = sum(1 for parts, _ in results if parts is not None and parts.images)
+        lines.append(f"{ok} of {len(results)} requests returned images")
+    for i, (parts, error) in enumerate(results):
+        if error is not None:
+            lines.append(f"[{i}] Error: {error}")
+        elif parts.text:
+            lines.append(f"[{i}] {parts.text}")
+        elif not parts.images:
+            lines.append(f"[{i}] No image returned by the model.")
+    return "\n".join(lines)
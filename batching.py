@@ -0,0 +1,157 @@
+"""Batch fan-out helpers shared by the V1 and V3 nodes.
+
+A batch run turns every image of the incoming ``[B,H,W,C]`` tensor, and
+optionally every line of a multi-line prompt, into its own Gemini request.
+Requests are dispatched concurrently and their results are stacked back
+into one IMAGE batch in input order. A failed item becomes a black frame
+plus an error message instead of failing the whole batch.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING
+
+from .cancellation import POLL_SECONDS, batch_timeout_error, interrupt_error, interrupted
+
+if TYPE_CHECKING:
+    import torch  # type: ignore
+
+BATCH_MODES = ["Off", "Per Image", "Per Prompt Line", "Per Image and Prompt Line"]
+DEFAULT_BATCH_WORKERS = 4
+MAX_BATCH_WORKERS = 32
+
+PLACEHOLDER_SIZE = 512
+
+
+def prompt_lines(prompt: str) -> list[str]:
+    """Split a multi-line prompt into its non-empty lines."""
+    lines = [line.strip() for line in prompt.splitlines()]
+    lines = [line for line in lines if line]
+    return lines or [prompt]
+
+
+def expand_jobs(prompt: str, image_count: int, mode: str) -> list[tuple[str, int | None]]:
+    """Return ``(prompt, image_index)`` pairs for ``mode``, image-major.
+
+    ``image_index`` is None when no image is wired. With batching off this is
+    the single request the node always made: the whole prompt and the first
+    image.
+    """
+    per_image = mode in ("Per Image", "Per Image and Prompt Line")
+    per_line = mode in ("Per Prompt Line", "Per Image and Prompt Line")
+    if image_count <= 0:
+        indices: list[int | None] = [None]
+    elif per_image:
+        indices = list(range(image_count))
+    else:
+        indices = [0]
+    prompts = prompt_lines(prompt) if per_line else [prompt]
+    return [(p, i) for i in indices for p in prompts]
+
+
+def image_count(image) -> int:
+    if image is None:
+        return 0
+    try:
+        return int(image.shape[0])
+    except Exception:
+        return len(image)
+
+
+def stack_results(tensors: list, allocate=None) -> "torch.Tensor":
+    """Concatenate ``[k,H,W,C]`` results into one batch in order.
+
+    Results of different sizes are zero-padded (bottom/right) to the largest
+    height and width. ``None`` entries, i.e. failed items, become a single
+    black frame so output indices still line up with the inputs.
+    ``allocate(shape)``, if given, returns the zeroed output tensor.
+    """
+    import torch  # type: ignore
+
+    present = [t for t in tensors if t is not None]
+    if not present:
+        return torch.zeros((max(1, len(tensors)), PLACEHOLDER_SIZE, PLACEHOLDER_SIZE, 3), dtype=torch.float32)
+    if len(tensors) == 1:
+        return present[0]
+    height = max(int(t.shape[1]) for t in present)
+    width = max(int(t.shape[2]) for t in present)
+    channels = int(present[0].shape[3])
+    total = sum(int(t.shape[0]) if t is not None else 1 for t in tensors)
+    shape = (total, height, width, channels)
+    out = allocate(shape) if allocate is not None else torch.zeros(shape, dtype=torch.float32)
+    offset = 0
+    for t in tensors:
+        if t is None:
+            offset += 1
+            continue
+        count, h, w = int(t.shape[0]), int(t.shape[1]), int(t.shape[2])
+        out[offset:offset + count, :h, :w] = t
+        offset += count
+    return out
+
+
+def run_threaded(fn, jobs: list, workers: int, timeout: float = 0) -> list[tuple[object, Exception | None]]:
+    """Call ``fn(job)`` for every job on a thread pool, preserving order.
+
+    The wait polls ComfyUI's interrupt flag: on Interrupt the queued jobs
+    are dropped and the interrupt is raised at once, without waiting for
+    requests still on the wire. With ``timeout`` (seconds, 0 for none),
+    jobs unfinished when it passes come back as TimeoutError.
+    """
+    workers = max(1, min(int(workers), MAX_BATCH_WORKERS, len(jobs)))
+    deadline = time.monotonic() + timeout if timeout and timeout > 0 else None
+    # Even a single job runs on the pool so this thread stays free to watch for Interrupt
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini-batch")
+    try:
+        futures = [pool.submit(_capture, fn, job) for job in jobs]
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=POLL_SECONDS)
+            if pending and interrupted():
+                raise interrupt_error()
+            if pending and deadline is not None and time.monotonic() >= deadline:
+                break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return [f.result() if f.done() and not f.cancelled() else (None, batch_timeout_error(timeout)) for f in futures]
+
+
+async def run_async(fn, jobs: list, workers: int, timeout: float = 0) -> list[tuple[object, Exception | None]]:
+    """Await ``fn(job)`` for every job with at most ``workers`` running.
+
+    Like :func:`run_threaded`, Interrupt and the ``timeout`` deadline stop
+    the wait; outstanding jobs are cancelled, which releases their in-flight
+    slots right away.
+    """
+    workers = max(1, min(int(workers), MAX_BATCH_WORKERS, len(jobs)))
+    deadline = time.monotonic() + timeout if timeout and timeout > 0 else None
+    gate = asyncio.Semaphore(workers)
+
+    async def _one(job):
+        async with gate:
+            try:
+                return await fn(job), None
+            except Exception as e:
+                return None, e
+
+    tasks = [asyncio.ensure_future(_one(job)) for job in jobs]
+    try:
+        pending = set(tasks)
+        while pending:
+            _, pending = await asyncio.wait(pending, timeout=POLL_SECONDS)
+            if pending and interrupted():
+                raise interrupt_error()
+            if pending and deadline is not None and time.monotonic() >= deadline:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+    return [t.result() if t.done() and not t.cancelled() else (None, batch_timeout_error(timeout)) for t in tasks]
+
+
+def _capture(fn, job):
+    try:
+        return fn(job), None
+    except Exception as e:
+        return None, e
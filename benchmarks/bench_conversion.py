@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: legacy vs shared tensor<->image conversion.
+
+Compares the conversion the nodes used to do inline with image_convert.py
+at 1024x1024 and 2048x2048, for both directions. Each case runs in a fresh
+subprocess so its peak RSS is not polluted by earlier cases.
+
+Usage (from this node's directory, inside the ComfyUI venv):
+    python benchmarks/bench_conversion.py
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+NODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = (1024, 2048)
+CASES = ("decode_legacy", "decode_shared", "encode_legacy", "encode_shared")
+REPEAT = 5
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_case(case: str, size: int) -> None:
+    """Child process: time one case and print 'seconds peak_delta_mb'."""
+    sys.path.insert(0, os.path.dirname(NODE_DIR))
+    import importlib
+
+    import numpy as np
+    import torch
+    from PIL import Image
+
+    image_convert = importlib.import_module(f"{os.path.basename(NODE_DIR)}.image_convert")
+
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+    from io import BytesIO
+
+    buf = BytesIO()
+    Image.fromarray(pixels).save(buf, format="PNG", compress_level=1)
+    png = buf.getvalue()
+    tensor = torch.from_numpy(pixels).float().div_(255.0).unsqueeze(0)
+
+    def decode_legacy():
+        pil = Image.open(BytesIO(png)).convert("RGB")
+        arr = np.array(pil).astype(np.float32) / 255.0
+        return torch.from_numpy(arr).unsqueeze(0)
+
+    def decode_shared():
+        return image_convert.decode_to_tensor(png)
+
+    def encode_legacy():
+        return Image.fromarray((tensor[0].clamp(0, 1).cpu().numpy() * 255.0).astype(np.uint8))
+
+    def encode_shared():
+        return image_convert.tensor_to_pil(tensor, 0)
+
+    fn = locals()[case]
+    baseline = _peak_rss_mb()
+    fn()  # warm up allocator and codec
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    elapsed = (time.perf_counter() - start) / REPEAT
+    print(f"{elapsed:.6f} {_peak_rss_mb() - baseline:.1f}")
+
+
+def main() -> None:
+    print("=" * 60)
+    print("Tensor <-> image conversion microbenchmark")
+    print("=" * 60)
+    try:
+        import numpy  # noqa: F401
+        import torch  # noqa: F401
+        from PIL import Image  # noqa: F401
+    except ImportError as e:
+        print(f"\nSkipped: {e}")
+        return
+    for size in SIZES:
+        print(f"\n{size}x{size}")
+        for case in CASES:
+            out = subprocess.run(
+                [sys.executable, __file__, "--case", case, str(size)],
+                capture_output=True, text=True, check=False,
+            )
+            if out.returncode != 0:
+                print(f"  {case:<14} failed: {out.stderr.strip().splitlines()[-1:]}")
+                continue
+            seconds, peak = out.stdout.split()
+            print(f"  {case:<14} {float(seconds) * 1000:8.1f} ms   peak +{float(peak):7.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--case":
+        _run_case(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark: package import time at ComfyUI startup.
+
+Imports the node package in a fresh interpreter (as ComfyUI does when it
+scans custom_nodes), reports wall time over several runs, and checks that
+registering the nodes did not pull in torch or google-genai.
+
+Usage (from this node's directory):
+    python benchmarks/bench_import.py
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+NODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 10
+
+CHILD = r"""
+import importlib.util, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("gemini_custom_api", {init!r})
+module = importlib.util.module_from_spec(spec)
+sys.modules["gemini_custom_api"] = module
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("torch", "google.genai", "numpy", "PIL") if m in sys.modules]
+print(f"{{elapsed:.6f}} {{len(module.NODE_CLASS_MAPPINGS)}} {{','.join(heavy) or '-'}}")
+"""
+
+
+def main() -> None:
+    print("=" * 60)
+    print("Package import-time benchmark")
+    print("=" * 60)
+    code = CHILD.format(init=os.path.join(NODE_DIR, "__init__.py"))
+    timings = []
+    heavy = "-"
+    nodes = "0"
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        seconds, nodes, heavy = out.stdout.split()
+        timings.append(float(seconds))
+    print(f"\nRuns: {RUNS}")
+    print(f"Registered V1 nodes: {nodes}")
+    print(f"Import time: median {statistics.median(timings) * 1000:.1f} ms, "
+          f"min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms")
+    if heavy == "-":
+        print("✓ No heavy dependencies imported at registration")
+    else:
+        print(f"✗ Heavy dependencies imported at registration: {heavy}")
+
+
+if __name__ == "__main__":
+    main()
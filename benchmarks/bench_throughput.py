@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end throughput of the V1 and V3 nodes, offline.
+
+Registers the nodes through the package's ``__init__.py`` as ComfyUI does
+(NODE_CLASS_MAPPINGS for V1, GeminiExtension for V3) and drives each
+front-end over the shared request engine in core.py (client pool,
+scheduler, encoding, decoding, batching) against the fake backend
+(GEMINI_BACKEND=fake), which answers with canned PNGs after a simulated
+latency. For every concurrency
+level it reports images/sec, p50/p95 request latency, time spent decoding
+responses into tensors and peak RSS. Each case runs in a fresh subprocess
+so its peak RSS is not polluted by earlier cases.
+
+The V3 case needs ComfyUI's comfy_api on the path (run from the ComfyUI
+root or with it on PYTHONPATH); without it the V3 rows report the import
+error.
+
+Usage (from this node's directory, inside the ComfyUI venv):
+    python benchmarks/bench_throughput.py
+    python benchmarks/bench_throughput.py --latency-ms 500 --error-rate 0.05 --image-size 2048
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+NODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NODES = ("v1", "v3")
+LEVELS = (1, 4, 8, 16)
+JOBS = 32
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _run_case(node: str, level: int, jobs: int) -> None:
+    """Child process: run one batch of ``jobs`` requests and print the measurements."""
+    sys.path.insert(0, os.path.dirname(NODE_DIR))
+    import asyncio
+    import functools
+    import importlib
+
+    package = os.path.basename(NODE_DIR)
+    latencies: list[float] = []
+    images = [0]
+    conversion = [0.0]
+
+    def timed_decode(decode):
+        @functools.wraps(decode)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return decode(*args, **kwargs)
+            finally:
+                conversion[0] += time.perf_counter() - start
+        return wrapper
+
+    prompt = "\n".join(f"benchmark prompt {i}" for i in range(jobs))
+    common = dict(
+        prompt=prompt,
+        model="gemini-2.5-flash-image",
+        aspect_ratio="1:1",
+        response_modalities="Image",
+        api_key="benchmark-key",
+        save_api_key=False,
+        batch_mode="Per Prompt Line",
+        batch_workers=level,
+        cache_mode="Bypass",
+    )
+
+    # Register the nodes exactly as ComfyUI does, through the package's __init__.py
+    registration = importlib.import_module(package)
+    core = importlib.import_module(f"{package}.core")
+    if node == "v1":
+        cls = registration.NODE_CLASS_MAPPINGS["Gemini Image Generator (Custom API)"]
+
+        def run(**kwargs):
+            cls().generate_image(**kwargs)
+    else:
+        if registration.GeminiExtension is None:
+            raise SystemExit("V3 registration unavailable: comfy_api is not importable")
+        nodes = asyncio.run(registration.GeminiExtension().get_node_list())
+        cls = next(n for n in nodes if n.__name__ == "GeminiImageGenerator")
+
+        def run(**kwargs):
+            asyncio.run(cls.execute(image=None, **kwargs))
+
+    # Both front-ends send through the shared engine; time it once for either
+    core.decode_batch = timed_decode(core.decode_batch)
+    generate = core.Engine.generate
+    agenerate = core.Engine.agenerate
+
+    def record(start, result):
+        latencies.append(time.perf_counter() - start)
+        images[0] += result[0].shape[0]
+        return result
+
+    def timed_generate(self, *args, **kwargs):
+        start = time.perf_counter()
+        return record(start, generate(self, *args, **kwargs))
+
+    async def timed_agenerate(self, *args, **kwargs):
+        start = time.perf_counter()
+        return record(start, await agenerate(self, *args, **kwargs))
+
+    core.Engine.generate = timed_generate
+    core.Engine.agenerate = timed_agenerate
+    run(**dict(common, prompt="warm up", batch_mode="Off"))
+    latencies.clear()
+    images[0] = 0
+    conversion[0] = 0.0
+    start = time.perf_counter()
+    run(**common)
+    wall = time.perf_counter() - start
+    print(
+        f"{images[0]} {wall:.6f} {_percentile(latencies, 0.5):.6f} {_percentile(latencies, 0.95):.6f} "
+        f"{conversion[0]:.6f} {_peak_rss_mb():.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--image-size", type=int, default=1024)
+    parser.add_argument("--jobs", type=int, default=JOBS)
+    parser.add_argument("--levels", type=int, nargs="+", default=list(LEVELS))
+    parser.add_argument("--nodes", nargs="+", choices=NODES, default=list(NODES))
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("End-to-end throughput benchmark (fake backend)")
+    print("=" * 60)
+    try:
+        import numpy  # noqa: F401
+        import torch  # noqa: F401
+        from PIL import Image  # noqa: F401
+    except ImportError as e:
+        print(f"\nSkipped: {e}")
+        return
+
+    env = dict(
+        os.environ,
+        GEMINI_BACKEND="fake",
+        GEMINI_FAKE_LATENCY_MS=str(args.latency_ms),
+        GEMINI_FAKE_JITTER_MS=str(args.jitter_ms),
+        GEMINI_FAKE_ERROR_RATE=str(args.error_rate),
+        GEMINI_FAKE_IMAGE_SIZE=str(args.image_size),
+    )
+    print(f"\nLatency {args.latency_ms:.0f} ms (+{args.jitter_ms:.0f} jitter), error rate {args.error_rate:.0%}, "
+          f"{args.image_size}x{args.image_size} PNG, {args.jobs} requests per run")
+    for node in args.nodes:
+        print(f"\n{node.upper()}  {'conc':>4} {'img/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'decode ms':>10} {'peak MB':>8}")
+        for level in args.levels:
+            # The V3 node bounds in-flight calls separately from batch_workers
+            case_env = dict(env, GEMINI_MAX_IN_FLIGHT=str(level))
+            out = subprocess.run(
+                [sys.executable, __file__, "--case", node, str(level), str(args.jobs)],
+                capture_output=True, text=True, check=False, env=case_env,
+            )
+            lines = out.stdout.strip().splitlines()
+            if out.returncode != 0 or not lines:
+                print(f"    {level:>4} failed: {out.stderr.strip().splitlines()[-1:]}")
+                continue
+            images, wall, p50, p95, decode, peak = lines[-1].split()
+            print(f"    {level:>4} {int(images) / float(wall):8.2f} {float(p50) * 1000:8.1f} "
+                  f"{float(p95) * 1000:8.1f} {float(decode) * 1000:10.1f} {float(peak):8.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--case":
+        _run_case(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main()
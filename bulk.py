@@ -0,0 +1,304 @@
+"""Bulk generation from a prompt file with resumable progress.
+
+Prompts come from a text file (one per line, ``#`` comments skipped), a CSV
+with a ``prompt`` column or a JSONL file of objects with a ``prompt`` key;
+CSV and JSONL rows may also set ``id``, ``aspect_ratio`` and ``model``.
+
+Rows stream through a bounded worker pool and are sent by the generator
+nodes' request engine (cache, single-flight, scheduler, key pool, timeout).
+Each finished row's images are written to disk straight from the response
+bytes (no decode), and a line is appended to ``manifest.jsonl`` in the
+output directory with the row's request fingerprint. A rerun over the same
+output directory skips rows the manifest records as done for the same
+prompt and settings, so an interrupted run resumes without re-requesting
+finished rows while edited rows are generated again.
+"""
+
+import csv
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+
+from .cancellation import POLL_SECONDS, check_interrupted, is_interrupt
+from .metrics import RequestMetrics
+from .response_parts import ResponseParts
+
+MANIFEST_NAME = "manifest.jsonl"
+_EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+
+
+@dataclass(frozen=True)
+class BulkRow:
+    row_id: str
+    prompt: str
+    aspect_ratio: str | None = None
+    model: str | None = None
+
+
+def _safe_id(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(value)).strip("._") or "row"
+
+
+def _row(index: int, record) -> BulkRow | None:
+    if isinstance(record, str):
+        record = {"prompt": record}
+    if not isinstance(record, dict):
+        return None
+    prompt = str(record.get("prompt") or "").strip()
+    if not prompt:
+        return None
+    return BulkRow(
+        row_id=_safe_id(record.get("id") or f"{index:06d}"),
+        prompt=prompt,
+        aspect_ratio=(record.get("aspect_ratio") or None),
+        model=(record.get("model") or None),
+    )
+
+
+def read_rows(path: str) -> list[BulkRow]:
+    """Parse a .txt, .csv or .jsonl prompt file into rows, in file order."""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    # utf-8-sig drops the byte order mark Excel writes, which would otherwise hide the first CSV column
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if ext == "csv":
+            reader = csv.DictReader(f)
+            records = list(reader)
+            if records and "prompt" not in (reader.fieldnames or []):
+                raise ValueError(f"No 'prompt' column in {path}; found: {', '.join(reader.fieldnames or [])}")
+        elif ext in ("jsonl", "ndjson"):
+            records = [json.loads(line) for line in f if line.strip()]
+            if records and not any(isinstance(record, dict) and "prompt" in record for record in records):
+                raise ValueError(f"No record in {path} has a 'prompt' field")
+        else:
+            records = [line for line in (raw.strip() for raw in f) if line and not line.startswith("#")]
+    rows = [row for row in (_row(i, record) for i, record in enumerate(records)) if row is not None]
+    seen = set()
+    for row in rows:
+        if row.row_id in seen:
+            raise ValueError(f"Duplicate row id '{row.row_id}' in {path}")
+        seen.add(row.row_id)
+    return rows
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".bulk.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class Manifest:
+    """Append-only record of finished rows in ``<output_dir>/manifest.jsonl``."""
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+
+    def completed(self) -> dict[str, str | None]:
+        """Request fingerprint of every id recorded as done whose files are all still on disk."""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        directory = os.path.dirname(self.path)
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash; that row simply runs again
+                    continue
+                if entry.get("status") == "done" and all(
+                    os.path.exists(os.path.join(directory, name)) for name in entry.get("files", [])
+                ):
+                    done[entry["id"]] = entry.get("key")
+                elif entry.get("status") == "failed":
+                    done.pop(entry.get("id"), None)
+        return done
+
+    def append(self, entry: dict) -> None:
+        line = json.dumps(entry, sort_keys=True) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def save_parts(output_dir: str, row_id: str, parts: ResponseParts) -> list[str]:
+    """Write every returned image as-is; returns the file names."""
+    names = []
+    for k, (data, mime) in enumerate(zip(parts.images, parts.mime_types)):
+        name = f"{row_id}_{k}{_EXTENSIONS.get(mime, '.png')}"
+        _write_atomic(os.path.join(output_dir, name), data)
+        names.append(name)
+    if parts.texts:
+        name = f"{row_id}.txt"
+        _write_atomic(os.path.join(output_dir, name), parts.text.encode("utf-8"))
+        names.append(name)
+    return names
+
+
+def row_settings(settings):
+    """Build ``for_row(row)``: ``settings`` with the row's model and aspect ratio overrides applied."""
+    variants = {}
+
+    def for_row(row: BulkRow):
+        key = (row.model or settings.model, row.aspect_ratio or settings.aspect_ratio)
+        variant = variants.get(key)
+        if variant is None:
+            variant = variants.setdefault(key, replace(settings, model=key[0], aspect_ratio=key[1]))
+        return variant
+
+    return for_row
+
+
+def make_fingerprint(settings):
+    """Build ``fingerprint(row)`` for :func:`run_bulk`: the row's request fingerprint (and cache key)."""
+    for_row = row_settings(settings)
+    return lambda row: for_row(row).fingerprint(row.prompt, ())
+
+
+def make_generate(engine, settings):
+    """Build ``generate(row) -> ResponseParts`` for :func:`run_bulk` on the shared request engine (core.py).
+
+    Rows may override the model and aspect ratio of ``settings``. Responses
+    are not decoded; :func:`save_parts` writes their bytes as they are.
+    """
+    # Build the config once (and fail early if google-genai is missing)
+    settings.config
+    for_row = row_settings(settings)
+
+    def generate(row: BulkRow) -> ResponseParts:
+        request = for_row(row)
+        metrics = RequestMetrics(request.node, request.model, **request.labels, row=row.row_id)
+        metrics.bytes_sent = len(row.prompt.encode("utf-8"))
+        return engine.fetch(request, row.prompt, metrics=metrics)
+
+    return generate
+
+
+def run_bulk(rows: list[BulkRow], generate, output_dir: str, workers: int = 4, resume: bool = True,
+             on_progress=None, fingerprint=None) -> dict:
+    """Run ``generate(row) -> ResponseParts`` over ``rows`` and save results as they complete.
+
+    At most ``workers`` rows are in flight; ``on_progress(finished, total)``
+    is called after each row. A row is skipped on resume only if the manifest
+    recorded it with the same ``fingerprint(row)``. Returns counts of done,
+    skipped and failed rows.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest(output_dir)
+    finished = manifest.completed() if resume else {}
+    keys = {row.row_id: fingerprint(row) if fingerprint is not None else None for row in rows}
+    pending = [row for row in rows if row.row_id not in finished or finished[row.row_id] != keys[row.row_id]]
+    summary = {"total": len(rows), "skipped": len(rows) - len(pending), "done": 0, "failed": 0, "images": 0,
+               "errors": []}
+    started = time.perf_counter()
+    if summary["skipped"]:
+        print(f"Gemini bulk: resuming, {summary['skipped']} of {len(rows)} rows already done")
+    changed = sum(1 for row in pending if row.row_id in finished)
+    if changed:
+        print(f"Gemini bulk: {changed} finished row(s) changed prompt or settings; generating them again")
+
+    def _one(row: BulkRow) -> dict:
+        base = {"id": row.row_id, "key": keys[row.row_id], "prompt": row.prompt}
+        try:
+            parts = generate(row)
+            if not parts.images:
+                raise ValueError("No image was generated by the model")
+            entry = {**base, "status": "done", "files": save_parts(output_dir, row.row_id, parts)}
+        except Exception as e:
+            if is_interrupt(e):
+                # Not a failed row: stop the run and leave the row to the next resume
+                raise
+            entry = {**base, "status": "failed", "error": str(e)}
+        manifest.append(entry)
+        return entry
+
+    # Keep only a window of rows submitted so a huge file is streamed, not queued up front
+    window = max(1, workers) * 2
+    queue = iter(pending)
+    in_flight = set()
+    completed = summary["skipped"]
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="gemini-bulk")
+    try:
+        while True:
+            for row in queue:
+                in_flight.add(pool.submit(_one, row))
+                if len(in_flight) >= window:
+                    break
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+            check_interrupted()
+            for future in done:
+                entry = future.result()
+                completed += 1
+                if entry["status"] == "done":
+                    summary["done"] += 1
+                    summary["images"] += sum(1 for name in entry["files"] if not name.endswith(".txt"))
+                else:
+                    summary["failed"] += 1
+                    summary["errors"].append(f"{entry['id']}: {entry['error']}")
+                if on_progress is not None:
+                    on_progress(completed, len(rows))
+    finally:
+        # On Interrupt queued rows are dropped; rows already sent finish in the background
+        pool.shutdown(wait=False, cancel_futures=True)
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def default_output_dir(prompt_file: str) -> str:
+    """``<ComfyUI output>/gemini_bulk/<prompt file name>``, or next to the prompt file outside ComfyUI."""
+    stem = os.path.splitext(os.path.basename(prompt_file))[0] or "bulk"
+    try:
+        import folder_paths  # type: ignore
+
+        root = folder_paths.get_output_directory()
+    except Exception:
+        root = os.path.dirname(os.path.abspath(prompt_file))
+    return os.path.join(root, "gemini_bulk", stem)
+
+
+def progress_callback(total: int):
+    """``on_progress`` for run_bulk that drives ComfyUI's progress bar when available."""
+    try:
+        import comfy.utils  # type: ignore
+
+        bar = comfy.utils.ProgressBar(total)
+    except Exception:
+        bar = None
+
+    def on_progress(finished, total):
+        if bar is not None:
+            bar.update_absolute(finished, total)
+        if finished == total or finished % 25 == 0:
+            print(f"Gemini bulk: {finished}/{total} rows")
+
+    return on_progress
+
+
+def describe(summary: dict, output_dir: str) -> str:
+    lines = [
+        f"{summary['done']} done, {summary['skipped']} skipped (already done), {summary['failed']} failed "
+        f"of {summary['total']} rows; {summary['images']} images in {summary['seconds']:.1f}s",
+        f"Output: {output_dir}",
+    ]
+    errors = summary["errors"]
+    lines += errors[:20]
+    if len(errors) > 20:
+        lines.append(f"... and {len(errors) - 20} more (see {MANIFEST_NAME})")
+    return "\n".join(lines)
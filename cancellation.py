@@ -0,0 +1,64 @@
+"""Request deadlines and cooperative cancellation on ComfyUI interrupts.
+
+Each request carries an HTTP timeout through the SDK's ``http_options``, so
+a hung call fails (and is retried or reported) instead of blocking forever.
+While a node waits on its in-flight requests it polls ComfyUI's interrupt
+flag; on Interrupt, or when the whole batch's deadline passes, the wait
+stops at once, queued jobs are dropped and async requests are cancelled,
+which releases their in-flight slots.
+"""
+
+import os
+
+DEFAULT_TIMEOUT = 120
+# How often waiting code checks the interrupt flag and the batch deadline
+POLL_SECONDS = 0.25
+
+
+def default_timeout() -> int:
+    """Per-request timeout in seconds from ``GEMINI_TIMEOUT`` (0 disables it)."""
+    try:
+        return max(0, int(os.environ.get("GEMINI_TIMEOUT", DEFAULT_TIMEOUT)))
+    except ValueError:
+        return DEFAULT_TIMEOUT
+
+
+def http_options(timeout_seconds: float) -> dict | None:
+    """``http_options`` for a client with a per-request timeout; None for no timeout."""
+    if not timeout_seconds or timeout_seconds <= 0:
+        return None
+    # google-genai expects milliseconds
+    return {"timeout": int(timeout_seconds * 1000)}
+
+
+def interrupted() -> bool:
+    """True while ComfyUI's Interrupt is pending; always False outside ComfyUI."""
+    try:
+        import comfy.model_management  # type: ignore
+
+        return bool(comfy.model_management.processing_interrupted())
+    except Exception:
+        return False
+
+
+def interrupt_error() -> BaseException:
+    """The exception ComfyUI treats as an interrupt (not an error), or a plain one outside ComfyUI."""
+    try:
+        import comfy.model_management  # type: ignore
+
+        return comfy.model_management.InterruptProcessingException()
+    except Exception:
+        return InterruptedError("Interrupted")
+
+
+def is_interrupt(exc: BaseException) -> bool:
+    return isinstance(exc, InterruptedError) or type(exc).__name__ == "InterruptProcessingException"
+
+
+def check_interrupted() -> None:
+    if interrupted():
+        raise interrupt_error()
+
+
+def batch_timeout_error(seconds: float) -> TimeoutError:
+    return TimeoutError(f"Batch deadline of {seconds:g}s passed before this request finished")
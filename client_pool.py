@@ -0,0 +1,151 @@
+"""Process-wide pool of google-genai clients shared by the V1 and V3 nodes.
+
+Building a ``genai.Client`` per run throws away its HTTP connection pool,
+TLS session and auth state, so every image paid a full handshake. Clients
+are instead kept in a registry keyed by API key and endpoint options,
+dropped from it after sitting idle, and closed when the process exits.
+
+google-genai is imported lazily so this module is safe to import before the
+dependency is installed. ``GEMINI_BACKEND=fake`` swaps in the offline
+:mod:`fake_backend` client for benchmarks and local testing.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Clients not looked up for this many seconds are dropped on the next lookup.
+DEFAULT_IDLE_TIMEOUT = 600.0
+
+BACKENDS = ("genai", "fake")
+
+
+def backend_name() -> str:
+    """Backend selected by GEMINI_BACKEND; unknown values fall back to genai."""
+    name = os.environ.get("GEMINI_BACKEND", "genai").strip().lower()
+    return name if name in BACKENDS else "genai"
+
+
+def _close_client(client) -> None:
+    """Best-effort close of a client; older SDKs have no close()."""
+    closer = getattr(client, "close", None)
+    if callable(closer):
+        try:
+            closer()
+        except Exception:
+            pass
+
+
+class _Entry:
+    __slots__ = ("client", "last_used")
+
+    def __init__(self, client):
+        self.client = client
+        self.last_used = time.monotonic()
+
+
+class ClientPool:
+    """Thread-safe registry of ``genai.Client`` objects."""
+
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._entries: dict[str, _Entry] = {}
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    @staticmethod
+    def _key(api_key: str, http_options: dict | None) -> str:
+        # Hash so raw keys never sit in the registry or show up in stats.
+        opts = json.dumps(http_options or {}, sort_keys=True, default=str)
+        return hashlib.sha256(f"{backend_name()}\0{api_key}\0{opts}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _create(api_key: str, http_options: dict | None):
+        if backend_name() == "fake":
+            from .fake_backend import FakeClient
+
+            return FakeClient(api_key)
+
+        from google import genai  # type: ignore
+
+        if http_options:
+            return genai.Client(api_key=api_key, http_options=http_options)
+        return genai.Client(api_key=api_key)
+
+    def get(self, api_key: str, http_options: dict | None = None):
+        """Return a pooled client for ``api_key``, creating it if needed."""
+        if not api_key:
+            raise ValueError("API key is required. Please provide a Google AI API key.")
+        key = self._key(api_key, http_options)
+        with self._lock:
+            self._evict_idle_locked(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                self.reused += 1
+                return entry.client
+        # Construct outside the lock; client setup can touch the network stack.
+        client = self._create(api_key, http_options)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Another thread won the race; keep theirs.
+                entry.last_used = time.monotonic()
+                self.reused += 1
+                duplicate, client = client, entry.client
+            else:
+                self._entries[key] = _Entry(client)
+                self.created += 1
+                duplicate = None
+        if duplicate is not None:
+            _close_client(duplicate)
+        return client
+
+    def _evict_idle_locked(self, now: float) -> None:
+        if self.idle_timeout <= 0:
+            return
+        stale = [k for k, e in self._entries.items() if now - e.last_used > self.idle_timeout]
+        for k in stale:
+            # Only forget it: a caller (e.g. a long-lived chat session) may still be using the client,
+            # and closing it would fail their next request. It is released once nothing references it.
+            del self._entries[k]
+            self.evicted += 1
+
+    def close_all(self) -> None:
+        with self._lock:
+            entries, self._entries = self._entries, {}
+        for entry in entries.values():
+            _close_client(entry.client)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "clients": len(self._entries),
+                "created": self.created,
+                "reused": self.reused,
+                "evicted": self.evicted,
+            }
+
+
+_POOL = ClientPool()
+
+
+def get_client(api_key: str, http_options: dict | None = None):
+    """Return the shared client for ``api_key`` from the process-wide pool."""
+    return _POOL.get(api_key, http_options)
+
+
+def pool_stats() -> dict:
+    return _POOL.stats()
+
+
+def close_all() -> None:
+    _POOL.close_all()
+
+
+atexit.register(close_all)
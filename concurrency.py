@@ -0,0 +1,39 @@
+"""Process-wide limit on concurrent in-flight Gemini requests.
+
+The limit defaults to 4 and can be set with the ``GEMINI_MAX_IN_FLIGHT``
+environment variable. Async callers share one semaphore per event loop so
+several Gemini nodes (in one graph or across queued prompts) overlap their
+network wait without exceeding the limit.
+"""
+
+import asyncio
+import os
+import weakref
+
+DEFAULT_MAX_IN_FLIGHT = 4
+
+
+def max_in_flight() -> int:
+    try:
+        value = int(os.environ.get("GEMINI_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+    except ValueError:
+        value = DEFAULT_MAX_IN_FLIGHT
+    return max(1, value)
+
+
+_async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def async_slot() -> asyncio.Semaphore:
+    """Return the in-flight semaphore for the running event loop.
+
+    Use as ``async with async_slot(): ...`` around the network call only.
+    """
+    loop = asyncio.get_running_loop()
+    sem = _async_slots.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(max_in_flight())
+        _async_slots[loop] = sem
+    return sem
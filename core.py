@@ -0,0 +1,822 @@
+"""Request engine and node runs shared by the V1 and V3 nodes.
+
+Both node front-ends (the gemini_*_node.py modules for the classic node API
+and node.py for comfy_api V3) are thin adapters over this module: they read
+their inputs, call one of the runs here (:func:`run_batch` for the
+generator, :func:`run_sweep`, :func:`run_bulk_file`, :func:`open_session`,
+the batch job runs) and render the :class:`NodeRun` it returns for their
+API, so every node has one error policy on both. Everything in between is
+done here once, in a blocking and an awaitable variant:
+
+* **build**: request config, job fan-out, reference encoding, fingerprint;
+* **send**: response cache, single-flight, scheduler, key pool, sessions,
+  streaming, per-request deadline;
+* **parse**: ``ResponseParts`` from the response or stream;
+* **convert**: decoding into one IMAGE batch within the memory budget.
+
+Every request records :class:`RequestMetrics` labelled with the front-end
+that sent it, so both registration paths can be benchmarked and compared.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+from .batch_jobs import (
+    DEFAULT_POLL_SECONDS,
+    BatchJobHandle,
+    asubmit,
+    await_job,
+    build_requests,
+    describe as describe_batch,
+    is_done,
+    job_results,
+    result_images,
+    state_name,
+    submit,
+    wait_for,
+)
+from .batching import (
+    DEFAULT_BATCH_WORKERS,
+    PLACEHOLDER_SIZE,
+    expand_jobs,
+    image_count,
+    prompt_lines,
+    run_async,
+    run_threaded,
+    stack_results,
+)
+from .bulk import (
+    default_output_dir,
+    describe as describe_bulk,
+    make_fingerprint,
+    make_generate,
+    progress_callback,
+    read_rows,
+    run_bulk,
+)
+from .cancellation import DEFAULT_TIMEOUT, http_options, is_interrupt
+from .client_pool import get_client, pool_stats
+from .concurrency import async_slot
+from .deps import DependencyError, load as load_dependencies
+from .fingerprint import request_fingerprint
+from .image_convert import decode_batch
+from .key_pool import akeyed_attempt, get_key_pool, keyed_attempt
+from .key_store import get_key_store
+from .metrics import RequestMetrics
+from .output_buffer import DEFAULT_BUDGET_MB, OutputBuffer
+from .raw_output import write_originals
+from .response_cache import get_cache
+from .response_parts import ResponseParts
+from .scheduler import estimate_tokens, get_scheduler
+from .sessions import SessionHandle, get_session_store
+from .singleflight import get_singleflight
+from .streaming import acollect_stream, collect_stream
+from .sweep import ASPECT_VARIABLE, check_template, combination_count, expand, parse_variables, render
+from .upload_encoder import DEFAULT_QUALITY, encode_reference, encode_references, to_part
+
+if TYPE_CHECKING:
+    import torch  # type: ignore
+
+NO_IMAGE = "No image was generated by the model"
+API_KEY_REQUIRED = "API key is required. Please provide a Google AI API key."
+
+
+def placeholder(count: int = 1) -> "torch.Tensor":
+    """Black ``[count,512,512,3]`` frames returned in place of a failed run."""
+    import torch  # type: ignore
+
+    return torch.zeros((max(1, count), PLACEHOLDER_SIZE, PLACEHOLDER_SIZE, 3), dtype=torch.float32)
+
+
+@dataclass
+class GenerationSettings:
+    """What every request of one node run asks for."""
+
+    model: str
+    aspect_ratio: str
+    response_modalities: str
+    seed: int | None = None
+    candidate_count: int = 1
+    cache_mode: str = "Bypass"
+    stream: bool = False
+    session: SessionHandle | None = None
+    node_id: str | None = None
+    # Front-end label on metrics ("v1", "v3")
+    node: str = "v1"
+    labels: dict = field(default_factory=dict)
+
+    @cached_property
+    def config(self):
+        types = load_dependencies().types
+        modalities = ["Image"] if self.response_modalities == "Image" else ["Text", "Image"]
+        return types.GenerateContentConfig(
+            response_modalities=modalities,
+            image_config=types.ImageConfig(aspect_ratio=self.aspect_ratio),
+            candidate_count=self.candidate_count if self.candidate_count > 1 else None,
+        )
+
+    def fingerprint(self, prompt: str, references) -> str:
+        """Keys both the response cache and single-flight de-duplication."""
+        return request_fingerprint(
+            self.model, prompt, self.aspect_ratio, self.response_modalities, self.seed,
+            [ref.digest for ref in references],
+            candidate_count=self.candidate_count,
+        )
+
+    def metrics(self) -> RequestMetrics:
+        return RequestMetrics(self.node, self.model, **self.labels)
+
+
+class Engine:
+    """Sends requests on one pooled client, or on a key pool that picks a key per attempt."""
+
+    def __init__(self, client=None, key_pool=None, key_strategy: str = "Single Key", options: dict | None = None):
+        self.client = client
+        self.key_pool = key_pool
+        self.key_strategy = key_strategy
+        self.http_options = options
+
+    @classmethod
+    def connect(cls, api_key: str, key_strategy: str = "Single Key", timeout_seconds: float = DEFAULT_TIMEOUT,
+                session: SessionHandle | None = None) -> "Engine":
+        """Engine for a resolved key; a pool strategy spreads requests over every configured key."""
+        key_pool = None
+        if session is None and key_strategy != "Single Key":
+            pool = get_key_pool(get_key_store(), api_key)
+            if len(pool) > 1:
+                key_pool = pool
+                print(f"Gemini key pool: {len(pool)} keys, {key_strategy}")
+            elif not api_key and len(pool) == 1:
+                # A lone GEMINI_API_KEYS entry is simply used as the Single Key
+                api_key = pool.keys()[0]
+        # Every request carries the deadline; a hung call fails instead of blocking the executor
+        options = http_options(timeout_seconds)
+        client = get_client(api_key, options) if api_key else None
+        if client is None and key_pool is None and session is None:
+            raise ValueError(API_KEY_REQUIRED)
+        return cls(client, key_pool, key_strategy, options)
+
+    # -- send ---------------------------------------------------------------
+
+    def _call(self, request, tokens: int):
+        """Run ``request(client)`` through the scheduler, on the engine's client or the key pool."""
+        if self.key_pool is None:
+            return get_scheduler().call(lambda: request(self.client), tokens=tokens)
+        return get_scheduler().call(
+            keyed_attempt(self.key_pool, self.key_strategy, request, self.http_options),
+            tokens=tokens,
+            switch=self.key_pool.can_switch,
+        )
+
+    async def _acall(self, request, tokens: int):
+        if self.key_pool is None:
+            return await get_scheduler().acall(lambda: request(self.client), tokens=tokens)
+        # Each attempt draws a key; a throttled key is retried at once on another
+        return await get_scheduler().acall(
+            akeyed_attempt(self.key_pool, self.key_strategy, request, self.http_options),
+            tokens=tokens,
+            switch=self.key_pool.can_switch,
+        )
+
+    @staticmethod
+    def _cache_mode(settings: GenerationSettings) -> str:
+        # A session turn depends on the conversation so far; never replay or share it
+        return "Bypass" if settings.session is not None else settings.cache_mode
+
+    @classmethod
+    def _cached(cls, settings: GenerationSettings, cache_key: str, metrics: RequestMetrics) -> ResponseParts | None:
+        if cls._cache_mode(settings) != "Use Cache":
+            return None
+        parts = get_cache().get(cache_key)
+        if parts is not None:
+            metrics.cached = True
+            print("Gemini response cache hit")
+        return parts
+
+    @classmethod
+    def _parse(cls, settings: GenerationSettings, result, cache_key: str, metrics: RequestMetrics) -> ResponseParts:
+        metrics.add_usage(getattr(result, "usage_metadata", None))
+        if settings.stream:
+            metrics.streamed = True
+            metrics.ttfb = result.ttfb
+            print(result.describe())
+            parts = result.parts
+        else:
+            parts = ResponseParts.from_result(result)
+        if cls._cache_mode(settings) != "Bypass" and not metrics.coalesced:
+            get_cache().put(cache_key, parts)
+        return parts
+
+    @staticmethod
+    def _checked(parts: ResponseParts, metrics: RequestMetrics) -> ResponseParts:
+        for text in parts.texts:
+            print(f"Text response: {text}")
+        metrics.bytes_received = sum(len(data) for data in parts.images)
+        if not parts.images:
+            raise ValueError(f"{NO_IMAGE}: {parts.text}" if parts.text else NO_IMAGE)
+        return parts
+
+    @staticmethod
+    def _done(tensor, metrics: RequestMetrics):
+        metrics.images = tensor.shape[0]
+        print(f"Generated {tensor.shape[0]} image(s), size: {(tensor.shape[2], tensor.shape[1])}")
+        return tensor
+
+    def _fetch(self, settings: GenerationSettings, prompt: str, references, metrics: RequestMetrics):
+        """Replay from cache or send; returns ``(parts, result)`` with ``result`` None on a cache hit."""
+        cache_key = settings.fingerprint(prompt, references)
+        result = None
+        parts = self._cached(settings, cache_key, metrics)
+        if parts is None:
+            if settings.session is not None:
+                print(f"Gemini session '{settings.session.session_id}': sending next turn")
+            with metrics.span("serialize"):
+                contents = [prompt] + [to_part(ref) for ref in references]
+            tokens = estimate_tokens(prompt, len(contents) - 1, max(1, settings.candidate_count))
+            model, config = settings.model, settings.config
+
+            def _send():
+                if settings.session is not None:
+                    # Only this turn goes out; the chat holds the earlier turns
+                    return get_session_store().send(
+                        settings.session, contents, config, settings.stream, settings.node_id, tokens,
+                        self.http_options,
+                    )
+                if settings.stream:
+                    return self._call(
+                        lambda client: collect_stream(
+                            client.models.generate_content_stream(model=model, contents=contents, config=config),
+                            settings.node_id,
+                        ),
+                        tokens,
+                    )
+                return self._call(
+                    lambda client: client.models.generate_content(model=model, contents=contents, config=config),
+                    tokens,
+                )
+
+            # Scheduler waits for RPM/TPM budget and retries transient failures
+            with metrics.span("network"):
+                if self._cache_mode(settings) != "Bypass":
+                    # An identical request already in flight is shared instead of sent (and billed) again
+                    result, metrics.coalesced = get_singleflight().do(_flight_key(settings, cache_key), _send)
+                else:
+                    result = _send()
+            parts = self._parse(settings, result, cache_key, metrics)
+        return self._checked(parts, metrics), result
+
+    def fetch(self, settings: GenerationSettings, prompt: str, references=(),
+              metrics: RequestMetrics | None = None) -> ResponseParts:
+        """Send one request without decoding it, for callers that keep the response bytes."""
+        metrics = metrics or settings.metrics()
+        try:
+            parts, _ = self._fetch(settings, prompt, references, metrics)
+            metrics.images = len(parts.images)
+        except Exception as e:
+            metrics.finish(e)
+            raise
+        metrics.finish()
+        return parts
+
+    def generate(self, settings: GenerationSettings, prompt: str, references=(),
+                 metrics: RequestMetrics | None = None):
+        """Send one request (or replay it from cache); returns ``(image_tensor, parts)``.
+
+        Raises when the model returned no image. ``metrics`` is finished here.
+        """
+        metrics = metrics or settings.metrics()
+        try:
+            parts, result = self._fetch(settings, prompt, references, metrics)
+            if settings.stream and result is not None:
+                # Streamed images were already decoded while the rest of the response arrived
+                with metrics.span("decode"):
+                    decoded = result.decoded_all()
+                with metrics.span("tensor"):
+                    tensor = stack_results(decoded)
+            else:
+                tensor = decode_batch(parts.images, metrics=metrics)
+            self._done(tensor, metrics)
+        except Exception as e:
+            metrics.finish(e)
+            raise
+        metrics.finish()
+        return tensor, parts
+
+    async def _afetch(self, settings: GenerationSettings, prompt: str, references, metrics: RequestMetrics):
+        cache_key = settings.fingerprint(prompt, references)
+        result = None
+        parts = await asyncio.to_thread(self._cached, settings, cache_key, metrics)
+        if parts is None:
+            if settings.session is not None:
+                print(f"Gemini session '{settings.session.session_id}': sending next turn")
+            with metrics.span("serialize"):
+                contents = [prompt] + [to_part(ref) for ref in references]
+            tokens = estimate_tokens(prompt, len(contents) - 1, max(1, settings.candidate_count))
+            model, config = settings.model, settings.config
+
+            async def _request(client):
+                # The slot bounds in-flight calls across every node on this loop
+                async with async_slot():
+                    if settings.stream:
+                        return await acollect_stream(
+                            client.aio.models.generate_content_stream(model=model, contents=contents,
+                                                                      config=config),
+                            settings.node_id,
+                        )
+                    return await client.aio.models.generate_content(model=model, contents=contents,
+                                                                    config=config)
+
+            async def _send():
+                if settings.session is not None:
+                    return await asyncio.to_thread(
+                        get_session_store().send,
+                        settings.session, contents, config, settings.stream, settings.node_id, tokens,
+                        self.http_options,
+                    )
+                return await self._acall(_request, tokens)
+
+            with metrics.span("network"):
+                if self._cache_mode(settings) != "Bypass":
+                    result, metrics.coalesced = await get_singleflight().ado(
+                        _flight_key(settings, cache_key), _send
+                    )
+                else:
+                    result = await _send()
+            parts = await asyncio.to_thread(self._parse, settings, result, cache_key, metrics)
+        return self._checked(parts, metrics), result
+
+    async def afetch(self, settings: GenerationSettings, prompt: str, references=(),
+                     metrics: RequestMetrics | None = None) -> ResponseParts:
+        """Awaitable :meth:`fetch`."""
+        metrics = metrics or settings.metrics()
+        try:
+            parts, _ = await self._afetch(settings, prompt, references, metrics)
+            metrics.images = len(parts.images)
+        except Exception as e:
+            metrics.finish(e)
+            raise
+        metrics.finish()
+        return parts
+
+    async def agenerate(self, settings: GenerationSettings, prompt: str, references=(),
+                        metrics: RequestMetrics | None = None):
+        """Awaitable :meth:`generate`: the network wait yields the event loop, blocking work runs in threads."""
+        metrics = metrics or settings.metrics()
+        try:
+            parts, result = await self._afetch(settings, prompt, references, metrics)
+            if settings.stream and result is not None:
+                with metrics.span("decode"):
+                    decoded = await result.adecoded_all()
+                with metrics.span("tensor"):
+                    tensor = stack_results(decoded)
+            else:
+                tensor = await asyncio.to_thread(decode_batch, parts.images, 4, metrics)
+            self._done(tensor, metrics)
+        except Exception as e:
+            metrics.finish(e)
+            raise
+        metrics.finish()
+        return tensor, parts
+
+
+def _flight_key(settings: GenerationSettings, cache_key: str) -> str:
+    return f"{cache_key}:{'stream' if settings.stream else 'unary'}"
+
+
+# -- batch runs ---------------------------------------------------------------
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one node run, in job order."""
+
+    jobs: list
+    image: object
+    texts: list[str]
+    problems: list[str]
+    errors: list
+    # (parts, sidecar metadata) of every successful job, for raw_output
+    originals: list
+
+    @property
+    def text(self) -> str:
+        if len(self.jobs) == 1:
+            return self.texts[0]
+        return "\n".join(f"[{i}] {t}" for i, t in enumerate(self.texts))
+
+
+@dataclass
+class _Run:
+    """Shared state of one batch run: jobs, shared references and the output buffer."""
+
+    settings: GenerationSettings
+    jobs: list
+    image: object
+    shared_refs: list
+    shared_encode: float
+    reference: tuple
+    buffer: OutputBuffer
+
+    def prepare(self, job) -> tuple[str, list, RequestMetrics]:
+        """Prompt, references and metrics for one job; encodes the job's own input image."""
+        job_prompt, index = job
+        metrics = self.settings.metrics()
+        # Shared encoding is amortized over the jobs that reuse it
+        metrics.add_span("encode", self.shared_encode / len(self.jobs))
+        references = list(self.shared_refs)
+        if index is not None:
+            with metrics.span("encode"):
+                references.insert(0, encode_reference(self.image, index, self.settings.aspect_ratio, *self.reference))
+        metrics.bytes_sent = sum(len(ref.data) for ref in references) + len(job_prompt.encode("utf-8"))
+        return job_prompt, references, metrics
+
+    def result(self, outcomes) -> BatchResult:
+        slots, texts, problems, errors, originals = [], [], [], [], []
+        for i, (outcome, error) in enumerate(outcomes):
+            errors.append(error)
+            if error is not None:
+                slots.append(None)
+                message = str(error)
+                problems.append(message if len(self.jobs) == 1 else f"[{i}] {message}")
+                texts.append(f"Error generating image: {message}")
+                continue
+            slot, parts = outcome
+            slots.append(slot)
+            texts.append(parts.text or "Image generated successfully")
+            originals.append((parts, {
+                "prompt": self.jobs[i][0],
+                "model": self.settings.model,
+                "aspect_ratio": self.settings.aspect_ratio,
+                "seed": self.settings.seed,
+                "batch_index": i,
+            }))
+        for problem in problems:
+            print(f"Error generating image: {problem}")
+        image = self.buffer.assemble(slots)
+        if self.buffer.budget is not None:
+            print(self.buffer.describe())
+        return BatchResult(self.jobs, image, texts, problems, errors, originals)
+
+
+def _start(settings, prompt, image, batch_mode, batch_workers, memory_budget_mb) -> tuple[list, OutputBuffer]:
+    # Build the config once, before the fan-out (and fail early if google-genai is missing)
+    settings.config
+    jobs = expand_jobs(prompt, image_count(image), batch_mode)
+    print(f"Generating image with Gemini {settings.model}...")
+    print(f"Prompt: {prompt}")
+    print(f"Aspect Ratio: {settings.aspect_ratio}")
+    if len(jobs) > 1:
+        print(f"Batch mode '{batch_mode}': {len(jobs)} requests, {batch_workers} workers")
+    settings.labels.setdefault("batch_mode", batch_mode)
+    # Decoded results beyond the budget are spilled to disk as they arrive
+    return jobs, OutputBuffer(memory_budget_mb)
+
+
+def run_batch(engine: Engine, settings: GenerationSettings, prompt: str, image=None, reference_images=None,
+              batch_mode: str = "Off", batch_workers: int = DEFAULT_BATCH_WORKERS,
+              reference: tuple = ("Original", "PNG", DEFAULT_QUALITY), batch_timeout: float = 0,
+              memory_budget_mb: int = DEFAULT_BUDGET_MB) -> BatchResult:
+    """Fan one node run out into requests on a thread pool and collect them in order.
+
+    ``reference`` is ``(resize, format, quality)`` for every uploaded image.
+    """
+    jobs, buffer = _start(settings, prompt, image, batch_mode, batch_workers, memory_budget_mb)
+    # Extra references are shared by every job; encode them once, concurrently
+    encode_start = time.perf_counter()
+    shared_refs = encode_references(reference_images, settings.aspect_ratio, *reference, workers=batch_workers)
+    run = _Run(settings, jobs, image, shared_refs, time.perf_counter() - encode_start, reference, buffer)
+
+    def _one(job):
+        job_prompt, references, metrics = run.prepare(job)
+        tensor, parts = engine.generate(settings, job_prompt, references, metrics)
+        return buffer.add(tensor), parts
+
+    outcomes = run_threaded(_one, jobs, batch_workers, batch_timeout)
+    log_stats(engine, settings)
+    return run.result(outcomes)
+
+
+async def arun_batch(engine: Engine, settings: GenerationSettings, prompt: str, image=None, reference_images=None,
+                     batch_mode: str = "Off", batch_workers: int = DEFAULT_BATCH_WORKERS,
+                     reference: tuple = ("Original", "PNG", DEFAULT_QUALITY), batch_timeout: float = 0,
+                     memory_budget_mb: int = DEFAULT_BUDGET_MB) -> BatchResult:
+    """Awaitable :func:`run_batch`; requests overlap on the event loop."""
+    jobs, buffer = _start(settings, prompt, image, batch_mode, batch_workers, memory_budget_mb)
+    encode_start = time.perf_counter()
+    shared_refs = await asyncio.to_thread(
+        encode_references, reference_images, settings.aspect_ratio, *reference, batch_workers,
+    )
+    run = _Run(settings, jobs, image, shared_refs, time.perf_counter() - encode_start, reference, buffer)
+
+    async def _one(job):
+        job_prompt, references, metrics = await asyncio.to_thread(run.prepare, job)
+        tensor, parts = await engine.agenerate(settings, job_prompt, references, metrics)
+        return await asyncio.to_thread(buffer.add, tensor), parts
+
+    outcomes = await run_async(_one, jobs, batch_workers, batch_timeout)
+    log_stats(engine, settings)
+    return await asyncio.to_thread(run.result, outcomes)
+
+
+def _variants(settings: GenerationSettings, aspect_ratios: list[str]) -> dict[str, GenerationSettings]:
+    variants = {aspect: replace(settings, aspect_ratio=aspect) for aspect in dict.fromkeys(aspect_ratios)}
+    for variant in variants.values():
+        variant.config
+    return variants
+
+
+def _sent(settings: GenerationSettings, prompt: str, references) -> RequestMetrics:
+    metrics = settings.metrics()
+    metrics.bytes_sent = sum(len(ref.data) for ref in references) + len(prompt.encode("utf-8"))
+    return metrics
+
+
+def run_prompts(engine: Engine, settings: GenerationSettings, prompts: list[str], aspect_ratios: list[str],
+                references=(), workers: int = DEFAULT_BATCH_WORKERS, batch_timeout: float = 0) -> list:
+    """One request per prompt, each with its own aspect ratio; ``(tensor, error)`` pairs in order."""
+    variants = _variants(settings, aspect_ratios)
+
+    def _one(i):
+        job = variants[aspect_ratios[i]]
+        return engine.generate(job, prompts[i], references, _sent(job, prompts[i], references))[0]
+
+    outcomes = run_threaded(_one, list(range(len(prompts))), workers, batch_timeout)
+    log_stats(engine, settings)
+    return outcomes
+
+
+async def arun_prompts(engine: Engine, settings: GenerationSettings, prompts: list[str], aspect_ratios: list[str],
+                       references=(), workers: int = DEFAULT_BATCH_WORKERS, batch_timeout: float = 0) -> list:
+    """Awaitable :func:`run_prompts`."""
+    variants = _variants(settings, aspect_ratios)
+
+    async def _one(i):
+        job = variants[aspect_ratios[i]]
+        return (await engine.agenerate(job, prompts[i], references, _sent(job, prompts[i], references)))[0]
+
+    outcomes = await run_async(_one, list(range(len(prompts))), workers, batch_timeout)
+    log_stats(engine, settings)
+    return outcomes
+
+
+def log_stats(engine: Engine, settings: GenerationSettings) -> None:
+    """Print the shared pools' counters after a run."""
+    stats = pool_stats()
+    print(f"Gemini client pool: {stats['created']} created, {stats['reused']} reused")
+    if Engine._cache_mode(settings) != "Bypass":
+        cstats = get_cache().stats()
+        print(f"Gemini response cache: {cstats['hits']} hits, {cstats['misses']} misses, "
+              f"{cstats['entries']} entries, {cstats['bytes'] / 1e6:.1f} MB")
+    if engine.key_pool is not None:
+        for label, kstats in engine.key_pool.stats().items():
+            print(f"Gemini key {label}: {kstats['requests']} requests, {kstats['throttles']} throttled"
+                  + (" (quarantined)" if kstats['quarantined'] else ""))
+    fstats = get_singleflight().stats()
+    if fstats["coalesced"]:
+        print(f"Gemini single-flight: {fstats['coalesced']} identical requests coalesced so far")
+    sstats = get_scheduler().stats()
+    if sstats['retries'] or sstats['throttled_seconds']:
+        print(f"Gemini scheduler: {sstats['retries']} retries, "
+              f"{sstats['throttled_seconds']:.1f}s throttled, {sstats['backoff_seconds']:.1f}s backing off")
+
+
+# -- node runs ----------------------------------------------------------------
+
+
+@dataclass
+class NodeRun:
+    """Outputs of one node run and what to show the user, rendered by either front-end.
+
+    V1 nodes return :meth:`v1` (the message was already printed); V3 nodes
+    add a Notification for ``message``, or a preview of the ``saved``
+    originals or of the ``preview`` IMAGE.
+    """
+
+    outputs: tuple
+    message: str = ""
+    level: str = "error"
+    preview: object = None
+    saved: list = field(default_factory=list)
+
+    def v1(self):
+        if self.saved:
+            return {"ui": {"images": self.saved}, "result": self.outputs}
+        return self.outputs
+
+
+def failed(error: Exception, *outputs) -> NodeRun:
+    """The error policy of every node: Interrupt stops the queue, any other failure is reported in the outputs."""
+    if is_interrupt(error):
+        raise error
+    print(f"Gemini error: {error}")
+    return NodeRun(outputs, str(error))
+
+
+def fallback_image():
+    """Black frame for a failed run; None when the dependencies (torch) are missing."""
+    try:
+        load_dependencies()
+    except DependencyError:
+        return None
+    return placeholder()
+
+
+def generator_run(result: BatchResult, output_mode: str, filename_prefix: str) -> NodeRun:
+    """Shape a generator run: a failed single request is an error, failures within a batch a warning."""
+    outputs = (result.image, result.text)
+    if len(result.jobs) == 1 and result.problems:
+        return NodeRun(outputs, result.problems[0])
+    # Preview/save the bytes Gemini sent instead of re-encoding the tensor
+    saved = write_originals(result.originals, output_mode, filename_prefix)
+    if result.problems:
+        # Keep the successful items; report failed ones by batch index
+        message = f"{len(result.problems)} of {len(result.jobs)} requests failed:\n" + "\n".join(result.problems)
+        return NodeRun(outputs, message, "warning", saved=saved)
+    return NodeRun(outputs, preview=result.image, saved=saved)
+
+
+def open_session(model: str, api_key: str, session_name: str, system_instruction: str = "",
+                 reset: bool = False) -> NodeRun:
+    """Handle for a named (or new) chat session; the chat itself is created by its first turn."""
+    session_id = session_name.strip() or uuid.uuid4().hex[:12]
+    try:
+        api_key = get_key_store().resolve(api_key)
+        if not api_key:
+            raise ValueError(API_KEY_REQUIRED)
+    except Exception as e:
+        return failed(e, None)
+    store = get_session_store()
+    if reset:
+        store.reset(session_id)
+    stats = store.stats()
+    print(f"Gemini session '{session_id}' ready ({model}, {stats['turns'].get(session_id, 0)} turns so far); "
+          f"{stats['sessions']} sessions kept, {stats['created']} started, {stats['evicted']} evicted")
+    return NodeRun((SessionHandle(session_id, model, system_instruction.strip(), api_key),))
+
+
+def run_bulk_file(settings: GenerationSettings, prompt_file: str, api_key: str, output_dir: str = "",
+                  workers: int = DEFAULT_BATCH_WORKERS, resume: bool = True, key_strategy: str = "Single Key",
+                  timeout_seconds: float = DEFAULT_TIMEOUT) -> NodeRun:
+    """Generate every row of a prompt file to disk; blocks until done (V3 runs it in a thread)."""
+    prompt_file = prompt_file.strip().strip('"')
+    output_dir = output_dir.strip()
+    try:
+        if not os.path.isfile(prompt_file):
+            raise ValueError(f"Prompt file not found: {prompt_file}")
+        output_dir = output_dir or default_output_dir(prompt_file)
+        # Same engine as the generator: pooled client, key pool, scheduler, response cache and single-flight
+        engine = Engine.connect(get_key_store().resolve(api_key), key_strategy, timeout_seconds)
+        rows = read_rows(prompt_file)
+        print(f"Gemini bulk: {len(rows)} rows from {prompt_file} -> {output_dir} ({workers} workers)")
+        summary = run_bulk(rows, make_generate(engine, settings), output_dir, workers, resume,
+                           progress_callback(len(rows)), make_fingerprint(settings))
+    except Exception as e:
+        return failed(e, str(e), output_dir)
+    text = describe_bulk(summary, output_dir)
+    print(text)
+    if summary["failed"]:
+        return NodeRun((text, output_dir), f"{summary['failed']} of {summary['total']} rows failed", "warning")
+    return NodeRun((text, output_dir))
+
+
+def _sweep(template: str, variables: str, aspect_ratio: str, max_combinations: int,
+           sample_seed: int) -> tuple[list[str], list[str]]:
+    """Prompts and aspect ratios of every combination (or the seeded sample) of a sweep."""
+    values = parse_variables(variables)
+    check_template(template, values)
+    combos = expand(values, max_combinations, sample_seed)
+    print(f"Gemini sweep: {len(combos)} of {combination_count(values)} combinations")
+    return [render(template, combo) for combo in combos], [combo.get(ASPECT_VARIABLE, aspect_ratio) for combo in combos]
+
+
+def _swept(prompts: list[str], outcomes) -> NodeRun:
+    problems = [f"[{i}] {prompts[i]!r}: {error}" for i, (_, error) in enumerate(outcomes) if error is not None]
+    for problem in problems:
+        print(f"Gemini sweep {problem}")
+    # Failed combinations become one black frame each, and a combination that returned several
+    # images repeats its prompt once per image, so the prompt list lines up with the batch
+    image = stack_results([tensor for tensor, _ in outcomes])
+    labels = [prompt for prompt, (tensor, _) in zip(prompts, outcomes)
+              for _ in range(1 if tensor is None else int(tensor.shape[0]))]
+    if problems:
+        message = f"{len(problems)} of {len(prompts)} combinations failed:\n" + "\n".join(problems)
+        return NodeRun((image, labels), message, "warning")
+    return NodeRun((image, labels), preview=image)
+
+
+def run_sweep(settings: GenerationSettings, api_key: str, template: str, variables: str, max_combinations: int = 0,
+              sample_seed: int = 0, workers: int = DEFAULT_BATCH_WORKERS, reference_images=None,
+              timeout_seconds: float = DEFAULT_TIMEOUT) -> NodeRun:
+    """Generate every combination of a prompt template; outputs are the images and their prompts, in order."""
+    try:
+        prompts, aspect_ratios = _sweep(template, variables, settings.aspect_ratio, max_combinations, sample_seed)
+        engine = Engine.connect(get_key_store().resolve(api_key), timeout_seconds=timeout_seconds)
+        references = encode_references(reference_images, settings.aspect_ratio, "Original", "PNG", DEFAULT_QUALITY,
+                                       workers=workers)
+        outcomes = run_prompts(engine, settings, prompts, aspect_ratios, references, workers)
+        return _swept(prompts, outcomes)
+    except Exception as e:
+        return failed(e, fallback_image(), [])
+
+
+async def arun_sweep(settings: GenerationSettings, api_key: str, template: str, variables: str,
+                     max_combinations: int = 0, sample_seed: int = 0, workers: int = DEFAULT_BATCH_WORKERS,
+                     reference_images=None, timeout_seconds: float = DEFAULT_TIMEOUT) -> NodeRun:
+    """Awaitable :func:`run_sweep`."""
+    try:
+        prompts, aspect_ratios = _sweep(template, variables, settings.aspect_ratio, max_combinations, sample_seed)
+        engine = Engine.connect(get_key_store().resolve(api_key), timeout_seconds=timeout_seconds)
+        references = await asyncio.to_thread(
+            encode_references, reference_images, settings.aspect_ratio, "Original", "PNG", DEFAULT_QUALITY, workers,
+        )
+        outcomes = await arun_prompts(engine, settings, prompts, aspect_ratios, references, workers)
+        return await asyncio.to_thread(_swept, prompts, outcomes)
+    except Exception as e:
+        return failed(e, fallback_image(), [])
+
+
+def _batch_requests(settings: GenerationSettings, prompts: str, reference_images) -> list[dict]:
+    # prompt_lines falls back to the whole text, so an empty prompt must be caught before it is billed
+    if not prompts.strip():
+        raise ValueError("At least one prompt line is required")
+    lines = prompt_lines(prompts)
+    references = encode_references(reference_images, settings.aspect_ratio, "Original", "PNG", DEFAULT_QUALITY)
+    return build_requests(lines, references, settings.response_modalities, settings.aspect_ratio)
+
+
+def _submitted(settings: GenerationSettings, job, count: int, api_key: str) -> NodeRun:
+    print(f"Gemini batch {job.name}: submitted {count} requests ({state_name(job)})")
+    return NodeRun((BatchJobHandle(name=job.name, model=settings.model, count=count, api_key=api_key), job.name))
+
+
+def submit_batch_job(settings: GenerationSettings, api_key: str, prompts: str, reference_images=None,
+                     display_name: str = "") -> NodeRun:
+    """Submit one Batch API job with a request per prompt line; outputs are the job handle and its name."""
+    try:
+        api_key = get_key_store().resolve(api_key)
+        engine = Engine.connect(api_key)
+        requests = _batch_requests(settings, prompts, reference_images)
+        job = submit(engine.client, settings.model, requests, display_name.strip())
+    except Exception as e:
+        return failed(e, None, "")
+    return _submitted(settings, job, len(requests), api_key)
+
+
+async def asubmit_batch_job(settings: GenerationSettings, api_key: str, prompts: str, reference_images=None,
+                            display_name: str = "") -> NodeRun:
+    """Awaitable :func:`submit_batch_job`."""
+    try:
+        api_key = get_key_store().resolve(api_key)
+        engine = Engine.connect(api_key)
+        requests = await asyncio.to_thread(_batch_requests, settings, prompts, reference_images)
+        job = await asubmit(engine.client, settings.model, requests, display_name.strip())
+    except Exception as e:
+        return failed(e, None, "")
+    return _submitted(settings, job, len(requests), api_key)
+
+
+def _batch_target(job: BatchJobHandle | None, job_name: str, api_key: str):
+    """Job name and client for a connected handle, or for a job name and key."""
+    name = job.name if job is not None else job_name.strip()
+    if not name:
+        raise ValueError("Connect a batch job or enter a job name")
+    key = job.api_key if job is not None else get_key_store().resolve(api_key)
+    return name, Engine.connect(key).client
+
+
+def _collected(state) -> NodeRun:
+    results = job_results(state) if is_done(state) else []
+    status = describe_batch(state, results)
+    print(status)
+    images = result_images(results)
+    if not images:
+        return NodeRun((fallback_image(), status), status, "warning")
+    image = decode_batch(images)
+    return NodeRun((image, status), preview=image)
+
+
+def collect_batch_job(wait: bool, timeout_minutes: int, job: BatchJobHandle | None = None, job_name: str = "",
+                      api_key: str = "") -> NodeRun:
+    """Poll a Batch API job (until done or the timeout, or once) and decode its images into one batch."""
+    try:
+        name, client = _batch_target(job, job_name, api_key)
+        state = wait_for(client, name, timeout_minutes * 60 if wait else 0, DEFAULT_POLL_SECONDS)
+        return _collected(state)
+    except Exception as e:
+        return failed(e, fallback_image(), str(e))
+
+
+async def acollect_batch_job(wait: bool, timeout_minutes: int, job: BatchJobHandle | None = None,
+                             job_name: str = "", api_key: str = "") -> NodeRun:
+    """Awaitable :func:`collect_batch_job`; waiting between polls leaves the event loop free."""
+    try:
+        name, client = _batch_target(job, job_name, api_key)
+        state = await await_job(client, name, timeout_minutes * 60 if wait else 0, DEFAULT_POLL_SECONDS)
+        return await asyncio.to_thread(_collected, state)
+    except Exception as e:
+        return failed(e, fallback_image(), str(e))
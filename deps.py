@@ -0,0 +1,109 @@
+"""One-time, cached resolution of the node's runtime dependencies.
+
+google-genai, numpy, torch and Pillow are resolved on first use, exactly
+once per process, and the outcome is cached, including failure and its
+reason. If the ComfyUI venv lacks them, common Windows system Python
+site-packages are tried once. Nothing is ever installed from inside an
+execution; ``install.py`` (run by ComfyUI-Manager) and ``requirements.txt``
+cover installation.
+
+Keeping this out of module import lets ``__init__.py`` register the nodes
+without importing torch or google-genai at ComfyUI startup.
+"""
+
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Dependencies:
+    genai: object
+    types: object
+    np: object
+    torch: object
+    Image: object
+
+
+class DependencyError(ImportError):
+    """Raised (from the cache) when the runtime dependencies are unavailable."""
+
+
+_lock = threading.Lock()
+_outcome: Dependencies | DependencyError | None = None
+
+
+def install_command() -> str:
+    return f"{sys.executable} -m pip install google-genai pillow numpy torch"
+
+
+def _system_site_packages() -> list[str]:
+    """Common Windows system Python site-packages, for a venv missing the deps."""
+    candidates = []
+    localapp = os.environ.get("LOCALAPPDATA")
+    if localapp:
+        py_root = os.path.join(localapp, "Programs", "Python")
+        if os.path.isdir(py_root):
+            for d in os.listdir(py_root):
+                sp = os.path.join(py_root, d, "Lib", "site-packages")
+                if os.path.isdir(sp):
+                    candidates.append(sp)
+    # Per-user installs (pip --user)
+    appdata_roam = os.environ.get("APPDATA")
+    if appdata_roam:
+        for ver in ("Python312", "Python311", "Python310", "Python39", "Python38"):
+            sp = os.path.join(appdata_roam, "Python", ver, "site-packages")
+            if os.path.isdir(sp):
+                candidates.append(sp)
+    program_files = os.environ.get("ProgramFiles")
+    if program_files:
+        for ver in ("Python312", "Python311", "Python310", "Python39", "Python38"):
+            sp = os.path.join(program_files, ver, "Lib", "site-packages")
+            if os.path.isdir(sp):
+                candidates.append(sp)
+    return candidates
+
+
+def _import() -> Dependencies:
+    from google import genai  # type: ignore
+    from google.genai import types  # type: ignore
+    import numpy as np  # type: ignore
+    import torch  # type: ignore
+    from PIL import Image  # type: ignore
+
+    return Dependencies(genai=genai, types=types, np=np, torch=torch, Image=Image)
+
+
+def _resolve() -> Dependencies | DependencyError:
+    try:
+        return _import()
+    except Exception as first:
+        added = [sp for sp in _system_site_packages() if sp not in sys.path]
+        if not added:
+            return DependencyError(
+                f"Missing dependencies ({first}).\n"
+                f"Run manually in the ComfyUI venv:\n\n{install_command()}\n"
+            )
+        # Prepend so they take precedence
+        for sp in reversed(added):
+            sys.path.insert(0, sp)
+        try:
+            return _import()
+        except Exception as second:
+            return DependencyError(
+                f"Missing dependencies ({second}); system site-packages did not help.\n"
+                f"Run manually in the ComfyUI venv:\n\n{install_command()}\n"
+            )
+
+
+def load() -> Dependencies:
+    """Return the resolved dependencies, or raise the cached DependencyError."""
+    global _outcome
+    if _outcome is None:
+        with _lock:
+            if _outcome is None:
+                _outcome = _resolve()
+    if isinstance(_outcome, DependencyError):
+        raise _outcome
+    return _outcome
@@ -0,0 +1,247 @@
+"""Offline stand-in for the google-genai client.
+
+Selected with ``GEMINI_BACKEND=fake``; :func:`client_pool.get_client` then
+hands out :class:`FakeClient` objects instead of ``genai.Client``. The fake
+answers ``models.generate_content`` / ``generate_content_stream``, their
+``aio`` variants, ``chats`` and inline ``batches`` with canned PNG parts, so
+the whole request path (pool, scheduler, cache, streaming, decoding) can be
+exercised and benchmarked without network access or an API key quota.
+
+Behaviour is tuned with environment variables:
+
+    GEMINI_FAKE_LATENCY_MS   simulated response latency (default 200)
+    GEMINI_FAKE_JITTER_MS    uniform jitter added to the latency (default 0)
+    GEMINI_FAKE_ERROR_RATE   fraction of calls failing with HTTP 503 (default 0)
+    GEMINI_FAKE_IMAGE_SIZE   edge length of the returned PNG in pixels (default 1024)
+    GEMINI_FAKE_BATCH_SECONDS  time a batch job stays running (default 5)
+"""
+
+import asyncio
+import itertools
+import os
+import random
+import threading
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+
+class FakeAPIError(Exception):
+    """Mimics ``google.genai.errors.APIError`` closely enough for the scheduler."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.details = {}
+        self.response = None
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+class FakeSettings:
+    def __init__(self, latency_ms=None, jitter_ms=None, error_rate=None, image_size=None):
+        self.latency_ms = _env_float("GEMINI_FAKE_LATENCY_MS", 200) if latency_ms is None else latency_ms
+        self.jitter_ms = _env_float("GEMINI_FAKE_JITTER_MS", 0) if jitter_ms is None else jitter_ms
+        self.error_rate = _env_float("GEMINI_FAKE_ERROR_RATE", 0) if error_rate is None else error_rate
+        self.image_size = int(_env_float("GEMINI_FAKE_IMAGE_SIZE", 1024)) if image_size is None else image_size
+        self.batch_seconds = _env_float("GEMINI_FAKE_BATCH_SECONDS", 5)
+
+    def delay(self) -> float:
+        return (self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000.0
+
+
+_png_cache: dict[int, bytes] = {}
+_png_lock = threading.Lock()
+
+
+def canned_png(size: int) -> bytes:
+    """Noise PNG of ``size`` x ``size``; noise keeps the payload close to a real image's size."""
+    with _png_lock:
+        data = _png_cache.get(size)
+        if data is None:
+            import numpy as np  # type: ignore
+            from PIL import Image  # type: ignore
+
+            pixels = np.random.default_rng(size).integers(0, 256, (size, size, 3), dtype=np.uint8)
+            buf = BytesIO()
+            Image.fromarray(pixels).save(buf, format="PNG", compress_level=1)
+            data = _png_cache[size] = buf.getvalue()
+        return data
+
+
+def _candidate_count(config) -> int:
+    return max(1, getattr(config, "candidate_count", None) or 1)
+
+
+def _image_part(data: bytes):
+    return SimpleNamespace(text=None, inline_data=SimpleNamespace(data=data, mime_type="image/png"))
+
+
+def _text_part(text: str):
+    return SimpleNamespace(text=text, inline_data=None)
+
+
+def _candidate(index: int, parts):
+    return SimpleNamespace(index=index, content=SimpleNamespace(parts=parts))
+
+
+def _response(candidates, tokens: int):
+    return SimpleNamespace(candidates=candidates, usage_metadata=SimpleNamespace(total_token_count=tokens))
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        delay, response = self._client._prepare(config)
+        time.sleep(delay)
+        return response
+
+    def generate_content_stream(self, model, contents, config=None):
+        delay, response = self._client._prepare(config)
+        # Text first, then each candidate's image, spread over the latency
+        chunks = self._client._chunks(response)
+        for chunk in chunks:
+            time.sleep(delay / len(chunks))
+            yield chunk
+
+
+class _FakeAsyncModels:
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+
+    async def generate_content(self, model, contents, config=None):
+        delay, response = self._client._prepare(config)
+        await asyncio.sleep(delay)
+        return response
+
+    async def generate_content_stream(self, model, contents, config=None):
+        delay, response = self._client._prepare(config)
+        chunks = self._client._chunks(response)
+
+        async def _iterate():
+            for chunk in chunks:
+                await asyncio.sleep(delay / len(chunks))
+                yield chunk
+
+        return _iterate()
+
+
+class _FakeChat:
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+        self.history = []
+
+    def send_message(self, message, config=None):
+        response = self._client.models.generate_content(model=None, contents=message, config=config)
+        self.history.append(message)
+        return response
+
+    def send_message_stream(self, message, config=None):
+        yield from self._client.models.generate_content_stream(model=None, contents=message, config=config)
+        self.history.append(message)
+
+
+class _FakeChats:
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+
+    def create(self, model, config=None, history=None):
+        return _FakeChat(self._client)
+
+
+class _FakeBatches:
+    """``client.batches`` for inline jobs: running for ``batch_seconds``, then succeeded."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+        self._jobs = {}
+        self._finished = {}
+
+    def create(self, model, src, config=None):
+        name = f"batches/fake-{next(self._ids)}"
+        self._jobs[name] = (time.monotonic(), list(src))
+        return SimpleNamespace(name=name, state=SimpleNamespace(name="JOB_STATE_PENDING"), dest=None)
+
+    def get(self, name):
+        if name not in self._jobs:
+            raise FakeAPIError(404, f"{name} not found (simulated)")
+        created, src = self._jobs[name]
+        if time.monotonic() - created < self._client.settings.batch_seconds:
+            return SimpleNamespace(name=name, state=SimpleNamespace(name="JOB_STATE_RUNNING"), dest=None)
+        if name in self._finished:
+            return self._finished[name]
+        responses = []
+        for request in src:
+            try:
+                _, response = self._client._prepare(SimpleNamespace(**(request.get("config") or {})))
+                responses.append(SimpleNamespace(response=response, error=None))
+            except FakeAPIError as e:
+                responses.append(SimpleNamespace(response=None, error=SimpleNamespace(message=str(e))))
+        job = self._finished[name] = SimpleNamespace(
+            name=name,
+            state=SimpleNamespace(name="JOB_STATE_SUCCEEDED"),
+            dest=SimpleNamespace(inlined_responses=responses),
+        )
+        return job
+
+
+class _FakeAsyncBatches:
+    def __init__(self, batches: _FakeBatches):
+        self._batches = batches
+
+    async def create(self, model, src, config=None):
+        return self._batches.create(model, src, config)
+
+    async def get(self, name):
+        return self._batches.get(name)
+
+
+class FakeClient:
+    """Drop-in for ``genai.Client`` covering the calls the nodes make."""
+
+    def __init__(self, api_key: str = "", settings: FakeSettings | None = None):
+        self.api_key = api_key
+        self.settings = settings or FakeSettings()
+        self.models = _FakeModels(self)
+        self.chats = _FakeChats(self)
+        self.batches = _FakeBatches(self)
+        self.aio = SimpleNamespace(models=_FakeAsyncModels(self), batches=_FakeAsyncBatches(self.batches))
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def _prepare(self, config):
+        """Count the call, maybe fail it, and build the response it will return."""
+        with self._lock:
+            self.calls += 1
+            failed = random.random() < self.settings.error_rate
+            if failed:
+                self.errors += 1
+        if failed:
+            raise FakeAPIError(503, "UNAVAILABLE (simulated)")
+        png = canned_png(self.settings.image_size)
+        candidates = [
+            _candidate(i, [_text_part("fake image"), _image_part(png)]) for i in range(_candidate_count(config))
+        ]
+        return self.settings.delay(), _response(candidates, 1290 * len(candidates))
+
+    @staticmethod
+    def _chunks(response):
+        chunks = []
+        for candidate in response.candidates:
+            for part in candidate.content.parts:
+                chunks.append(_response([_candidate(candidate.index, [part])], 0))
+        chunks[-1].usage_metadata = response.usage_metadata
+        return chunks
+
+    def close(self) -> None:
+        pass
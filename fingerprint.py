@@ -0,0 +1,107 @@
+"""Stable request fingerprints shared by caching layers.
+
+A fingerprint is a hex digest over the normalized request: model, prompt,
+generation options, seed and the digests of any reference images. The same
+digests back ComfyUI's own execution cache (``IS_CHANGED`` on the V1 node,
+``fingerprint_inputs`` on the V3 node), so an unchanged node is skipped
+before it ever reaches the network.
+"""
+
+import hashlib
+import json
+
+
+def bytes_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def tensor_digest(tensor) -> str:
+    """Cheap digest of an IMAGE tensor (or numpy array) without a full CPU copy.
+
+    Contiguous CPU tensors are hashed in place through their numpy view.
+    Tensors on an accelerator are reduced on the device to per-row,
+    per-column and per-channel sums and only that small signature is
+    transferred.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    shape = tuple(getattr(tensor, "shape", ()))
+    h.update(f"{shape}:{getattr(tensor, 'dtype', '')}".encode("utf-8"))
+    try:
+        import torch  # type: ignore
+    except Exception:
+        torch = None
+    if torch is not None and isinstance(tensor, torch.Tensor):
+        t = tensor.detach()
+        if t.device.type == "cpu":
+            try:
+                h.update(memoryview(t.contiguous().numpy()).cast("B"))
+                return h.hexdigest()
+            except (TypeError, RuntimeError):
+                # e.g. bfloat16 has no numpy equivalent
+                t = t.float()
+                h.update(memoryview(t.contiguous().numpy()).cast("B"))
+                return h.hexdigest()
+        f = t.float()
+        if f.dim() == 4:
+            sig = torch.cat([
+                f.sum(dim=(2, 3)).flatten(),
+                f.sum(dim=(1, 3)).flatten(),
+                f.sum(dim=(1, 2)).flatten(),
+            ])
+        else:
+            sig = f.flatten()
+        h.update(sig.cpu().numpy().tobytes())
+        return h.hexdigest()
+    import numpy as np  # type: ignore
+
+    h.update(np.ascontiguousarray(tensor).tobytes())
+    return h.hexdigest()
+
+
+def request_fingerprint(
+    model: str,
+    prompt: str,
+    aspect_ratio: str,
+    response_modalities: str,
+    seed=None,
+    image_digests: list[str] | tuple[str, ...] = (),
+    **options,
+) -> str:
+    """Return a hex digest identifying a request; extra options are included."""
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "aspect_ratio": aspect_ratio,
+        "response_modalities": response_modalities,
+        "seed": seed,
+        "images": list(image_digests),
+        "options": options,
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def input_fingerprint(
+    prompt: str,
+    model: str,
+    aspect_ratio: str,
+    response_modalities: str,
+    api_key: str = "",
+    seed=None,
+    image=None,
+    **options,
+) -> str:
+    """Fingerprint of a node's inputs for ComfyUI's execution cache.
+
+    The key only enters as a digest, so a changed key still re-runs the node.
+    """
+    return request_fingerprint(
+        model,
+        prompt,
+        aspect_ratio,
+        response_modalities,
+        seed,
+        [tensor_digest(image)] if image is not None else [],
+        api_key=bytes_digest(api_key.encode("utf-8")) if api_key else "",
+        **options,
+    )
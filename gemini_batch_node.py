@@ -0,0 +1,129 @@
+from .batch_jobs import BATCH_JOB_TYPE
+from .core import GenerationSettings, collect_batch_job, submit_batch_job
+from .options import ASPECT_RATIOS, DEFAULT_ASPECT_RATIO, DEFAULT_MODEL, DEFAULT_PROMPT, MODELS, RESPONSE_MODALITIES
+
+# torch and google-genai are imported lazily on first execution
+
+
+class GeminiBatchSubmit:
+    """
+    Packages every prompt line into one Gemini Batch API job and returns its
+    handle immediately. Connect the job to a Gemini Batch Collect node.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "prompts": ("STRING", {
+                    "multiline": True,
+                    "default": DEFAULT_PROMPT
+                }),
+                "model": (MODELS, {
+                    "default": DEFAULT_MODEL
+                }),
+                "aspect_ratio": (ASPECT_RATIOS, {
+                    "default": DEFAULT_ASPECT_RATIO
+                }),
+                "response_modalities": (RESPONSE_MODALITIES, {
+                    "default": "Image"
+                }),
+                "api_key": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+            },
+            "optional": {
+                "reference_images": ("IMAGE",),
+                "display_name": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+            },
+        }
+
+    RETURN_TYPES = (BATCH_JOB_TYPE, "STRING",)
+    RETURN_NAMES = ("job", "job_name",)
+    FUNCTION = "submit_batch"
+    CATEGORY = "Custom API Node/Image/Gemini"
+
+    def submit_batch(self, prompts, model, aspect_ratio, response_modalities, api_key, reference_images=None,
+                     display_name=""):
+        """
+        Submit one batch job with a request per prompt line
+
+        Args:
+            prompts: One prompt per non-empty line
+            model: Which Gemini model to use
+            aspect_ratio: Aspect ratio for every generated image
+            response_modalities: Whether to return just image or text + image
+            api_key: Google AI API key; empty uses the saved/environment key, "@name" a named key
+            reference_images: Optional images sent with every request
+            display_name: Optional job name shown in Google AI Studio
+
+        Returns:
+            Tuple of (job, job_name)
+        """
+        settings = GenerationSettings(model, aspect_ratio, response_modalities)
+        return submit_batch_job(settings, api_key, prompts, reference_images, display_name).v1()
+
+
+class GeminiBatchCollect:
+    """
+    Waits for a Gemini Batch API job (polling with backoff) and returns every
+    generated image as one IMAGE batch. With wait disabled it checks once and
+    reports the state, so the workflow can be queued again later.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "wait": ("BOOLEAN", {
+                    "default": True
+                }),
+                "timeout_minutes": ("INT", {
+                    "default": 60,
+                    "min": 0,
+                    "max": 24 * 60
+                }),
+            },
+            "optional": {
+                "job": (BATCH_JOB_TYPE,),
+                "job_name": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+                "api_key": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+            },
+        }
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # The job's state changes server side; always check again
+        return float("nan")
+
+    RETURN_TYPES = ("IMAGE", "STRING",)
+    RETURN_NAMES = ("image", "status",)
+    FUNCTION = "collect_batch"
+    CATEGORY = "Custom API Node/Image/Gemini"
+    OUTPUT_NODE = True
+
+    def collect_batch(self, wait, timeout_minutes, job=None, job_name="", api_key=""):
+        """
+        Collect the images of a batch job
+
+        Args:
+            wait: Poll until the job finishes (up to timeout_minutes); otherwise check once
+            timeout_minutes: Longest time to wait
+            job: Job handle from Gemini Batch Submit
+            job_name: Name of an earlier job ("batches/..."), used when no handle is connected
+            api_key: Key for job_name; empty uses the saved/environment key, "@name" a named key
+
+        Returns:
+            Tuple of (image_tensor, status)
+        """
+        return collect_batch_job(wait, timeout_minutes, job, job_name, api_key).v1()
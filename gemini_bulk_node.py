@@ -0,0 +1,106 @@
+from .batching import DEFAULT_BATCH_WORKERS, MAX_BATCH_WORKERS
+from .cancellation import DEFAULT_TIMEOUT, default_timeout
+from .core import GenerationSettings, run_bulk_file
+from .key_pool import KEY_STRATEGIES
+from .options import ASPECT_RATIOS, DEFAULT_ASPECT_RATIO, DEFAULT_MODEL, MODELS, RESPONSE_MODALITIES
+from .response_cache import CACHE_MODES
+
+# google-genai is resolved lazily by deps.load() on first execution
+
+
+class GeminiBulkGenerator:
+    """
+    Generates one request per row of a prompt file (.txt, .csv or .jsonl),
+    saving images to disk as they complete. Rerunning over the same output
+    directory resumes where the previous run stopped.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "prompt_file": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+                "model": (MODELS, {
+                    "default": DEFAULT_MODEL
+                }),
+                "aspect_ratio": (ASPECT_RATIOS, {
+                    "default": DEFAULT_ASPECT_RATIO
+                }),
+                "response_modalities": (RESPONSE_MODALITIES, {
+                    "default": "Image"
+                }),
+                "api_key": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+            },
+            "optional": {
+                "output_dir": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+                "workers": ("INT", {
+                    "default": DEFAULT_BATCH_WORKERS,
+                    "min": 1,
+                    "max": MAX_BATCH_WORKERS
+                }),
+                "resume": ("BOOLEAN", {
+                    "default": True
+                }),
+                "cache_mode": (CACHE_MODES, {
+                    "default": "Use Cache"
+                }),
+                "key_strategy": (KEY_STRATEGIES, {
+                    "default": "Single Key"
+                }),
+                "timeout_seconds": ("INT", {
+                    "default": default_timeout(),
+                    "min": 0,
+                    "max": 3600
+                }),
+            },
+        }
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # The prompt file and output directory change outside the graph; always run (resume makes it cheap)
+        return float("nan")
+
+    RETURN_TYPES = ("STRING", "STRING",)
+    RETURN_NAMES = ("summary", "output_dir",)
+    FUNCTION = "generate_bulk"
+    CATEGORY = "Custom API Node/Image/Gemini"
+    OUTPUT_NODE = True
+
+    def generate_bulk(self, prompt_file, model, aspect_ratio, response_modalities, api_key, output_dir="",
+                      workers=DEFAULT_BATCH_WORKERS, resume=True, cache_mode="Use Cache", key_strategy="Single Key",
+                      timeout_seconds=DEFAULT_TIMEOUT):
+        """
+        Generate images for every row of a prompt file
+
+        Args:
+            prompt_file: Path to a .txt (one prompt per line), .csv or .jsonl prompt file
+            model: Default model; a row's "model" column overrides it
+            aspect_ratio: Default aspect ratio; a row's "aspect_ratio" column overrides it
+            response_modalities: Whether to return just image or text + image
+            api_key: Google AI API key; empty uses the saved/environment key, "@name" a named key
+            output_dir: Where images and manifest.jsonl go; empty uses output/gemini_bulk/<file name>
+            workers: Maximum concurrent requests
+            resume: Skip rows the manifest already records as done
+            cache_mode: Use Cache replays identical requests from disk, Refresh re-requests, Bypass skips the cache
+            key_strategy: Single Key, or spread requests over the key pool (Round Robin / Least Throttled)
+            timeout_seconds: Deadline for each request attempt, 0 for none
+
+        Returns:
+            Tuple of (summary, output_dir)
+        """
+        settings = GenerationSettings(
+            model, aspect_ratio, response_modalities, cache_mode=cache_mode, node="v1",
+            labels={"batch_mode": "Bulk"},
+        )
+        return run_bulk_file(
+            settings, prompt_file, api_key, output_dir, workers, resume, key_strategy, timeout_seconds,
+        ).v1()
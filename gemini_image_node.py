@@ -1,53 +1,33 @@
-import os
-import json
-import torch
-import numpy as np
-from PIL import Image
-from io import BytesIO
-# Optional: google-genai; guard so import errors don't break ComfyUI load
-try:
-    from google import genai  # type: ignore
-    from google.genai import types  # type: ignore
-except Exception:  # pragma: no cover - best-effort fallback for loader
-    genai = None  # type: ignore
-    types = None  # type: ignore
+from .batching import BATCH_MODES, DEFAULT_BATCH_WORKERS, MAX_BATCH_WORKERS
+from .cancellation import DEFAULT_TIMEOUT, default_timeout
+from .core import Engine, GenerationSettings, failed, fallback_image, generator_run, run_batch
+from .fingerprint import input_fingerprint, tensor_digest
+from .key_pool import KEY_STRATEGIES
+from .key_store import get_key_store
+from .options import ASPECT_RATIOS, DEFAULT_ASPECT_RATIO, DEFAULT_MODEL, DEFAULT_PROMPT, MODELS, RESPONSE_MODALITIES
+from .output_buffer import DEFAULT_BUDGET_MB
+from .raw_output import DEFAULT_PREFIX, OUTPUT_MODES
+from .response_cache import CACHE_MODES
+from .response_parts import MAX_CANDIDATES
+from .sessions import SESSION_TYPE
+from .upload_encoder import DEFAULT_QUALITY, REFERENCE_FORMATS, REFERENCE_RESIZE
+
+# torch, numpy, Pillow and google-genai are resolved lazily by deps.load() so
+# registering this node does not import them at ComfyUI startup
+
 
 class GeminiImageGenerator:
     """
     A ComfyUI node for generating images using Google Gemini Flash 2.5 Image models.
     """
     
-    def __init__(self):
-        self.config_file = os.path.join(os.path.dirname(__file__), "config.json")
-        self.client = None
-        
     def _load_api_key(self):
-        """Load API key from config file"""
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    return config.get('api_key', '')
-            except Exception as e:
-                print(f"Error loading config: {e}")
-        return ''
+        """Load API key from the in-memory key store (config.json, then environment)"""
+        return get_key_store().load_api_key()
     
     def _save_api_key(self, api_key):
-        """Save API key to config file"""
-        try:
-            config = {'api_key': api_key}
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=4)
-        except Exception as e:
-            print(f"Error saving config: {e}")
-    
-    def _initialize_client(self, api_key):
-        """Initialize Gemini client with API key"""
-        if api_key:
-            os.environ['GOOGLE_API_KEY'] = api_key
-            self.client = genai.Client(api_key=api_key)
-            return True
-        return False
+        """Save API key to config file, only if it changed"""
+        get_key_store().save_api_key(api_key)
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -55,15 +35,15 @@ class GeminiImageGenerator:
             "required": {
                 "prompt": ("STRING", {
                     "multiline": True,
-                    "default": "Create a beautiful landscape with mountains and a sunset"
+                    "default": DEFAULT_PROMPT
                 }),
-                "model": (["gemini-2.5-flash-image", "gemini-2.5-flash-image-preview"], {
-                    "default": "gemini-2.5-flash-image"
+                "model": (MODELS, {
+                    "default": DEFAULT_MODEL
                 }),
-                "aspect_ratio": (["1:1", "3:4", "4:3", "9:16", "16:9"], {
-                    "default": "1:1"
+                "aspect_ratio": (ASPECT_RATIOS, {
+                    "default": DEFAULT_ASPECT_RATIO
                 }),
-                "response_modalities": (["Image", "Text and Image"], {
+                "response_modalities": (RESPONSE_MODALITIES, {
                     "default": "Image"
                 }),
                 "api_key": ("STRING", {
@@ -76,21 +56,105 @@ class GeminiImageGenerator:
             },
             "optional": {
                 "image": ("IMAGE",),
+                "reference_images": ("IMAGE",),
                 "seed": ("INT", {
                     "default": 0,
                     "min": 0,
                     "max": 0xffffffffffffffff
                 }),
+                "batch_mode": (BATCH_MODES, {
+                    "default": "Off"
+                }),
+                "batch_workers": ("INT", {
+                    "default": DEFAULT_BATCH_WORKERS,
+                    "min": 1,
+                    "max": MAX_BATCH_WORKERS
+                }),
+                "cache_mode": (CACHE_MODES, {
+                    "default": "Use Cache"
+                }),
+                "reference_resize": (REFERENCE_RESIZE, {
+                    "default": "Original"
+                }),
+                "reference_format": (REFERENCE_FORMATS, {
+                    "default": "PNG"
+                }),
+                "reference_quality": ("INT", {
+                    "default": DEFAULT_QUALITY,
+                    "min": 1,
+                    "max": 100
+                }),
+                "stream": ("BOOLEAN", {
+                    "default": False
+                }),
+                "candidate_count": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": MAX_CANDIDATES
+                }),
+                "key_strategy": (KEY_STRATEGIES, {
+                    "default": "Single Key"
+                }),
+                "session": (SESSION_TYPE,),
+                "output_mode": (OUTPUT_MODES, {
+                    "default": "Preview Tensor"
+                }),
+                "filename_prefix": ("STRING", {
+                    "default": DEFAULT_PREFIX
+                }),
+                "timeout_seconds": ("INT", {
+                    "default": default_timeout(),
+                    "min": 0,
+                    "max": 3600
+                }),
+                "batch_timeout_seconds": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 24 * 3600
+                }),
+                "memory_budget_mb": ("INT", {
+                    "default": DEFAULT_BUDGET_MB,
+                    "min": 0,
+                    "max": 1024 * 1024
+                }),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
             }
         }
     
+    @classmethod
+    def IS_CHANGED(cls, prompt, model, aspect_ratio, response_modalities, api_key, save_api_key=True,
+                   seed=0, image=None, batch_mode="Off", batch_workers=DEFAULT_BATCH_WORKERS,
+                   cache_mode="Use Cache", reference_resize="Original", reference_format="PNG",
+                   reference_quality=DEFAULT_QUALITY, reference_images=None, candidate_count=1, **kwargs):
+        """Fingerprint the inputs so ComfyUI can skip the node when nothing changed"""
+        if cache_mode == "Refresh":
+            # NaN never equals itself, so a refresh always re-executes
+            return float("nan")
+        return input_fingerprint(
+            prompt, model, aspect_ratio, response_modalities, api_key, seed, image,
+            batch_mode=batch_mode,
+            reference=(reference_resize, reference_format, reference_quality),
+            reference_images=tensor_digest(reference_images) if reference_images is not None else None,
+            candidate_count=candidate_count,
+            session=getattr(kwargs.get("session"), "session_id", None),
+            output=(kwargs.get("output_mode", "Preview Tensor"), kwargs.get("filename_prefix", DEFAULT_PREFIX)),
+        )
+
     RETURN_TYPES = ("IMAGE", "STRING",)
     RETURN_NAMES = ("image", "text_response",)
     FUNCTION = "generate_image"
     CATEGORY = "Custom API Node/Image/Gemini"
     OUTPUT_NODE = True
     
-    def generate_image(self, prompt, model, aspect_ratio, response_modalities, api_key, save_api_key, seed=0, image=None):
+    def generate_image(self, prompt, model, aspect_ratio, response_modalities, api_key, save_api_key, seed=0, image=None,
+                       batch_mode="Off", batch_workers=DEFAULT_BATCH_WORKERS, cache_mode="Use Cache",
+                       reference_resize="Original", reference_format="PNG", reference_quality=DEFAULT_QUALITY,
+                       reference_images=None, stream=False, candidate_count=1, key_strategy="Single Key",
+                       session=None, output_mode="Preview Tensor", filename_prefix=DEFAULT_PREFIX,
+                       timeout_seconds=DEFAULT_TIMEOUT, batch_timeout_seconds=0,
+                       memory_budget_mb=DEFAULT_BUDGET_MB, unique_id=None):
         """
         Generate an image using Gemini Flash 2.5 Image models
         
@@ -102,128 +166,54 @@ class GeminiImageGenerator:
             api_key: Google AI API key
             save_api_key: Whether to save the API key for future use
             seed: Random seed (note: Gemini API doesn't use seeds, included for workflow compatibility)
+            image: Optional reference image batch
+            batch_mode: Whether each input image and/or prompt line becomes its own request
+            batch_workers: Maximum concurrent requests in batch mode
+            cache_mode: Use Cache replays identical requests from disk, Refresh re-requests and overwrites, Bypass skips the cache
+            reference_resize: Downscale reference images to the output size of the aspect ratio before upload
+            reference_format: Upload encoding for reference images (PNG, JPEG or WEBP)
+            reference_quality: JPEG/WEBP quality for reference images
+            reference_images: Optional extra reference images; every frame is sent with every request
+            stream: Stream the response, decoding images as they arrive and showing text progressively
+            candidate_count: Number of candidates to request; every image of every candidate is returned
+            key_strategy: Single Key, or spread requests over the key pool (Round Robin / Least Throttled)
+            session: Optional chat session; the prompt and images are sent as its next turn
+            output_mode: Preview Original / Save Original show (and save) the bytes Gemini returned, not a re-encode
+            filename_prefix: File name prefix for Save Original
+            timeout_seconds: Deadline for each request attempt, 0 for none
+            batch_timeout_seconds: Deadline for all requests of the run, 0 for none; unfinished ones return errors
+            memory_budget_mb: Host memory for decoded results, 0 for unlimited; the rest is staged on disk
+            unique_id: Node id supplied by ComfyUI, used for progress text
         
         Returns:
-            Tuple of (image_tensor, text_response)
+            Tuple of (image_tensor, text_response), wrapped with UI previews when output_mode writes originals
         """
         
         try:
-            # Load saved API key if current one is empty
-            if not api_key:
-                api_key = self._load_api_key()
-            # Save API key if requested
+            # Save API key if requested (a no-op unless it changed)
             if save_api_key and api_key:
                 self._save_api_key(api_key)
+            # Empty falls back to the saved/environment key; "@name" selects a named key
+            api_key = get_key_store().resolve(api_key)
 
-            global genai, types
-            if genai is None or types is None:
-                import sys, os
-                candidates = []
-                localapp = os.environ.get("LOCALAPPDATA")
-                if localapp:
-                    py_root = os.path.join(localapp, "Programs", "Python")
-                    if os.path.isdir(py_root):
-                        for d in os.listdir(py_root):
-                            sp = os.path.join(py_root, d, "Lib", "site-packages")
-                            if os.path.isdir(sp):
-                                candidates.append(sp)
-                program_files = os.environ.get("ProgramFiles")
-                if program_files:
-                    for ver in ("Python312","Python311","Python310","Python39","Python38"):
-                        sp = os.path.join(program_files, ver, "Lib", "site-packages")
-                        if os.path.isdir(sp):
-                            candidates.append(sp)
-                for sp in candidates:
-                    if sp not in sys.path:
-                        sys.path.insert(0, sp)
-                try:
-                    from google import genai as _genai  # type: ignore
-                    from google.genai import types as _types  # type: ignore
-                    genai = _genai
-                    types = _types
-                except Exception as e:
-                    # Final fallback: try to install into current env
-                    try:
-                        import sys, subprocess
-                        subprocess.check_call([sys.executable, "-m", "pip", "install", "google-genai"])  # minimal
-                        from google import genai as _genai  # type: ignore
-                        from google.genai import types as _types  # type: ignore
-                        genai = _genai
-                        types = _types
-                    except Exception as e2:
-                        raise ImportError(
-                            "google-genai is not installed and auto-install failed. "
-                            "Run: python -m pip install google-genai"
-                        ) from e2
-
-            # Initialize client
-            if not self._initialize_client(api_key):
-                raise ValueError("API key is required. Please provide a Google AI API key.")
-            # Configure response modalities
-            modalities = ['Image'] if response_modalities == "Image" else ['Text', 'Image']
-            
-            # Create generation config
-            config = types.GenerateContentConfig(
-                response_modalities=modalities,
-                image_config=types.ImageConfig(
-                    aspect_ratio=aspect_ratio
-                )
+            settings = GenerationSettings(
+                model, aspect_ratio, response_modalities,
+                seed=seed, candidate_count=candidate_count, cache_mode=cache_mode, stream=stream,
+                session=session, node_id=unique_id, node="v1",
             )
-            
-            # Generate content
-            print(f"Generating image with Gemini {model}...")
-            print(f"Prompt: {prompt}")
-            print(f"Aspect Ratio: {aspect_ratio}")
-            
-            # Build contents list: prompt plus optional image
-            contents = [prompt]
-            if image is not None:
-                # Convert Comfy tensor [B,H,W,C] float32 0..1 to PIL
-                try:
-                    img_np = (image[0].clamp(0, 1).cpu().numpy() * 255.0).astype(np.uint8)
-                except Exception:
-                    img_np = (np.array(image)[0] * 255.0).astype(np.uint8)
-                pil_in = Image.fromarray(img_np)
-                contents = [prompt, pil_in]
-
-            response = self.client.models.generate_content(
-                model=model,
-                contents=contents,
-                config=config
+            engine = Engine.connect(api_key, key_strategy, timeout_seconds, session)
+            result = run_batch(
+                engine, settings, prompt, image, reference_images,
+                batch_mode=batch_mode,
+                batch_workers=batch_workers,
+                reference=(reference_resize, reference_format, reference_quality),
+                batch_timeout=batch_timeout_seconds,
+                memory_budget_mb=memory_budget_mb,
             )
-            
-            # Extract image and text from response
-            image_tensor = None
-            text_response = ""
-            
-            for part in response.candidates[0].content.parts:
-                if part.text is not None:
-                    text_response += part.text
-                    print(f"Text response: {part.text}")
-                elif part.inline_data is not None:
-                    # Convert image data to tensor
-                    image_data = part.inline_data.data
-                    pil_image = Image.open(BytesIO(image_data))
-                    
-                    # Convert PIL image to ComfyUI tensor format [B, H, W, C]
-                    image_np = np.array(pil_image).astype(np.float32) / 255.0
-                    if len(image_np.shape) == 2:  # Grayscale
-                        image_np = np.stack([image_np] * 3, axis=-1)
-                    image_tensor = torch.from_numpy(image_np).unsqueeze(0)
-                    
-                    print(f"Generated image size: {pil_image.size}")
-            
-            if image_tensor is None:
-                raise ValueError("No image was generated by the model")
-            
-            return (image_tensor, text_response if text_response else "Image generated successfully")
-        
+            return generator_run(result, output_mode, filename_prefix).v1()
         except Exception as e:
-            error_msg = f"Error generating image: {str(e)}"
-            print(error_msg)
-            
-            # Return a black placeholder image with error text
-            placeholder = torch.zeros((1, 512, 512, 3), dtype=torch.float32)
-            return (placeholder, error_msg)
+            # A black placeholder (none if torch itself is missing) with the error text; Interrupt propagates
+            return failed(e, fallback_image(), f"Error generating image: {e}").v1()
+
 
 # Note: NODE_CLASS_MAPPINGS are defined in __init__.py
@@ -0,0 +1,61 @@
+from .core import open_session
+from .options import DEFAULT_MODEL, MODELS
+from .sessions import SESSION_TYPE
+
+# google-genai is resolved lazily when the session's first turn is sent
+
+
+class GeminiChatSession:
+    """
+    Opens a multi-turn Gemini chat. Connect the session output to a Gemini
+    Image Generator: each run then sends only its prompt and images as the
+    next turn, and the model keeps the earlier turns as context.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "model": (MODELS, {
+                    "default": DEFAULT_MODEL
+                }),
+                "api_key": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+                "session_name": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+            },
+            "optional": {
+                "system_instruction": ("STRING", {
+                    "multiline": True,
+                    "default": ""
+                }),
+                "reset": ("BOOLEAN", {
+                    "default": False
+                }),
+            },
+        }
+
+    RETURN_TYPES = (SESSION_TYPE,)
+    RETURN_NAMES = ("session",)
+    FUNCTION = "open_session"
+    CATEGORY = "Custom API Node/Image/Gemini"
+
+    def open_session(self, model, api_key, session_name, system_instruction="", reset=False):
+        """
+        Create a session handle
+
+        Args:
+            model: Model the chat talks to
+            api_key: Google AI API key; empty uses the saved/environment key, "@name" a named key
+            session_name: Stable name to keep one conversation across runs; empty starts a new one per run
+            system_instruction: Optional system instruction for the whole conversation
+            reset: Drop the named session's history and start over
+
+        Returns:
+            Tuple of (session,)
+        """
+        return open_session(model, api_key, session_name, system_instruction, reset).v1()
@@ -0,0 +1,118 @@
+from .batching import DEFAULT_BATCH_WORKERS, MAX_BATCH_WORKERS
+from .cancellation import DEFAULT_TIMEOUT, default_timeout
+from .core import GenerationSettings, run_sweep
+from .options import ASPECT_RATIOS, DEFAULT_ASPECT_RATIO, DEFAULT_MODEL, MODELS, RESPONSE_MODALITIES
+from .response_cache import CACHE_MODES
+from .sweep import DEFAULT_VARIABLES
+
+# torch and google-genai are resolved lazily on first execution
+
+
+class GeminiPromptSweep:
+    """
+    Expands a prompt template over lists of variable values (Cartesian
+    product, optionally sampled) and generates every combination
+    concurrently on the Gemini Image Generator's request engine (core.py).
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "template": ("STRING", {
+                    "multiline": True,
+                    "default": "{subject} painted in {style}"
+                }),
+                "variables": ("STRING", {
+                    "multiline": True,
+                    "default": DEFAULT_VARIABLES
+                }),
+                "model": (MODELS, {
+                    "default": DEFAULT_MODEL
+                }),
+                "aspect_ratio": (ASPECT_RATIOS, {
+                    "default": DEFAULT_ASPECT_RATIO
+                }),
+                "response_modalities": (RESPONSE_MODALITIES, {
+                    "default": "Image"
+                }),
+                "api_key": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+            },
+            "optional": {
+                "max_combinations": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 10000
+                }),
+                "sample_seed": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 0xffffffffffffffff
+                }),
+                "workers": ("INT", {
+                    "default": DEFAULT_BATCH_WORKERS,
+                    "min": 1,
+                    "max": MAX_BATCH_WORKERS
+                }),
+                "cache_mode": (CACHE_MODES, {
+                    "default": "Use Cache"
+                }),
+                "reference_images": ("IMAGE",),
+                "timeout_seconds": ("INT", {
+                    "default": default_timeout(),
+                    "min": 0,
+                    "max": 3600
+                }),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
+            }
+        }
+
+    @classmethod
+    def IS_CHANGED(cls, cache_mode="Use Cache", **kwargs):
+        # Refresh always re-requests; otherwise ComfyUI's own input comparison decides
+        return float("nan") if cache_mode == "Refresh" else ""
+
+    RETURN_TYPES = ("IMAGE", "STRING",)
+    RETURN_NAMES = ("image", "prompts",)
+    OUTPUT_IS_LIST = (False, True,)
+    FUNCTION = "generate_sweep"
+    CATEGORY = "Custom API Node/Image/Gemini"
+
+    def generate_sweep(self, template, variables, model, aspect_ratio, response_modalities, api_key,
+                       max_combinations=0, sample_seed=0, workers=DEFAULT_BATCH_WORKERS, cache_mode="Use Cache",
+                       reference_images=None, timeout_seconds=DEFAULT_TIMEOUT, unique_id=None):
+        """
+        Generate one image per template combination
+
+        Args:
+            template: Prompt with {name} placeholders
+            variables: One "name = value | value" line per variable; "aspect_ratio" sets the request's aspect ratio
+            model: Which Gemini model to use
+            aspect_ratio: Aspect ratio unless the variables sweep aspect_ratio
+            response_modalities: Whether to return just image or text + image
+            api_key: Google AI API key; empty uses the saved/environment key, "@name" a named key
+            max_combinations: Generate a seeded random sample of this many combinations, 0 for all
+            sample_seed: Seed for the sample
+            workers: Maximum concurrent requests
+            cache_mode: Use Cache replays identical requests from disk, Refresh re-requests, Bypass skips the cache
+            reference_images: Optional images sent with every request
+            timeout_seconds: Deadline for each request attempt, 0 for none
+            unique_id: Node id supplied by ComfyUI, used for progress text
+
+        Returns:
+            Tuple of (image_batch, prompts) with one prompt per image, in the same order
+        """
+        # Same engine as the generator: pooled client, scheduler, response cache and single-flight
+        settings = GenerationSettings(
+            model, aspect_ratio, response_modalities, cache_mode=cache_mode, node_id=unique_id, node="v1",
+            labels={"batch_mode": "Sweep"},
+        )
+        return run_sweep(
+            settings, api_key, template, variables, max_combinations, sample_seed, workers, reference_images,
+            timeout_seconds,
+        ).v1()
@@ -0,0 +1,111 @@
+"""Tensor <-> image conversion shared by the V1 and V3 nodes.
+
+ComfyUI IMAGE tensors are float32 ``[B,H,W,C]`` in 0..1. The naive round
+trip (``np.array(pil).astype(np.float32) / 255.0`` and
+``(t.clamp(0, 1).cpu().numpy() * 255.0).astype(np.uint8)``) makes several
+full-size float copies per image. Here the heavy lifting stays in uint8:
+
+* decoding copies pixels into one preallocated uint8 batch buffer and
+  converts it to float once (``.to(float32).div_(255)``, in place);
+* encoding scales on the tensor's own device in place and transfers uint8,
+  a quarter of the float bytes.
+
+Every decoded image is normalized to RGB, whatever mode (grayscale, LA,
+RGBA, palette, CMYK) the model returned.
+"""
+
+import time
+from io import BytesIO
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import torch  # type: ignore
+
+
+def open_rgb(data: bytes):
+    """Decode encoded image bytes into an RGB PIL image."""
+    from PIL import Image  # type: ignore
+
+    img = Image.open(BytesIO(data))
+    img.load()
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+
+def pils_to_tensor(images: list) -> "torch.Tensor":
+    """Stack RGB PIL images into a float32 ``[B,H,W,3]`` tensor.
+
+    Images of different sizes are zero-padded (bottom/right) to the largest.
+    """
+    import numpy as np  # type: ignore
+    import torch  # type: ignore
+
+    height = max(img.size[1] for img in images)
+    width = max(img.size[0] for img in images)
+    mismatched = any(img.size != (width, height) for img in images)
+    alloc = np.zeros if mismatched else np.empty
+    buf = alloc((len(images), height, width, 3), dtype=np.uint8)
+    for i, img in enumerate(images):
+        w, h = img.size
+        buf[i, :h, :w] = np.asarray(img)
+    return torch.from_numpy(buf).to(torch.float32).div_(255.0)
+
+
+def decode_batch(datas: list[bytes], workers: int = 4, metrics=None) -> "torch.Tensor":
+    """Decode encoded images into one float32 ``[B,H,W,3]`` batch.
+
+    Several images are decoded in parallel; Pillow's codecs release the GIL.
+    ``metrics`` (a :class:`metrics.RequestMetrics`) receives the decode and
+    tensor build spans.
+    """
+    start = time.perf_counter()
+    if len(datas) > 1 and workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(datas)), thread_name_prefix="gemini-decode") as pool:
+            images = list(pool.map(open_rgb, datas))
+    else:
+        images = [open_rgb(data) for data in datas]
+    decoded = time.perf_counter()
+    tensor = pils_to_tensor(images)
+    if metrics is not None:
+        metrics.add_span("decode", decoded - start)
+        metrics.add_span("tensor", time.perf_counter() - decoded)
+    return tensor
+
+
+def decode_to_tensor(data: bytes) -> "torch.Tensor":
+    """Decode one encoded image into a float32 ``[1,H,W,3]`` tensor."""
+    return decode_batch([data])
+
+
+def tensor_to_uint8(image, index: int | None = None):
+    """Convert an IMAGE tensor (or one frame of it) to a uint8 numpy array.
+
+    Returns ``[H,W,C]`` for a frame and ``[B,H,W,C]`` for the whole batch.
+    """
+    import numpy as np  # type: ignore
+
+    try:
+        import torch  # type: ignore
+    except Exception:
+        torch = None
+    if torch is not None and isinstance(image, torch.Tensor):
+        t = image.detach()
+        if index is not None:
+            t = t[index]
+        # clamp() allocates once; scale that copy in place and move uint8
+        return t.clamp(0, 1).mul_(255.0).to(torch.uint8).cpu().numpy()
+    arr = np.asarray(image)
+    if index is not None:
+        arr = arr[index]
+    return (np.clip(arr, 0, 1) * 255.0).astype(np.uint8)
+
+
+def tensor_to_pil(image, index: int = 0):
+    """Convert one frame of an IMAGE tensor to a PIL image."""
+    from PIL import Image  # type: ignore
+
+    arr = tensor_to_uint8(image, index)
+    if arr.ndim == 3 and arr.shape[-1] == 1:
+        arr = arr[..., 0]
+    return Image.fromarray(arr)
@@ -0,0 +1,25 @@
+"""Install hook run by ComfyUI-Manager after cloning or updating this node.
+
+Dependencies are installed here, at install time, instead of from inside a
+node execution. Only google-genai is installed: torch, numpy and Pillow
+come with ComfyUI, and reinstalling torch from PyPI could replace the
+venv's CUDA build with a CPU-only one.
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+PACKAGES = ("google-genai",)
+
+
+def _requirements() -> list[str]:
+    """Lines of requirements.txt for ``PACKAGES``, so the version pins live in one place."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "requirements.txt")
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if re.split(r"[<>=!~\[;\s]", line, maxsplit=1)[0] in PACKAGES]
+
+
+subprocess.check_call([sys.executable, "-m", "pip", "install", *(_requirements() or PACKAGES)])
@@ -0,0 +1,184 @@
+"""Load balancing across several API keys.
+
+A single key caps throughput at that key's per-minute quota. The pool
+spreads requests over every configured key, either round-robin or to the
+key that was throttled least recently. A key answering 429 or 403 is
+quarantined for its Retry-After (or a default) and routed around; the
+scheduler then retries immediately on another key instead of waiting.
+
+Keys come from config.json (``api_key`` and the named ``api_keys``), the
+``GEMINI_API_KEYS`` environment variable (comma separated) and the key
+entered in the node.
+"""
+
+import os
+import threading
+import time
+
+from .client_pool import get_client
+from .scheduler import retry_after, status_code
+
+KEY_STRATEGIES = ["Single Key", "Round Robin", "Least Throttled"]
+QUARANTINE_CODES = {403, 429}
+DEFAULT_QUARANTINE = 60.0
+
+
+def _label(key: str) -> str:
+    return f"...{key[-4:]}" if len(key) > 8 else "key"
+
+
+class _KeyState:
+    __slots__ = ("label", "requests", "throttles", "failures", "quarantined_until", "last_throttled")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.requests = 0
+        self.throttles = 0
+        self.failures = 0
+        self.quarantined_until = 0.0
+        self.last_throttled = 0.0
+
+
+class KeyPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: dict[str, _KeyState] = {}
+        self._order: list[str] = []
+        self._next = 0
+
+    def sync(self, keys: dict[str, str]) -> None:
+        """Make ``keys`` (label -> key) the active set, keeping known keys' history."""
+        with self._lock:
+            order = []
+            for label, key in keys.items():
+                if key and key not in order:
+                    order.append(key)
+                    if key not in self._states:
+                        self._states[key] = _KeyState(f"{label} ({_label(key)})")
+            self._order = order
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._order)
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._order)
+
+    def acquire(self, strategy: str = "Round Robin") -> str:
+        """Pick the key for the next attempt, skipping quarantined keys."""
+        with self._lock:
+            if not self._order:
+                raise ValueError("API key is required. Please provide a Google AI API key.")
+            now = time.monotonic()
+            ready = [k for k in self._order if self._states[k].quarantined_until <= now]
+            if not ready:
+                # Everything is cooling down; use whichever key frees up first
+                key = min(self._order, key=lambda k: self._states[k].quarantined_until)
+            elif strategy == "Least Throttled":
+                key = min(ready, key=lambda k: (self._states[k].last_throttled, self._states[k].requests))
+            else:
+                key = None
+                for _ in range(len(self._order)):
+                    candidate = self._order[self._next % len(self._order)]
+                    self._next += 1
+                    if candidate in ready:
+                        key = candidate
+                        break
+                key = key or ready[0]
+            self._states[key].requests += 1
+            return key
+
+    def report_error(self, key: str, exc: BaseException) -> None:
+        code = status_code(exc)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            state.failures += 1
+            if code in QUARANTINE_CODES:
+                now = time.monotonic()
+                state.throttles += 1
+                state.last_throttled = now
+                state.quarantined_until = now + (retry_after(exc) or DEFAULT_QUARANTINE)
+                print(f"Gemini key {state.label} quarantined after HTTP {code}")
+
+    def can_switch(self, exc: BaseException) -> bool:
+        """True if ``exc`` quarantined a key and another key is ready."""
+        if status_code(exc) not in QUARANTINE_CODES:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            return any(self._states[k].quarantined_until <= now for k in self._order)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                self._states[k].label: {
+                    "requests": self._states[k].requests,
+                    "throttles": self._states[k].throttles,
+                    "failures": self._states[k].failures,
+                    "quarantined": self._states[k].quarantined_until > now,
+                }
+                for k in self._order
+            }
+
+
+_POOLS: dict[tuple[str, ...], KeyPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_key_pool(store, node_key: str = "") -> KeyPool:
+    """Return the pool for the currently configured keys.
+
+    Pools are kept per key set, so runs with different node keys never swap
+    each other's keys out mid-run, and a key set seen before keeps its
+    quarantine and request history.
+    """
+    keys = {}
+    if node_key:
+        keys["node"] = node_key
+    default = store.load_api_key()
+    if default:
+        keys.setdefault("default", default)
+    for name, key in store.named_keys().items():
+        keys[name] = key
+    for i, key in enumerate(k.strip() for k in os.environ.get("GEMINI_API_KEYS", "").split(",")):
+        if key:
+            keys[f"env{i}"] = key
+    key_set = tuple(dict.fromkeys(key for key in keys.values() if key))
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key_set)
+        if pool is None:
+            pool = _POOLS[key_set] = KeyPool()
+            pool.sync(keys)
+    return pool
+
+
+def keyed_attempt(pool: KeyPool, strategy: str, request, http_options: dict | None = None):
+    """Wrap ``request(client)`` so each scheduler attempt draws a key from the pool."""
+
+    def attempt():
+        key = pool.acquire(strategy)
+        try:
+            return request(get_client(key, http_options))
+        except Exception as e:
+            pool.report_error(key, e)
+            raise
+
+    return attempt
+
+
+def akeyed_attempt(pool: KeyPool, strategy: str, request, http_options: dict | None = None):
+    """Async variant of :func:`keyed_attempt`; ``request(client)`` returns an awaitable."""
+
+    async def attempt():
+        key = pool.acquire(strategy)
+        try:
+            return await request(get_client(key, http_options))
+        except Exception as e:
+            pool.report_error(key, e)
+            raise
+
+    return attempt
@@ -0,0 +1,119 @@
+"""In-memory API key store backed by config.json.
+
+config.json used to be parsed on every run and rewritten on every run with
+``save_api_key`` enabled, a disk write per image and a race between
+concurrent runs. The store instead keeps the parsed config in memory,
+reloads it only when the file's mtime or size changes, and writes only when
+the key actually changes, atomically (temp file + rename).
+
+Besides the single ``api_key``, config.json may hold named keys::
+
+    {"api_key": "...", "api_keys": {"project-a": "...", "project-b": "..."}}
+
+A node's ``api_key`` field set to ``@project-a`` uses that named key. With
+no key in the node or config.json, ``GEMINI_API_KEY`` or ``GOOGLE_API_KEY``
+from the environment is used.
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+ENV_VARS = ("GEMINI_API_KEY", "GOOGLE_API_KEY")
+
+
+class KeyStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._config: dict = {}
+        self._stamp: tuple | None = None
+
+    def _config_locked(self) -> dict:
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        if stamp != self._stamp:
+            config = {}
+            if stamp is not None:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        config = json.load(f)
+                except Exception as e:
+                    print(f"Error loading config: {e}")
+            self._config = config if isinstance(config, dict) else {}
+            self._stamp = stamp
+        return self._config
+
+    def load_api_key(self) -> str:
+        """Default key: config.json, then the environment."""
+        with self._lock:
+            key = self._config_locked().get("api_key", "")
+        if key:
+            return key
+        for name in ENV_VARS:
+            if os.environ.get(name):
+                return os.environ[name]
+        return ""
+
+    def named_keys(self) -> dict[str, str]:
+        with self._lock:
+            keys = self._config_locked().get("api_keys", {})
+        return dict(keys) if isinstance(keys, dict) else {}
+
+    def resolve(self, api_key: str) -> str:
+        """Turn a node's ``api_key`` input into an actual key."""
+        api_key = (api_key or "").strip()
+        if not api_key:
+            return self.load_api_key()
+        if api_key.startswith("@"):
+            key = self.named_keys().get(api_key[1:], "")
+            if not key:
+                raise ValueError(f"No API key named '{api_key[1:]}' in config.json")
+            return key
+        return api_key
+
+    def save_api_key(self, api_key: str) -> None:
+        """Persist ``api_key`` as the default key if it differs from the stored one."""
+        if not api_key or api_key.startswith("@"):
+            return
+        with self._lock:
+            config = self._config_locked()
+            if config.get("api_key") == api_key:
+                return
+            updated = dict(config, api_key=api_key)
+            try:
+                directory = os.path.dirname(self.path) or "."
+                fd, tmp = tempfile.mkstemp(dir=directory, prefix=".config.", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(updated, f, indent=4)
+                    os.replace(tmp, self.path)
+                except Exception:
+                    try:
+                        os.remove(tmp)
+                    except OSError:
+                        pass
+                    raise
+            except Exception as e:
+                print(f"Error saving config: {e}")
+                return
+            self._config = updated
+            st = os.stat(self.path)
+            self._stamp = (st.st_mtime_ns, st.st_size)
+
+
+_STORE: KeyStore | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_key_store() -> KeyStore:
+    """Return the process-wide key store for this node's config.json."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = KeyStore(os.path.join(os.path.dirname(__file__), "config.json"))
+        return _STORE
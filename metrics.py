@@ -0,0 +1,222 @@
+"""Per-request timing spans and a process-wide metrics registry.
+
+Each generation request gets a :class:`RequestMetrics` that records how long
+each stage took (input encoding, request serialization, network, decode,
+tensor build), the bytes uploaded and downloaded, the token usage from
+``usage_metadata`` and, for streamed requests, the time to first chunk. When the request finishes it is printed as one JSON log
+line prefixed with ``[Gemini metrics]`` and folded into the registry, which
+both nodes share.
+
+The registry is readable in-process via :func:`snapshot` and, inside
+ComfyUI, in Prometheus text format at ``GET /gemini/metrics`` on the
+ComfyUI server. Set ``GEMINI_METRICS_LOG=0`` to silence the log lines.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+STAGES = ("encode", "serialize", "network", "decode", "tensor")
+TOKEN_FIELDS = ("prompt_token_count", "candidates_token_count", "total_token_count")
+
+
+def _log_enabled() -> bool:
+    return os.environ.get("GEMINI_METRICS_LOG", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+class RequestMetrics:
+    """Timing spans and counters for one request."""
+
+    def __init__(self, node: str, model: str = "", **labels):
+        self.node = node
+        self.model = model
+        self.labels = labels
+        self.spans: dict[str, float] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.images = 0
+        self.tokens: dict[str, int] = {}
+        self.cached = False
+        self.coalesced = False
+        self.streamed = False
+        # Seconds from opening a stream to its first chunk; None when not streamed
+        self.ttfb: float | None = None
+        self.error: str | None = None
+        self.started = time.perf_counter()
+
+    def add_span(self, stage: str, seconds: float) -> None:
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(stage, time.perf_counter() - start)
+
+    def add_usage(self, usage_metadata) -> None:
+        """Copy token counts from a response's ``usage_metadata``, if present."""
+        for name in TOKEN_FIELDS:
+            value = getattr(usage_metadata, name, None)
+            if isinstance(value, int):
+                self.tokens[name.replace("_token_count", "")] = value
+
+    def as_dict(self) -> dict:
+        return {
+            "node": self.node,
+            "model": self.model,
+            **self.labels,
+            "cached": self.cached,
+            "coalesced": self.coalesced,
+            "streamed": self.streamed,
+            "total_s": round(time.perf_counter() - self.started, 4),
+            "spans_s": {stage: round(seconds, 4) for stage, seconds in self.spans.items()},
+            "ttfb_s": None if self.ttfb is None else round(self.ttfb, 4),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "images": self.images,
+            "tokens": self.tokens,
+            "error": self.error,
+        }
+
+    def finish(self, error: BaseException | None = None) -> dict:
+        """Log the request as one JSON line and add it to the registry."""
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        record = self.as_dict()
+        _REGISTRY.record(record)
+        if _log_enabled():
+            print(f"[Gemini metrics] {json.dumps(record, sort_keys=True)}")
+        return record
+
+
+class MetricsRegistry:
+    """Thread-safe running totals over every finished request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self.requests: dict[tuple, int] = {}
+        self.stage_seconds: dict[str, float] = {stage: 0.0 for stage in STAGES}
+        self.stage_count: dict[str, int] = {stage: 0 for stage in STAGES}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.images = 0
+        self.tokens: dict[str, int] = {}
+        self.request_seconds = 0.0
+        self.ttfb_seconds = 0.0
+        self.ttfb_count = 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def record(self, record: dict) -> None:
+        if record["error"]:
+            outcome = "error"
+        elif record["cached"]:
+            outcome = "cached"
+        elif record["coalesced"]:
+            outcome = "coalesced"
+        else:
+            outcome = "ok"
+        key = (record["node"], outcome)
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for stage, seconds in record["spans_s"].items():
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+                self.stage_count[stage] = self.stage_count.get(stage, 0) + 1
+            self.bytes_sent += record["bytes_sent"]
+            self.bytes_received += record["bytes_received"]
+            self.images += record["images"]
+            for name, value in record["tokens"].items():
+                self.tokens[name] = self.tokens.get(name, 0) + value
+            self.request_seconds += record["total_s"]
+            if record["ttfb_s"] is not None:
+                self.ttfb_seconds += record["ttfb_s"]
+                self.ttfb_count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": {f"{node}/{outcome}": n for (node, outcome), n in self.requests.items()},
+                "stage_seconds": dict(self.stage_seconds),
+                "stage_count": dict(self.stage_count),
+                "request_seconds": self.request_seconds,
+                "ttfb_seconds": self.ttfb_seconds,
+                "ttfb_count": self.ttfb_count,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "images": self.images,
+                "tokens": dict(self.tokens),
+            }
+
+    def prometheus_text(self) -> str:
+        snap = self.snapshot()
+        lines = [
+            "# HELP gemini_requests_total Finished Gemini requests by node and outcome.",
+            "# TYPE gemini_requests_total counter",
+        ]
+        for key, n in sorted(snap["requests"].items()):
+            node, outcome = key.split("/")
+            lines.append(f'gemini_requests_total{{node="{node}",outcome="{outcome}"}} {n}')
+        lines += [
+            "# HELP gemini_stage_seconds_total Time spent per request stage.",
+            "# TYPE gemini_stage_seconds_total counter",
+        ]
+        for stage, seconds in sorted(snap["stage_seconds"].items()):
+            lines.append(f'gemini_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}')
+        lines += [
+            "# HELP gemini_stage_observations_total Requests that went through each stage.",
+            "# TYPE gemini_stage_observations_total counter",
+        ]
+        for stage, n in sorted(snap["stage_count"].items()):
+            lines.append(f'gemini_stage_observations_total{{stage="{stage}"}} {n}')
+        lines += [
+            "# TYPE gemini_request_seconds_total counter",
+            f"gemini_request_seconds_total {snap['request_seconds']:.6f}",
+            "# HELP gemini_ttfb_seconds_total Time to first chunk of streamed requests.",
+            "# TYPE gemini_ttfb_seconds_total counter",
+            f"gemini_ttfb_seconds_total {snap['ttfb_seconds']:.6f}",
+            "# TYPE gemini_ttfb_observations_total counter",
+            f"gemini_ttfb_observations_total {snap['ttfb_count']}",
+            "# TYPE gemini_bytes_sent_total counter",
+            f"gemini_bytes_sent_total {snap['bytes_sent']}",
+            "# TYPE gemini_bytes_received_total counter",
+            f"gemini_bytes_received_total {snap['bytes_received']}",
+            "# TYPE gemini_images_total counter",
+            f"gemini_images_total {snap['images']}",
+            "# TYPE gemini_tokens_total counter",
+        ]
+        for name, value in sorted(snap["tokens"].items()):
+            lines.append(f'gemini_tokens_total{{kind="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+_REGISTRY = MetricsRegistry()
+
+
+def snapshot() -> dict:
+    return _REGISTRY.snapshot()
+
+
+def register_route() -> bool:
+    """Serve the registry at ``GET /gemini/metrics`` on the ComfyUI server, if running inside one."""
+    try:
+        from aiohttp import web  # type: ignore
+        from server import PromptServer  # type: ignore
+
+        routes = PromptServer.instance.routes
+    except Exception:
+        return False
+
+    @routes.get("/gemini/metrics")
+    async def _metrics(request):
+        return web.Response(text=_REGISTRY.prometheus_text(), content_type="text/plain", charset="utf-8")
+
+    return True
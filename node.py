@@ -1,9 +1,43 @@
 from comfy_api.latest import ComfyExtension, io
 from comfy_api.latest import ui as comfy_ui
 
-import os
-import json
-from io import BytesIO
+import asyncio
+
+from .batching import BATCH_MODES, DEFAULT_BATCH_WORKERS, MAX_BATCH_WORKERS
+from .batch_jobs import BATCH_JOB_TYPE, BatchJobHandle
+from .cancellation import DEFAULT_TIMEOUT, default_timeout
+from .core import (
+    Engine,
+    GenerationSettings,
+    NodeRun,
+    acollect_batch_job,
+    arun_batch,
+    arun_sweep,
+    asubmit_batch_job,
+    failed,
+    fallback_image,
+    generator_run,
+    open_session,
+    run_bulk_file,
+)
+from .fingerprint import input_fingerprint, tensor_digest
+from .key_pool import KEY_STRATEGIES
+from .key_store import get_key_store
+from .options import (
+    ASPECT_RATIOS,
+    DEFAULT_ASPECT_RATIO,
+    DEFAULT_MODEL,
+    DEFAULT_PROMPT,
+    MODELS,
+    RESPONSE_MODALITIES,
+)
+from .output_buffer import DEFAULT_BUDGET_MB
+from .raw_output import DEFAULT_PREFIX, OUTPUT_MODES
+from .response_cache import CACHE_MODES
+from .response_parts import MAX_CANDIDATES
+from .sessions import SESSION_TYPE, SessionHandle
+from .sweep import DEFAULT_VARIABLES
+from .upload_encoder import DEFAULT_QUALITY, REFERENCE_FORMATS, REFERENCE_RESIZE
 
 """Gemini Image Generator V3 node.
 
@@ -11,7 +45,7 @@ This file avoids heavy imports at module load to ensure Comfy can import
 the extension even if dependencies aren't installed yet.
 """
 
-# google-genai is imported lazily in execute()
+# google-genai, torch, numpy and Pillow are resolved lazily by deps.load()
 
 
 NODE_CATEGORY = "Gemini"
@@ -19,6 +53,21 @@ NODE_CATEGORY = "Gemini"
 DISPLAY_NAME = "Gemini Image Generator (Custom API)"
 
 
+def _output(cls, run: NodeRun) -> io.NodeOutput:
+    """Render a node run from core.py: a notification for its message, otherwise a preview."""
+    if run.message:
+        ui = comfy_ui.Notification(title="Gemini API", message=run.message, level=run.level)
+    elif run.saved:
+        ui = comfy_ui.SavedImages([
+            comfy_ui.SavedResult(p["filename"], p["subfolder"], io.FolderType(p["type"])) for p in run.saved
+        ])
+    elif run.preview is not None:
+        ui = comfy_ui.PreviewImage(run.preview, cls=cls)
+    else:
+        return io.NodeOutput(*run.outputs)
+    return io.NodeOutput(*run.outputs, ui=ui)
+
+
 class GeminiImageGenerator(io.ComfyNode):
     @classmethod
     def define_schema(cls) -> io.Schema:
@@ -30,29 +79,16 @@ class GeminiImageGenerator(io.ComfyNode):
             inputs=[
                 io.String.Input(
                     "prompt",
-                    default="Create a beautiful landscape with mountains and a sunset",
+                    default=DEFAULT_PROMPT,
                     multiline=True,
                 ),
                 # Optional reference image for image+text to image editing
                 io.Image.Input("image", optional=True),
-                io.Combo.Input(
-                    "model",
-                    options=[
-                        "gemini-2.5-flash-image",
-                        "gemini-2.5-flash-image-preview",
-                    ],
-                    default="gemini-2.5-flash-image",
-                ),
-                io.Combo.Input(
-                    "aspect_ratio",
-                    options=["1:1", "3:4", "4:3", "9:16", "16:9"],
-                    default="1:1",
-                ),
-                io.Combo.Input(
-                    "response_modalities",
-                    options=["Image", "Text and Image"],
-                    default="Image",
-                ),
+                # Optional extra references sent with every request (all frames)
+                io.Image.Input("reference_images", optional=True),
+                io.Combo.Input("model", options=MODELS, default=DEFAULT_MODEL),
+                io.Combo.Input("aspect_ratio", options=ASPECT_RATIOS, default=DEFAULT_ASPECT_RATIO),
+                io.Combo.Input("response_modalities", options=RESPONSE_MODALITIES, default="Image"),
                 io.String.Input(
                     "api_key",
                     multiline=False,
@@ -63,39 +99,163 @@ class GeminiImageGenerator(io.ComfyNode):
                     "save_api_key",
                     default=True,
                 ),
+                io.Combo.Input(
+                    "batch_mode",
+                    options=BATCH_MODES,
+                    default="Off",
+                    tooltip="Send one request per input image and/or per prompt line, concurrently.",
+                ),
+                io.Int.Input(
+                    "batch_workers",
+                    default=DEFAULT_BATCH_WORKERS,
+                    min=1,
+                    max=MAX_BATCH_WORKERS,
+                    tooltip="Maximum concurrent requests in batch mode.",
+                ),
+                io.Combo.Input(
+                    "cache_mode",
+                    options=CACHE_MODES,
+                    default="Use Cache",
+                    tooltip="Use Cache replays identical requests from disk; Refresh re-requests and overwrites; Bypass skips the cache.",
+                ),
+                io.Combo.Input(
+                    "reference_resize",
+                    options=REFERENCE_RESIZE,
+                    default="Original",
+                    tooltip="Downscale the reference image to the output size of the aspect ratio before upload.",
+                ),
+                io.Combo.Input(
+                    "reference_format",
+                    options=REFERENCE_FORMATS,
+                    default="PNG",
+                    tooltip="Upload encoding for the reference image.",
+                ),
+                io.Int.Input(
+                    "reference_quality",
+                    default=DEFAULT_QUALITY,
+                    min=1,
+                    max=100,
+                    tooltip="JPEG/WEBP quality for the reference image.",
+                ),
+                io.Boolean.Input(
+                    "stream",
+                    default=False,
+                    tooltip="Stream the response: decode images as they arrive and show text progressively.",
+                ),
+                io.Int.Input(
+                    "candidate_count",
+                    default=1,
+                    min=1,
+                    max=MAX_CANDIDATES,
+                    tooltip="Candidates to request; every image of every candidate is returned in the batch.",
+                ),
+                io.Combo.Input(
+                    "key_strategy",
+                    options=KEY_STRATEGIES,
+                    default="Single Key",
+                    tooltip="Spread requests over every configured API key; throttled keys are quarantined and routed around.",
+                ),
+                io.Custom(SESSION_TYPE).Input(
+                    "session",
+                    optional=True,
+                    tooltip="Chat session from a Gemini Chat Session node; the prompt and images are sent as its next turn.",
+                ),
+                io.Combo.Input(
+                    "output_mode",
+                    options=OUTPUT_MODES,
+                    default="Preview Tensor",
+                    tooltip="Preview Original / Save Original show (and save, with a JSON sidecar) the bytes Gemini returned instead of re-encoding the tensor.",
+                ),
+                io.String.Input("filename_prefix", default=DEFAULT_PREFIX, tooltip="File name prefix for Save Original."),
+                io.Int.Input(
+                    "timeout_seconds",
+                    default=default_timeout(),
+                    min=0,
+                    max=3600,
+                    tooltip="Deadline for each request attempt; a hung call fails (and is retried) instead of blocking. 0 for none.",
+                ),
+                io.Int.Input(
+                    "batch_timeout_seconds",
+                    default=0,
+                    min=0,
+                    max=24 * 3600,
+                    tooltip="Deadline for all requests of the run; unfinished requests are cancelled and reported. 0 for none.",
+                ),
+                io.Int.Input(
+                    "memory_budget_mb",
+                    default=DEFAULT_BUDGET_MB,
+                    min=0,
+                    max=1024 * 1024,
+                    tooltip="Host memory for decoded results; results beyond it are staged in a memory-mapped file on disk. 0 for unlimited.",
+                ),
+                io.Int.Input(
+                    "seed",
+                    default=0,
+                    min=0,
+                    max=0xffffffffffffffff,
+                    optional=True,
+                    tooltip="Not used by Gemini; a new seed re-requests instead of replaying the response cache.",
+                ),
             ],
             outputs=[
                 io.Image.Output(),
+                io.String.Output(display_name="text_response"),
             ],
+            hidden=[io.Hidden.unique_id],
+        )
+
+    @classmethod
+    def fingerprint_inputs(
+        cls,
+        prompt: str,
+        model: str,
+        aspect_ratio: str,
+        response_modalities: str,
+        api_key: str = "",
+        image=None,
+        batch_mode: str = "Off",
+        cache_mode: str = "Use Cache",
+        reference_resize: str = "Original",
+        reference_format: str = "PNG",
+        reference_quality: int = DEFAULT_QUALITY,
+        reference_images=None,
+        candidate_count: int = 1,
+        session=None,
+        output_mode: str = "Preview Tensor",
+        filename_prefix: str = DEFAULT_PREFIX,
+        seed: int = 0,
+        **kwargs,
+    ):
+        # Let ComfyUI's execution cache skip unchanged runs; Refresh always re-runs
+        if cache_mode == "Refresh":
+            return float("nan")
+        return input_fingerprint(
+            prompt, model, aspect_ratio, response_modalities, api_key, seed, image,
+            batch_mode=batch_mode,
+            reference=(reference_resize, reference_format, reference_quality),
+            reference_images=tensor_digest(reference_images) if reference_images is not None else None,
+            candidate_count=candidate_count,
+            session=getattr(session, "session_id", None),
+            output=(output_mode, filename_prefix),
         )
 
     @staticmethod
     def _config_path() -> str:
-        return os.path.join(os.path.dirname(__file__), "config.json")
+        return get_key_store().path
 
     @classmethod
     def _load_api_key(cls) -> str:
-        path = cls._config_path()
-        if os.path.exists(path):
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    return json.load(f).get("api_key", "")
-            except Exception:
-                return ""
-        return ""
+        return get_key_store().load_api_key()
 
     @classmethod
     def _save_api_key(cls, api_key: str) -> None:
-        try:
-            with open(cls._config_path(), "w", encoding="utf-8") as f:
-                json.dump({"api_key": api_key}, f, indent=2)
-        except Exception:
-            pass
+        # In-memory store; rewrites config.json atomically and only on change
+        get_key_store().save_api_key(api_key)
 
-    # client is created inside execute after lazy import of google-genai
+    # The request path (clients, cache, scheduler, decoding) lives in core.py, shared with the V1 node
 
     @classmethod
-    def execute(
+    async def execute(
         cls,
         prompt: str,
         image,
@@ -104,196 +264,366 @@ class GeminiImageGenerator(io.ComfyNode):
         response_modalities: str,
         api_key: str,
         save_api_key: bool,
+        batch_mode: str = "Off",
+        batch_workers: int = DEFAULT_BATCH_WORKERS,
+        cache_mode: str = "Use Cache",
+        reference_resize: str = "Original",
+        reference_format: str = "PNG",
+        reference_quality: int = DEFAULT_QUALITY,
+        reference_images=None,
+        stream: bool = False,
+        candidate_count: int = 1,
+        key_strategy: str = "Single Key",
+        session: SessionHandle | None = None,
+        output_mode: str = "Preview Tensor",
+        filename_prefix: str = DEFAULT_PREFIX,
+        timeout_seconds: int = DEFAULT_TIMEOUT,
+        batch_timeout_seconds: int = 0,
+        memory_budget_mb: int = DEFAULT_BUDGET_MB,
+        seed: int = 0,
     ) -> io.NodeOutput:
-        # Helper: extend sys.path with common Windows system Python site-packages
-        def _extend_with_system_sitepackages():
-            import sys, os
-            candidates = []
-            localapp = os.environ.get("LOCALAPPDATA")
-            if localapp:
-                py_root = os.path.join(localapp, "Programs", "Python")
-                if os.path.isdir(py_root):
-                    for d in os.listdir(py_root):
-                        sp = os.path.join(py_root, d, "Lib", "site-packages")
-                        if os.path.isdir(sp):
-                            candidates.append(sp)
-            # Per-user installs (pip --user)
-            appdata_roam = os.environ.get("APPDATA")
-            if appdata_roam:
-                for ver in ("Python312","Python311","Python310","Python39","Python38"):
-                    sp = os.path.join(appdata_roam, "Python", ver, "site-packages")
-                    if os.path.isdir(sp):
-                        candidates.append(sp)
-            program_files = os.environ.get("ProgramFiles")
-            if program_files:
-                for ver in ("Python312","Python311","Python310","Python39","Python38"):
-                    sp = os.path.join(program_files, ver, "Lib", "site-packages")
-                    if os.path.isdir(sp):
-                        candidates.append(sp)
-            # Deduplicate and prepend so they take precedence
-            for sp in candidates:
-                if sp not in sys.path:
-                    sys.path.insert(0, sp)
-        
-        def _pip_install_into_current_env(packages: list[str]) -> tuple[bool, str]:
-            import sys, subprocess
-            try:
-                # Install packages one by one to improve error visibility
-                for p in packages:
-                    subprocess.check_call([sys.executable, "-m", "pip", "install", p])
-                return True, "installed"
-            except Exception as e:
-                return False, str(e)
-
-        # Lazy-import dependencies so the extension loads before deps are installed
-        try:
-            from google import genai  # type: ignore
-            from google.genai import types  # type: ignore
-            import numpy as np  # type: ignore
-            import torch  # type: ignore
-            from PIL import Image  # type: ignore
-        except Exception as import_err:
-            # Try to fall back to system Python's site-packages
-            _extend_with_system_sitepackages()
-            try:
-                from google import genai  # type: ignore
-                from google.genai import types  # type: ignore
-                import numpy as np  # type: ignore
-                import torch  # type: ignore
-                from PIL import Image  # type: ignore
-            except Exception:
-                # Try to install into the current ComfyUI venv and retry
-                ok, why = _pip_install_into_current_env(["google-genai"])  # minimal requirement
-                if ok:
-                    try:
-                        from google import genai  # type: ignore
-                        from google.genai import types  # type: ignore
-                        import numpy as np  # type: ignore
-                        import torch  # type: ignore
-                        from PIL import Image  # type: ignore
-                    except Exception as e:
-                        return io.NodeOutput(
-                            None,
-                            ui=comfy_ui.Notification(
-                                title="Gemini API",
-                                message=f"Installed google-genai but import still failed: {e}",
-                                level="error",
-                            ),
-                        )
-                else:
-                    # Give a helpful error without relying on torch
-                    import sys
-                    return io.NodeOutput(
-                        None,
-                        ui=comfy_ui.Notification(
-                            title="Gemini API",
-                            message=(
-                                "Missing dependencies and auto-install failed.\n"
-                                "Run manually in ComfyUI venv:\n"
-                                f"\n{sys.executable} -m pip install google-genai pillow numpy torch\n"
-                            ),
-                            level="error",
-                        ),
-                    )
-        if not api_key:
-            api_key = cls._load_api_key()
         if save_api_key and api_key:
             cls._save_api_key(api_key)
+        try:
+            # Empty falls back to the saved/environment key; "@name" selects a named key
+            api_key = get_key_store().resolve(api_key)
+            settings = GenerationSettings(
+                model, aspect_ratio, response_modalities,
+                seed=seed, candidate_count=candidate_count, cache_mode=cache_mode, stream=stream,
+                session=session, node_id=cls.hidden.unique_id if cls.hidden is not None else None, node="v3",
+            )
+            engine = Engine.connect(api_key, key_strategy, timeout_seconds, session)
+            result = await arun_batch(
+                engine, settings, prompt, image, reference_images,
+                batch_mode=batch_mode,
+                batch_workers=batch_workers,
+                reference=(reference_resize, reference_format, reference_quality),
+                batch_timeout=batch_timeout_seconds,
+                memory_budget_mb=memory_budget_mb,
+            )
+            run = await asyncio.to_thread(generator_run, result, output_mode, filename_prefix)
+        except Exception as e:
+            # A black placeholder (none if torch itself is missing) with the error text; Interrupt propagates
+            run = failed(e, fallback_image(), f"Error generating image: {e}")
+        return _output(cls, run)
+
 
-        # Create client after importing google-genai
-        client = None
-        if api_key:
-            os.environ["GOOGLE_API_KEY"] = api_key
-            try:
-                from google import genai as _genai  # type: ignore
-                client = _genai.Client(api_key=api_key)
-            except Exception:
-                client = None
-        if client is None:
-            # Return a black image with a message via UI preview
-            import numpy as np  # type: ignore
-            import torch  # type: ignore
-            img = torch.zeros((1, 512, 512, 3), dtype=torch.float32)
-            return io.NodeOutput(
-                img,
-                ui=comfy_ui.Notification(
-                    title="Gemini API",
-                    message="API key is required. Provide it in the node and enable Save API Key.",
-                    level="error",
+class GeminiChatSession(io.ComfyNode):
+    @classmethod
+    def define_schema(cls) -> io.Schema:
+        return io.Schema(
+            node_id="GeminiChatSession",
+            display_name="Gemini Chat Session (Custom API)",
+            category=NODE_CATEGORY,
+            description="Multi-turn chat: connected generators send only their new instruction each run.",
+            inputs=[
+                io.Combo.Input("model", options=MODELS, default=DEFAULT_MODEL),
+                io.String.Input(
+                    "api_key",
+                    multiline=False,
+                    default="",
+                    tooltip="Empty uses the saved/environment key; @name selects a named key from config.json.",
                 ),
-            )
+                io.String.Input(
+                    "session_name",
+                    multiline=False,
+                    default="",
+                    tooltip="Stable name to continue one conversation across runs; empty starts a new one.",
+                ),
+                io.String.Input("system_instruction", multiline=True, default="", optional=True),
+                io.Boolean.Input(
+                    "reset",
+                    default=False,
+                    optional=True,
+                    tooltip="Drop the named session's history and start over.",
+                ),
+            ],
+            outputs=[
+                io.Custom(SESSION_TYPE).Output(display_name="session"),
+            ],
+        )
 
-        try:
-            modalities = ["Image"] if response_modalities == "Image" else ["Text", "Image"]
-            cfg = types.GenerateContentConfig(
-                response_modalities=modalities,
-                image_config=types.ImageConfig(aspect_ratio=aspect_ratio),
-            )
+    @classmethod
+    def execute(
+        cls,
+        model: str,
+        api_key: str,
+        session_name: str,
+        system_instruction: str = "",
+        reset: bool = False,
+    ) -> io.NodeOutput:
+        return _output(cls, open_session(model, api_key, session_name, system_instruction, reset))
 
-            # Build contents: prompt plus optional image
-            contents = [prompt]
-            if image is not None:
-                import numpy as np  # type: ignore
-                from PIL import Image  # type: ignore
-                # Expecting [B,H,W,C] floats 0-1; take first image in batch
-                try:
-                    import torch  # type: ignore
-                    if isinstance(image, torch.Tensor):
-                        np_img = (image[0].clamp(0, 1).cpu().numpy() * 255.0).astype("uint8")
-                    else:
-                        # Assume numpy-like already in 0..1
-                        np_img = (np.array(image)[0] * 255.0).astype("uint8")
-                except Exception:
-                    np_img = (np.array(image)[0] * 255.0).astype("uint8")
-                pil_img = Image.fromarray(np_img)
-                contents = [prompt, pil_img]
-
-            result = client.models.generate_content(
-                model=model,
-                contents=contents,
-                config=cfg,
-            )
 
-            import numpy as np  # type: ignore
-            import torch  # type: ignore
-            from PIL import Image  # type: ignore
-            image_tensor = None
-            for part in result.candidates[0].content.parts:
-                if getattr(part, "inline_data", None) is not None:
-                    data = part.inline_data.data
-                    pil = Image.open(BytesIO(data)).convert("RGB")
-                    arr = (np.array(pil).astype(np.float32) / 255.0)
-                    image_tensor = torch.from_numpy(arr).unsqueeze(0)
-                    break
-
-            if image_tensor is None:
-                # Fallback if no image was returned
-                image_tensor = torch.zeros((1, 512, 512, 3), dtype=torch.float32)
-                return io.NodeOutput(
-                    image_tensor,
-                    ui=comfy_ui.Notification(
-                        title="Gemini API",
-                        message="No image returned by the model.",
-                        level="warning",
-                    ),
-                )
-
-            return io.NodeOutput(
-                image_tensor,
-                ui=comfy_ui.PreviewImage(image_tensor, cls=cls),
-            )
-        except Exception as e:
-            import torch  # type: ignore
-            image_tensor = torch.zeros((1, 512, 512, 3), dtype=torch.float32)
-            return io.NodeOutput(
-                image_tensor,
-                ui=comfy_ui.Notification(title="Gemini API", message=str(e), level="error"),
-            )
+class GeminiBulkGenerator(io.ComfyNode):
+    @classmethod
+    def define_schema(cls) -> io.Schema:
+        return io.Schema(
+            node_id="GeminiBulkGenerator",
+            display_name="Gemini Bulk Generator (Custom API)",
+            category=NODE_CATEGORY,
+            description="One request per row of a .txt/.csv/.jsonl prompt file; images are saved as they complete and reruns resume.",
+            inputs=[
+                io.String.Input(
+                    "prompt_file",
+                    default="",
+                    tooltip="Path to a .txt (one prompt per line), .csv or .jsonl file; rows may set id, aspect_ratio and model.",
+                ),
+                io.Combo.Input("model", options=MODELS, default=DEFAULT_MODEL),
+                io.Combo.Input("aspect_ratio", options=ASPECT_RATIOS, default=DEFAULT_ASPECT_RATIO),
+                io.Combo.Input("response_modalities", options=RESPONSE_MODALITIES, default="Image"),
+                io.String.Input("api_key", multiline=False, default=""),
+                io.String.Input(
+                    "output_dir",
+                    default="",
+                    optional=True,
+                    tooltip="Where images and manifest.jsonl go; empty uses output/gemini_bulk/<file name>.",
+                ),
+                io.Int.Input("workers", default=DEFAULT_BATCH_WORKERS, min=1, max=MAX_BATCH_WORKERS, optional=True),
+                io.Boolean.Input(
+                    "resume",
+                    default=True,
+                    optional=True,
+                    tooltip="Skip rows the manifest already records as done.",
+                ),
+                io.Combo.Input("cache_mode", options=CACHE_MODES, default="Use Cache", optional=True),
+                io.Combo.Input(
+                    "key_strategy",
+                    options=KEY_STRATEGIES,
+                    default="Single Key",
+                    optional=True,
+                    tooltip="Spread requests over every configured API key; throttled keys are quarantined and routed around.",
+                ),
+                io.Int.Input(
+                    "timeout_seconds",
+                    default=default_timeout(),
+                    min=0,
+                    max=3600,
+                    optional=True,
+                    tooltip="Deadline for each request attempt; a hung call fails (and is retried) instead of blocking. 0 for none.",
+                ),
+            ],
+            outputs=[
+                io.String.Output(display_name="summary"),
+                io.String.Output(display_name="output_dir"),
+            ],
+            is_output_node=True,
+        )
+
+    @classmethod
+    def fingerprint_inputs(cls, **kwargs):
+        # The prompt file and output directory change outside the graph; always run (resume makes it cheap)
+        return float("nan")
+
+    @classmethod
+    async def execute(
+        cls,
+        prompt_file: str,
+        model: str,
+        aspect_ratio: str,
+        response_modalities: str,
+        api_key: str,
+        output_dir: str = "",
+        workers: int = DEFAULT_BATCH_WORKERS,
+        resume: bool = True,
+        cache_mode: str = "Use Cache",
+        key_strategy: str = "Single Key",
+        timeout_seconds: int = DEFAULT_TIMEOUT,
+    ) -> io.NodeOutput:
+        settings = GenerationSettings(
+            model, aspect_ratio, response_modalities, cache_mode=cache_mode, node="v3",
+            labels={"batch_mode": "Bulk"},
+        )
+        run = await asyncio.to_thread(
+            run_bulk_file, settings, prompt_file, api_key, output_dir, workers, resume, key_strategy, timeout_seconds,
+        )
+        return _output(cls, run)
+
+
+class GeminiPromptSweep(io.ComfyNode):
+    @classmethod
+    def define_schema(cls) -> io.Schema:
+        return io.Schema(
+            node_id="GeminiPromptSweep",
+            display_name="Gemini Prompt Sweep (Custom API)",
+            category=NODE_CATEGORY,
+            description="Expand a prompt template over variable values and generate every combination concurrently.",
+            inputs=[
+                io.String.Input(
+                    "template",
+                    default="{subject} painted in {style}",
+                    multiline=True,
+                    tooltip="Prompt with {name} placeholders.",
+                ),
+                io.String.Input(
+                    "variables",
+                    default=DEFAULT_VARIABLES,
+                    multiline=True,
+                    tooltip="One 'name = value | value' line per variable; 'aspect_ratio' sets each request's aspect ratio.",
+                ),
+                io.Combo.Input("model", options=MODELS, default=DEFAULT_MODEL),
+                io.Combo.Input("aspect_ratio", options=ASPECT_RATIOS, default=DEFAULT_ASPECT_RATIO),
+                io.Combo.Input("response_modalities", options=RESPONSE_MODALITIES, default="Image"),
+                io.String.Input("api_key", multiline=False, default=""),
+                io.Int.Input(
+                    "max_combinations",
+                    default=0,
+                    min=0,
+                    max=10000,
+                    optional=True,
+                    tooltip="Generate a seeded random sample of this many combinations; 0 for all.",
+                ),
+                io.Int.Input("sample_seed", default=0, min=0, max=0xffffffffffffffff, optional=True),
+                io.Int.Input("workers", default=DEFAULT_BATCH_WORKERS, min=1, max=MAX_BATCH_WORKERS, optional=True),
+                io.Combo.Input("cache_mode", options=CACHE_MODES, default="Use Cache", optional=True),
+                io.Image.Input("reference_images", optional=True, tooltip="Sent with every request."),
+                io.Int.Input(
+                    "timeout_seconds",
+                    default=default_timeout(),
+                    min=0,
+                    max=3600,
+                    optional=True,
+                    tooltip="Deadline for each request attempt; 0 for none.",
+                ),
+            ],
+            outputs=[
+                io.Image.Output(),
+                io.String.Output(display_name="prompts", is_output_list=True),
+            ],
+        )
+
+    @classmethod
+    def fingerprint_inputs(cls, cache_mode: str = "Use Cache", **kwargs):
+        # Refresh always re-requests; otherwise ComfyUI's own input comparison decides
+        return float("nan") if cache_mode == "Refresh" else ""
+
+    @classmethod
+    async def execute(
+        cls,
+        template: str,
+        variables: str,
+        model: str,
+        aspect_ratio: str,
+        response_modalities: str,
+        api_key: str,
+        max_combinations: int = 0,
+        sample_seed: int = 0,
+        workers: int = DEFAULT_BATCH_WORKERS,
+        cache_mode: str = "Use Cache",
+        reference_images=None,
+        timeout_seconds: int = DEFAULT_TIMEOUT,
+    ) -> io.NodeOutput:
+        settings = GenerationSettings(
+            model, aspect_ratio, response_modalities, cache_mode=cache_mode, node="v3", labels={"batch_mode": "Sweep"},
+        )
+        run = await arun_sweep(
+            settings, api_key, template, variables, max_combinations, sample_seed, workers, reference_images,
+            timeout_seconds,
+        )
+        return _output(cls, run)
+
+
+class GeminiBatchSubmit(io.ComfyNode):
+    @classmethod
+    def define_schema(cls) -> io.Schema:
+        return io.Schema(
+            node_id="GeminiBatchSubmit",
+            display_name="Gemini Batch Submit (Custom API)",
+            category=NODE_CATEGORY,
+            description="Submit every prompt line as one Gemini Batch API job (batch pricing, runs asynchronously).",
+            inputs=[
+                io.String.Input(
+                    "prompts",
+                    default=DEFAULT_PROMPT,
+                    multiline=True,
+                    tooltip="One request per non-empty line.",
+                ),
+                io.Combo.Input("model", options=MODELS, default=DEFAULT_MODEL),
+                io.Combo.Input("aspect_ratio", options=ASPECT_RATIOS, default=DEFAULT_ASPECT_RATIO),
+                io.Combo.Input("response_modalities", options=RESPONSE_MODALITIES, default="Image"),
+                io.String.Input("api_key", multiline=False, default=""),
+                io.Image.Input("reference_images", optional=True),
+                io.String.Input("display_name", default="", optional=True),
+            ],
+            outputs=[
+                io.Custom(BATCH_JOB_TYPE).Output(display_name="job"),
+                io.String.Output(display_name="job_name"),
+            ],
+        )
+
+    @classmethod
+    async def execute(
+        cls,
+        prompts: str,
+        model: str,
+        aspect_ratio: str,
+        response_modalities: str,
+        api_key: str,
+        reference_images=None,
+        display_name: str = "",
+    ) -> io.NodeOutput:
+        settings = GenerationSettings(model, aspect_ratio, response_modalities)
+        return _output(cls, await asubmit_batch_job(settings, api_key, prompts, reference_images, display_name))
+
+
+class GeminiBatchCollect(io.ComfyNode):
+    @classmethod
+    def define_schema(cls) -> io.Schema:
+        return io.Schema(
+            node_id="GeminiBatchCollect",
+            display_name="Gemini Batch Collect (Custom API)",
+            category=NODE_CATEGORY,
+            description="Wait for a Gemini Batch API job and return all of its images as one batch.",
+            inputs=[
+                io.Boolean.Input(
+                    "wait",
+                    default=True,
+                    tooltip="Poll with backoff until the job finishes; otherwise check once and report the state.",
+                ),
+                io.Int.Input("timeout_minutes", default=60, min=0, max=24 * 60),
+                io.Custom(BATCH_JOB_TYPE).Input("job", optional=True),
+                io.String.Input(
+                    "job_name",
+                    default="",
+                    optional=True,
+                    tooltip="Name of an earlier job (batches/...), used when no job is connected.",
+                ),
+                io.String.Input("api_key", multiline=False, default="", optional=True),
+            ],
+            outputs=[
+                io.Image.Output(),
+                io.String.Output(display_name="status"),
+            ],
+            is_output_node=True,
+        )
+
+    @classmethod
+    def fingerprint_inputs(cls, **kwargs):
+        # The job's state changes server side; always check again
+        return float("nan")
+
+    @classmethod
+    async def execute(
+        cls,
+        wait: bool,
+        timeout_minutes: int,
+        job: BatchJobHandle | None = None,
+        job_name: str = "",
+        api_key: str = "",
+    ) -> io.NodeOutput:
+        return _output(cls, await acollect_batch_job(wait, timeout_minutes, job, job_name, api_key))
 
 
 class GeminiExtension(ComfyExtension):
     async def get_node_list(self):
-        return [GeminiImageGenerator]
+        return [
+            GeminiImageGenerator,
+            GeminiChatSession,
+            GeminiBulkGenerator,
+            GeminiPromptSweep,
+            GeminiBatchSubmit,
+            GeminiBatchCollect,
+        ]
 
 
 async def comfy_entrypoint() -> GeminiExtension:
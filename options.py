@@ -0,0 +1,8 @@
+"""Choice lists shared by the inputs of every node, V1 and V3 alike."""
+
+MODELS = ["gemini-2.5-flash-image", "gemini-2.5-flash-image-preview"]
+DEFAULT_MODEL = "gemini-2.5-flash-image"
+ASPECT_RATIOS = ["1:1", "3:4", "4:3", "9:16", "16:9"]
+DEFAULT_ASPECT_RATIO = "1:1"
+RESPONSE_MODALITIES = ["Image", "Text and Image"]
+DEFAULT_PROMPT = "Create a beautiful landscape with mountains and a sunset"
@@ -0,0 +1,122 @@
+"""Memory-capped assembly of large output batches.
+
+A 2K image is ~48 MB as a float32 ``[H,W,3]`` tensor. A batch run holds
+every job's result until the end, then stacks them into one more copy, so
+peak host memory is about twice the batch. With a budget, results that
+would go over it are written to a spill file as they arrive and the worker's
+copy is dropped; if the stacked batch would not fit in the budget either, it
+is assembled in a memory-mapped file, so the IMAGE handed downstream is file
+backed and the OS pages it in on demand.
+
+Spill files live in ``GEMINI_SPILL_DIR`` (default: the system temp
+directory) and are deleted automatically once nothing maps them.
+"""
+
+import os
+import tempfile
+import threading
+
+from .batching import stack_results
+
+DEFAULT_BUDGET_MB = 0
+_MB = 1024 * 1024
+
+
+def spill_dir() -> str:
+    return os.environ.get("GEMINI_SPILL_DIR") or tempfile.gettempdir()
+
+
+class _Slot:
+    """One staged result: the tensor itself, or where it sits in the spill file."""
+
+    __slots__ = ("tensor", "offset", "shape")
+
+    def __init__(self, tensor=None, offset: int = 0, shape: tuple = ()):
+        self.tensor = tensor
+        self.offset = offset
+        self.shape = shape
+
+
+class OutputBuffer:
+    """Stages per-job ``[k,H,W,C]`` results within ``budget_mb`` of host memory.
+
+    Workers call :meth:`add` as each result is decoded and keep the returned
+    slot; :meth:`assemble` stacks the slots in order like ``stack_results``.
+    A budget of 0 keeps everything in memory, which is the old behaviour.
+    """
+
+    def __init__(self, budget_mb: int = DEFAULT_BUDGET_MB):
+        self.budget = int(budget_mb) * _MB if budget_mb and budget_mb > 0 else None
+        self._lock = threading.Lock()
+        self._spill = None
+        self._spill_size = 0
+        self.held = 0
+        self.peak = 0
+        self.spilled = 0
+        self.mapped_output = 0
+        self.images = 0
+
+    def _hold(self, nbytes: int) -> None:
+        self.held += nbytes
+        self.peak = max(self.peak, self.held)
+
+    def add(self, tensor):
+        """Stage one result; returns a slot for :meth:`assemble` (None stays None)."""
+        if tensor is None:
+            return None
+        nbytes = tensor.numel() * tensor.element_size()
+        with self._lock:
+            self.images += int(tensor.shape[0])
+            if self.budget is None or self.held + nbytes <= self.budget:
+                self._hold(nbytes)
+                return _Slot(tensor=tensor, shape=tuple(tensor.shape))
+            import torch  # type: ignore
+
+            array = tensor.detach().to("cpu", torch.float32).contiguous().numpy()
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile(prefix="gemini-spill-", dir=spill_dir())
+            self._spill.seek(self._spill_size)
+            array.tofile(self._spill)
+            slot = _Slot(offset=self._spill_size, shape=array.shape)
+            self._spill_size += array.nbytes
+            self.spilled += array.nbytes
+            return slot
+
+    def _load(self, slot):
+        """The slot's tensor; spilled ones are lazy copy-on-write views of the spill file."""
+        if slot is None:
+            return None
+        if slot.tensor is not None:
+            return slot.tensor
+        import numpy as np  # type: ignore
+        import torch  # type: ignore
+
+        view = np.memmap(self._spill, dtype=np.float32, mode="c", offset=slot.offset, shape=slot.shape)
+        return torch.from_numpy(view)
+
+    def _allocate(self, shape: tuple):
+        import numpy as np  # type: ignore
+        import torch  # type: ignore
+
+        nbytes = int(np.prod(shape)) * 4
+        if self.budget is None or self.held + nbytes <= self.budget:
+            self._hold(nbytes)
+            return torch.zeros(shape, dtype=torch.float32)
+        self.mapped_output = nbytes
+        backing = tempfile.TemporaryFile(prefix="gemini-output-", dir=spill_dir())
+        return torch.from_numpy(np.memmap(backing, dtype=np.float32, mode="w+", shape=shape))
+
+    def assemble(self, slots: list):
+        """Stack the slots in order into one IMAGE batch, padding and filling gaps like ``stack_results``."""
+        with self._lock:
+            if self._spill is not None:
+                self._spill.flush()
+            return stack_results([self._load(slot) for slot in slots], allocate=self._allocate)
+
+    def describe(self) -> str:
+        line = f"Gemini output buffer: {self.images} image(s), peak {self.peak / _MB:.1f} MB held in memory"
+        if self.spilled:
+            line += f", {self.spilled / _MB:.1f} MB spilled to disk"
+        if self.mapped_output:
+            line += f", {self.mapped_output / _MB:.1f} MB batch memory-mapped"
+        return line
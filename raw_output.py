@@ -0,0 +1,64 @@
+"""Preview and save the image bytes Gemini returned, without re-encoding.
+
+Previewing an IMAGE tensor makes ComfyUI encode the float tensor back to a
+PNG, although the model already sent an encoded image that the tensor was
+decoded from. These helpers write the original bytes straight to ComfyUI's
+temp directory (preview) or output directory (save, with a JSON metadata
+sidecar per image) and return the entries the UI needs to show them.
+"""
+
+import json
+import os
+import random
+import string
+import time
+
+OUTPUT_MODES = ["Preview Tensor", "Preview Original", "Save Original"]
+DEFAULT_PREFIX = "Gemini"
+_EXTENSIONS = {"image/png": "png", "image/jpeg": "jpg", "image/webp": "webp"}
+
+
+def write_originals(items, mode: str, filename_prefix: str = DEFAULT_PREFIX) -> list[dict]:
+    """Write every image of ``items`` as-is.
+
+    ``items`` is a list of ``(parts, metadata)``: a ResponseParts and a dict
+    merged into each of its images' sidecars. Returns UI entries
+    (``filename``, ``subfolder``, ``type``) in order; an empty list for
+    "Preview Tensor".
+    """
+    if mode not in ("Preview Original", "Save Original"):
+        return []
+    import folder_paths  # type: ignore
+
+    save = mode == "Save Original"
+    if save:
+        directory, folder_type = folder_paths.get_output_directory(), "output"
+        prefix = filename_prefix or DEFAULT_PREFIX
+    else:
+        directory, folder_type = folder_paths.get_temp_directory(), "temp"
+        suffix = "".join(random.choice(string.ascii_lowercase) for _ in range(5))
+        prefix = f"{filename_prefix or DEFAULT_PREFIX}_temp_{suffix}"
+    full_folder, filename, counter, subfolder, _ = folder_paths.get_save_image_path(prefix, directory)
+
+    entries = []
+    for parts, metadata in items:
+        if parts is None:
+            continue
+        for k, (data, mime) in enumerate(zip(parts.images, parts.mime_types)):
+            name = f"{filename}_{counter:05}_.{_EXTENSIONS.get(mime, 'png')}"
+            with open(os.path.join(full_folder, name), "wb") as f:
+                f.write(data)
+            if save:
+                sidecar = dict(
+                    metadata or {},
+                    image_index=k,
+                    mime_type=mime,
+                    bytes=len(data),
+                    text=parts.text,
+                    created=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                )
+                with open(os.path.join(full_folder, name + ".json"), "w", encoding="utf-8") as f:
+                    json.dump(sidecar, f, indent=2)
+            entries.append({"filename": name, "subfolder": subfolder, "type": folder_type})
+            counter += 1
+    return entries
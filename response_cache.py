@@ -0,0 +1,199 @@
+"""Content-addressed on-disk cache of Gemini responses.
+
+Entries are keyed by a request fingerprint (see ``fingerprint.py``) and
+store the returned image bytes and text, so re-running an unchanged request
+skips the network round-trip and the bill. The cache is bounded in bytes and
+evicts least-recently-used entries; an entry's last use is its metadata
+file's mtime, so LRU order survives restarts.
+
+Location and size come from ``GEMINI_CACHE_DIR`` (default ``cache/`` next to
+this file) and ``GEMINI_CACHE_MAX_MB`` (default 1024).
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .response_parts import ResponseParts
+
+CACHE_MODES = ["Use Cache", "Refresh", "Bypass"]
+DEFAULT_MAX_MB = 1024
+
+_EXTENSIONS = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of :class:`ResponseParts` on disk."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> [size_bytes, last_used]; built lazily from disk
+        self._index: dict[str, list] | None = None
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def _load_index_locked(self) -> dict:
+        if self._index is not None:
+            return self._index
+        index: dict[str, list] = {}
+        total = 0
+        if os.path.isdir(self.root):
+            for sub in os.listdir(self.root):
+                subdir = os.path.join(self.root, sub)
+                if not os.path.isdir(subdir):
+                    continue
+                for name in os.listdir(subdir):
+                    if not name.endswith(".json"):
+                        continue
+                    key = name[:-5]
+                    meta = os.path.join(subdir, name)
+                    try:
+                        with open(meta, "r", encoding="utf-8") as f:
+                            entry = json.load(f)
+                        size = os.path.getsize(meta) + sum(
+                            os.path.getsize(os.path.join(subdir, img["file"])) for img in entry["images"]
+                        )
+                        index[key] = [size, os.path.getmtime(meta)]
+                        total += size
+                    except Exception:
+                        continue
+        self._index = index
+        self._total = total
+        return index
+
+    def get(self, key: str) -> ResponseParts | None:
+        with self._lock:
+            index = self._load_index_locked()
+            if key not in index:
+                self.misses += 1
+                return None
+        meta = self._meta_path(key)
+        try:
+            with open(meta, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            parts = ResponseParts(texts=list(entry.get("texts", [])))
+            for img in entry["images"]:
+                with open(os.path.join(os.path.dirname(meta), img["file"]), "rb") as f:
+                    parts.images.append(f.read())
+                parts.mime_types.append(img["mime_type"])
+            now = time.time()
+            os.utime(meta, (now, now))
+        except Exception:
+            # Partially deleted or corrupt entry: drop it and treat as a miss
+            with self._lock:
+                self._forget_locked(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index[key][1] = now
+            self.hits += 1
+        return parts
+
+    def put(self, key: str, parts: ResponseParts) -> None:
+        if not parts.images:
+            # Never pin an empty answer; the next run should ask again
+            return
+        subdir = os.path.join(self.root, key[:2])
+        os.makedirs(subdir, exist_ok=True)
+        images = []
+        size = 0
+        for i, (data, mime) in enumerate(zip(parts.images, parts.mime_types)):
+            name = f"{key}_{i}{_EXTENSIONS.get(mime, '.bin')}"
+            _atomic_write(os.path.join(subdir, name), data)
+            images.append({"file": name, "mime_type": mime})
+            size += len(data)
+        meta_bytes = json.dumps({"texts": parts.texts, "images": images}).encode("utf-8")
+        # Metadata is written last; its presence marks the entry complete
+        _atomic_write(self._meta_path(key), meta_bytes)
+        size += len(meta_bytes)
+        with self._lock:
+            index = self._load_index_locked()
+            previous = index.get(key)
+            if previous is not None:
+                self._total -= previous[0]
+            index[key] = [size, time.time()]
+            self._total += size
+            self.writes += 1
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        if self.max_bytes <= 0 or self._total <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            self._remove_files(key)
+            self._forget_locked(key)
+            self.evictions += 1
+
+    def _forget_locked(self, key: str) -> None:
+        if self._index is not None and key in self._index:
+            self._total -= self._index.pop(key)[0]
+
+    def _remove_files(self, key: str) -> None:
+        meta = self._meta_path(key)
+        try:
+            with open(meta, "r", encoding="utf-8") as f:
+                files = [img["file"] for img in json.load(f)["images"]]
+        except Exception:
+            files = []
+        for path in [meta] + [os.path.join(os.path.dirname(meta), name) for name in files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            index = self._load_index_locked()
+            return {
+                "entries": len(index),
+                "bytes": self._total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+
+_CACHE: ResponseCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Return the process-wide response cache."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            root = os.environ.get("GEMINI_CACHE_DIR") or os.path.join(os.path.dirname(__file__), "cache")
+            try:
+                max_mb = float(os.environ.get("GEMINI_CACHE_MAX_MB", DEFAULT_MAX_MB))
+            except ValueError:
+                max_mb = DEFAULT_MAX_MB
+            _CACHE = ResponseCache(root, int(max_mb * 1024 * 1024))
+        return _CACHE
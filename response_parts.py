@@ -0,0 +1,59 @@
+"""SDK-independent view of a Gemini response.
+
+Responses are reduced to the encoded image bytes and text pieces the nodes
+actually use, so they can be cached, replayed and decoded without holding
+on to SDK objects.
+"""
+
+from dataclasses import dataclass, field
+
+# Upper bound for the candidate_count input
+MAX_CANDIDATES = 8
+
+
+@dataclass
+class ResponseParts:
+    images: list[bytes] = field(default_factory=list)
+    mime_types: list[str] = field(default_factory=list)
+    # One entry per candidate that returned text; streamed pieces of a candidate are concatenated
+    texts: list[str] = field(default_factory=list)
+    # candidate index -> position of its entry in texts
+    _text_slots: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.texts)
+
+    @classmethod
+    def from_result(cls, result) -> "ResponseParts":
+        """Collect inline images and text from every candidate, in order."""
+        parts = cls()
+        parts.add_candidates(getattr(result, "candidates", None) or [])
+        return parts
+
+    def add_candidates(self, candidates) -> list[bytes]:
+        """Append the parts of ``candidates``; returns the newly added image bytes."""
+        added = []
+        for position, candidate in enumerate(candidates):
+            content = getattr(candidate, "content", None)
+            if content is None:
+                continue
+            # Stream chunks name their candidate by index; whole responses list them in order
+            index = getattr(candidate, "index", None)
+            slot = position if index is None else index
+            for part in content.parts or []:
+                if getattr(part, "text", None) is not None:
+                    self._add_text(slot, part.text)
+                elif getattr(part, "inline_data", None) is not None:
+                    self.images.append(part.inline_data.data)
+                    self.mime_types.append(getattr(part.inline_data, "mime_type", None) or "image/png")
+                    added.append(part.inline_data.data)
+        return added
+
+    def _add_text(self, slot: int, text: str) -> None:
+        at = self._text_slots.get(slot)
+        if at is None:
+            self._text_slots[slot] = len(self.texts)
+            self.texts.append(text)
+        else:
+            self.texts[at] += text
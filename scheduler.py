@@ -0,0 +1,270 @@
+"""Retry, backoff and rate limiting around Gemini calls.
+
+One scheduler is shared by every node instance in the process. Before a call
+it waits for room in the requests-per-minute and tokens-per-minute budgets;
+a retryable failure (429, 5xx, timeouts, dropped connections) is retried
+with jittered exponential backoff, honouring the server's Retry-After or
+RetryInfo delay when given. Anything else is raised to the node unchanged.
+
+Budgets come from ``GEMINI_RPM`` and ``GEMINI_TPM`` (0 = unlimited) and the
+retry count from ``GEMINI_MAX_RETRIES`` (default 4).
+"""
+
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+
+from .cancellation import check_interrupted
+
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+DEFAULT_MAX_RETRIES = 4
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+
+# Rough per-request token costs used to reserve TPM budget before the call;
+# the reservation is settled against usage_metadata afterwards.
+TOKENS_PER_INPUT_IMAGE = 258
+TOKENS_PER_OUTPUT_IMAGE = 1290
+
+
+def estimate_tokens(prompt: str, input_images: int = 0, output_images: int = 1) -> int:
+    return len(prompt) // 4 + 1 + input_images * TOKENS_PER_INPUT_IMAGE + output_images * TOKENS_PER_OUTPUT_IMAGE
+
+
+def status_code(exc: BaseException) -> int | None:
+    """HTTP status of an SDK error, if it carries one."""
+    for attr in ("code", "status_code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_CODES
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # httpx transport failures (connect/read timeouts, dropped connections)
+    return any(cls.__name__ in ("TransportError", "TimeoutException") for cls in type(exc).__mro__)
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Server-requested delay in seconds from Retry-After or a RetryInfo detail."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers is not None:
+        try:
+            value = headers.get("retry-after")
+            if value is not None:
+                return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+    details = getattr(exc, "details", None)
+    if isinstance(details, dict):
+        for item in details.get("error", {}).get("details", []) or []:
+            delay = item.get("retryDelay") if isinstance(item, dict) else None
+            if isinstance(delay, str):
+                match = re.fullmatch(r"([\d.]+)s", delay.strip())
+                if match:
+                    return float(match.group(1))
+    return None
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+class _Bucket:
+    """Token bucket holding one minute's worth of budget."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.stamp = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_for(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+
+class RequestScheduler:
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_retries: int = DEFAULT_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._requests = _Bucket(rpm) if rpm > 0 else None
+        self._tokens = _Bucket(tpm) if tpm > 0 else None
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.throttled_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _reserve(self, tokens: int) -> float:
+        """Take budget for one request, or return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            waits = []
+            for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    waits.append(bucket.wait_for(amount))
+            wait = max(waits, default=0.0)
+            if wait <= 0:
+                if self._requests is not None:
+                    self._requests.level -= 1
+                if self._tokens is not None:
+                    self._tokens.level -= min(tokens, self._tokens.capacity)
+            return wait
+
+    def _settle(self, reserved: int, result) -> None:
+        """Correct the TPM reservation with the usage the API reported."""
+        if self._tokens is None:
+            return
+        actual = getattr(getattr(result, "usage_metadata", None), "total_token_count", None)
+        if not isinstance(actual, int):
+            return
+        with self._lock:
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + reserved - actual)
+
+    def _enter_queue(self) -> None:
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def _leave_queue(self, throttled: float, backoff: float) -> None:
+        with self._lock:
+            self.queue_depth -= 1
+            self.throttled_seconds += throttled
+            self.backoff_seconds += backoff
+
+    def _next_delay(self, exc: BaseException, attempt: int, switch=None) -> float | None:
+        """Delay before the next attempt, or None to give up.
+
+        ``switch(exc)`` returning True means the next attempt will go out on a
+        different API key, so there is no reason to wait out this key's limit.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if switch is not None and switch(exc):
+            return 0.0
+        if not is_retryable(exc):
+            return None
+        server = retry_after(exc)
+        if server is not None:
+            return server + random.uniform(0, BASE_DELAY)
+        # Full jitter keeps many throttled callers from retrying in lockstep
+        return random.uniform(0, min(MAX_DELAY, BASE_DELAY * (2 ** attempt)))
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def call(self, fn, tokens: int = 0, switch=None):
+        """Run ``fn()`` within the budgets, retrying retryable failures."""
+        attempt = 0
+        while True:
+            self._enter_queue()
+            throttled = 0.0
+            try:
+                while (wait := self._reserve(tokens)) > 0:
+                    time.sleep(wait)
+                    throttled += wait
+            finally:
+                self._leave_queue(throttled, 0.0)
+            # A batch abandoned on Interrupt must not keep sending (or retrying) requests
+            check_interrupted()
+            self._count("calls")
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._next_delay(e, attempt, switch)
+                if delay is None:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                self._enter_queue()
+                try:
+                    time.sleep(delay)
+                finally:
+                    self._leave_queue(0.0, delay)
+                attempt += 1
+                continue
+            self._settle(tokens, result)
+            return result
+
+    async def acall(self, fn, tokens: int = 0, switch=None):
+        """Async variant of :meth:`call`; ``fn()`` must return an awaitable."""
+        attempt = 0
+        while True:
+            self._enter_queue()
+            throttled = 0.0
+            try:
+                while (wait := self._reserve(tokens)) > 0:
+                    await asyncio.sleep(wait)
+                    throttled += wait
+            finally:
+                self._leave_queue(throttled, 0.0)
+            check_interrupted()
+            self._count("calls")
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._next_delay(e, attempt, switch)
+                if delay is None:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                self._enter_queue()
+                try:
+                    await asyncio.sleep(delay)
+                finally:
+                    self._leave_queue(0.0, delay)
+                attempt += 1
+                continue
+            self._settle(tokens, result)
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+            }
+
+
+_SCHEDULER: RequestScheduler | None = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Return the process-wide scheduler shared by all node instances."""
+    global _SCHEDULER
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = RequestScheduler(
+                rpm=_env_int("GEMINI_RPM", 0),
+                tpm=_env_int("GEMINI_TPM", 0),
+                max_retries=_env_int("GEMINI_MAX_RETRIES", DEFAULT_MAX_RETRIES),
+            )
+        return _SCHEDULER
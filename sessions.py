@@ -0,0 +1,166 @@
+"""Multi-turn chat sessions shared between Gemini nodes.
+
+A session node outputs a :class:`SessionHandle` (the ``GEMINI_SESSION``
+type). Generator nodes given a handle send their prompt and images as the
+next turn of the SDK chat (``client.chats``) behind it, so iterative edits
+send only the new instruction while the model keeps the earlier turns and
+images as context.
+
+Chats live in a process-wide store bounded in count (LRU) and idle time
+(TTL) so memory stays flat on a long-running server:
+
+    GEMINI_SESSION_MAX   sessions kept at once (default 32)
+    GEMINI_SESSION_TTL   seconds an idle session is kept (default 1800)
+
+A handle whose chat was evicted starts a fresh conversation on next use.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from .client_pool import get_client
+from .deps import load as load_dependencies
+from .scheduler import get_scheduler
+from .streaming import collect_stream
+
+SESSION_TYPE = "GEMINI_SESSION"
+DEFAULT_MAX_SESSIONS = 32
+DEFAULT_TTL = 1800.0
+
+
+@dataclass(frozen=True)
+class SessionHandle:
+    session_id: str
+    model: str
+    system_instruction: str = ""
+    # Kept out of repr so the key never lands in logs
+    api_key: str = field(default="", repr=False)
+
+
+class _Session:
+    __slots__ = ("chat", "lock", "last_used", "turns")
+
+    def __init__(self, chat):
+        self.chat = chat
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.turns = 0
+
+
+class SessionStore:
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, ttl: float = DEFAULT_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self.created = 0
+        self.evicted = 0
+
+    def _evict_locked(self, now: float) -> None:
+        if self.ttl > 0:
+            for sid in [s for s, e in self._sessions.items() if now - e.last_used > self.ttl]:
+                del self._sessions[sid]
+                self.evicted += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    @staticmethod
+    def _create_chat(handle: SessionHandle, http_options: dict | None = None):
+        config = None
+        if handle.system_instruction:
+            types = load_dependencies().types
+            config = types.GenerateContentConfig(system_instruction=handle.system_instruction)
+        # The chat keeps the client it was created on, and with it that client's request timeout
+        return get_client(handle.api_key, http_options).chats.create(model=handle.model, config=config)
+
+    @staticmethod
+    def _turn_config(handle: SessionHandle, config):
+        """The per-turn config replaces the chat's own rather than merging with it, so carry the system instruction over."""
+        if config is None or not handle.system_instruction or getattr(config, "system_instruction", None):
+            return config
+        return config.model_copy(update={"system_instruction": handle.system_instruction})
+
+    def _session(self, handle: SessionHandle, http_options: dict | None = None) -> _Session:
+        with self._lock:
+            now = time.monotonic()
+            self._evict_locked(now)
+            session = self._sessions.get(handle.session_id)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(handle.session_id)
+                return session
+        session = _Session(self._create_chat(handle, http_options))
+        with self._lock:
+            existing = self._sessions.get(handle.session_id)
+            if existing is not None:
+                return existing
+            self._sessions[handle.session_id] = session
+            self.created += 1
+            self._evict_locked(time.monotonic())
+        print(f"Gemini session '{handle.session_id}' started ({handle.model})")
+        return session
+
+    def send(self, handle: SessionHandle, contents, config=None, stream: bool = False, node_id=None,
+             tokens: int = 0, http_options: dict | None = None):
+        """Send ``contents`` as the next turn; returns the response, or a StreamCollector when streaming.
+
+        Turns on one session are serialized; the chat records a turn only once
+        it succeeds, so scheduler retries do not duplicate history.
+        ``http_options`` (the request timeout) applies when the chat is created.
+        """
+        session = self._session(handle, http_options)
+        config = self._turn_config(handle, config)
+        with session.lock:
+            if stream:
+                result = get_scheduler().call(
+                    lambda: collect_stream(session.chat.send_message_stream(contents, config=config), node_id),
+                    tokens=tokens,
+                )
+            else:
+                result = get_scheduler().call(
+                    lambda: session.chat.send_message(contents, config=config),
+                    tokens=tokens,
+                )
+            session.turns += 1
+            session.last_used = time.monotonic()
+        return result
+
+    def reset(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "created": self.created,
+                "evicted": self.evicted,
+                "turns": {sid: s.turns for sid, s in self._sessions.items()},
+            }
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+_STORE: SessionStore | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide session store."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = SessionStore(
+                max_sessions=max(1, int(_env_number("GEMINI_SESSION_MAX", DEFAULT_MAX_SESSIONS))),
+                ttl=_env_number("GEMINI_SESSION_TTL", DEFAULT_TTL),
+            )
+        return _STORE
@@ -0,0 +1,139 @@
+"""Single-flight de-duplication of identical concurrent requests.
+
+When a workflow is queued several times, or a graph holds identical Gemini
+nodes, the same request would go out (and be billed) once per caller. The
+first caller for a request fingerprint becomes the leader and makes the
+call; callers arriving while it is in flight wait for and share its result
+(or its exception) instead of sending their own. One caller's cancellation
+never fails the others: a cancelled flight sends its waiters round again,
+and one of them leads a fresh call.
+
+Flights are tracked with ``concurrent.futures.Future`` so threads (V1 node,
+batch workers) and event loops (V3 node) can join the same flight.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import CancelledError, Future
+
+
+class _Flight:
+    """One in-flight call: its shared future, how many callers still wait on it, and how to cancel it."""
+
+    __slots__ = ("future", "waiters", "cancel")
+
+    def __init__(self):
+        self.future = Future()
+        self.waiters = 1
+        self.cancel = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key: str) -> tuple[_Flight, bool]:
+        """Return the flight for ``key`` and whether the caller leads it."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            self.leaders += 1
+            return flight, True
+
+    def _leave(self, key: str, flight: _Flight) -> None:
+        """A waiting caller was cancelled; the call itself is cancelled only once nobody waits on it."""
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters > 0 or flight.future.done():
+                return
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            cancel = flight.cancel
+        if cancel is not None:
+            cancel()
+
+    def _land(self, key: str, flight: _Flight, result=None, error: BaseException | None = None,
+              cancelled: bool = False) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if flight.future.done():
+            return
+        if cancelled:
+            # Followers see a cancelled flight and retry rather than inherit the cancellation
+            flight.future.cancel()
+        elif error is not None:
+            flight.future.set_exception(error)
+        else:
+            flight.future.set_result(result)
+
+    def _settle(self, key: str, flight: _Flight, task: asyncio.Task) -> None:
+        if task.cancelled():
+            self._land(key, flight, cancelled=True)
+        else:
+            self._land(key, flight, task.result() if task.exception() is None else None, task.exception())
+
+    def do(self, key: str, fn) -> tuple[object, bool]:
+        """Run ``fn()`` once per concurrent ``key``; returns ``(result, shared)``."""
+        while True:
+            flight, leader = self._join(key)
+            if not leader:
+                try:
+                    return flight.future.result(), True
+                except CancelledError:
+                    # The shared call was cancelled, not this caller: try again, possibly as the new leader
+                    continue
+            try:
+                result = fn()
+            except BaseException as e:
+                self._land(key, flight, error=e)
+                raise
+            self._land(key, flight, result)
+            return result, False
+
+    async def ado(self, key: str, fn) -> tuple[object, bool]:
+        """Async :meth:`do`; ``fn()`` returns an awaitable.
+
+        The leader's call runs as its own task, so cancelling the caller that
+        started it (a batch deadline, a cancelled V3 run) leaves it running for
+        the callers still waiting; it is cancelled only when every waiter has
+        gone.
+        """
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                loop = asyncio.get_running_loop()
+                task = loop.create_task(fn())
+                flight.cancel = lambda: loop.call_soon_threadsafe(task.cancel)
+                task.add_done_callback(lambda done: self._settle(key, flight, done))
+                waiter = task
+            else:
+                waiter = asyncio.wrap_future(flight.future)
+            try:
+                # wait() raises only when this caller is cancelled, never for the flight's own outcome
+                await asyncio.wait([waiter])
+            except asyncio.CancelledError:
+                self._leave(key, flight)
+                raise
+            if waiter.cancelled():
+                continue
+            return waiter.result(), not leader
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._flights), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+_FLIGHTS = SingleFlight()
+
+
+def get_singleflight() -> SingleFlight:
+    """Return the process-wide single-flight registry shared by both nodes."""
+    return _FLIGHTS
@@ -0,0 +1,108 @@
+"""Streaming responses via ``generate_content_stream``.
+
+A :class:`StreamCollector` consumes response chunks as they arrive: text is
+accumulated and pushed to the UI progressively, and each image part is
+handed to a decode thread the moment it lands instead of after the whole
+response. Time to first chunk and total latency are recorded so slow runs
+can be attributed to the model or to the transfer.
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .cancellation import check_interrupted
+from .image_convert import decode_to_tensor
+from .response_parts import ResponseParts
+
+_decode_pool: ThreadPoolExecutor | None = None
+_decode_pool_lock = threading.Lock()
+
+
+def _decoder() -> ThreadPoolExecutor:
+    global _decode_pool
+    with _decode_pool_lock:
+        if _decode_pool is None:
+            _decode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gemini-decode")
+        return _decode_pool
+
+
+def push_progress_text(text: str, node_id) -> None:
+    """Show ``text`` on the node while it is still executing, if the server supports it."""
+    if node_id is None:
+        return
+    try:
+        from server import PromptServer  # type: ignore
+
+        PromptServer.instance.send_progress_text(text, str(node_id))
+    except Exception:
+        pass
+
+
+class StreamCollector:
+    """Accumulates streamed chunks into :class:`ResponseParts`."""
+
+    def __init__(self, node_id=None):
+        self.node_id = node_id
+        self.parts = ResponseParts()
+        self.usage_metadata = None
+        self.started = time.perf_counter()
+        self.first_chunk: float | None = None
+        self.finished: float | None = None
+        self._decoding = []
+
+    def feed(self, chunk) -> None:
+        if self.first_chunk is None:
+            self.first_chunk = time.perf_counter()
+        if getattr(chunk, "usage_metadata", None) is not None:
+            self.usage_metadata = chunk.usage_metadata
+        text_before = self.parts.text
+        for data in self.parts.add_candidates(getattr(chunk, "candidates", None) or []):
+            self._decoding.append(_decoder().submit(decode_to_tensor, data))
+        if self.parts.text != text_before:
+            push_progress_text(self.parts.text, self.node_id)
+
+    def finish(self) -> "StreamCollector":
+        self.finished = time.perf_counter()
+        return self
+
+    def decoded_all(self) -> list:
+        return [future.result() for future in self._decoding]
+
+    async def adecoded_all(self) -> list:
+        return list(await asyncio.gather(*(asyncio.wrap_future(f) for f in self._decoding)))
+
+    @property
+    def ttfb(self) -> float | None:
+        return None if self.first_chunk is None else self.first_chunk - self.started
+
+    @property
+    def total(self) -> float | None:
+        return None if self.finished is None else self.finished - self.started
+
+    def describe(self) -> str:
+        ttfb = f"{self.ttfb:.2f}s" if self.ttfb is not None else "n/a"
+        total = f"{self.total:.2f}s" if self.total is not None else "n/a"
+        return f"Gemini stream: first chunk {ttfb}, total {total}, {len(self.parts.images)} image(s)"
+
+
+def collect_stream(stream, node_id=None) -> StreamCollector:
+    """Drain a sync chunk iterator."""
+    collector = StreamCollector(node_id)
+    for chunk in stream:
+        # Stop reading once the batch was interrupted
+        check_interrupted()
+        collector.feed(chunk)
+    return collector.finish()
+
+
+async def acollect_stream(stream, node_id=None) -> StreamCollector:
+    """Drain an async chunk iterator (or an awaitable returning one)."""
+    collector = StreamCollector(node_id)
+    if inspect.isawaitable(stream):
+        stream = await stream
+    async for chunk in stream:
+        collector.feed(chunk)
+    return collector.finish()
@@ -0,0 +1,97 @@
+"""Prompt templates expanded over variable values into a combinatorial sweep.
+
+A template such as ``"{subject} painted in {style}"`` plus one line per
+variable::
+
+    subject = a red fox | an old lighthouse
+    style = watercolor | ukiyo-e | pixel art
+    aspect_ratio = 1:1 | 16:9
+
+expands to the Cartesian product of the values (here 12 prompts). The
+reserved ``aspect_ratio`` variable sets each request's aspect ratio instead
+of (or as well as) filling a placeholder. With a limit, a seeded random
+sample of the combinations is taken without building the full product, so
+large grids can be previewed cheaply. Combinations keep product order.
+"""
+
+import random
+import re
+from itertools import product
+
+from .options import ASPECT_RATIOS
+
+ASPECT_VARIABLE = "aspect_ratio"
+DEFAULT_VARIABLES = "subject = a red fox | an old lighthouse\nstyle = watercolor | pixel art"
+
+_PLACEHOLDER = re.compile(r"(?<!\{)\{(\w+)\}(?!\})")
+
+
+def parse_variables(text: str) -> dict[str, list[str]]:
+    """Parse ``name = value | value`` lines (``#`` comments and blank lines skipped), in order."""
+    variables: dict[str, list[str]] = {}
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        name, sep, values = line.partition("=")
+        name = name.strip()
+        if not sep or not re.fullmatch(r"\w+", name):
+            raise ValueError(f"Variables line {number}: expected 'name = value | value', got {line!r}")
+        items = [value.strip() for value in values.split("|")]
+        items = [value for value in items if value]
+        if not items:
+            raise ValueError(f"Variables line {number}: '{name}' has no values")
+        if name in variables:
+            raise ValueError(f"Variables line {number}: '{name}' is defined twice")
+        variables[name] = items
+    bad = [value for value in variables.get(ASPECT_VARIABLE, []) if value not in ASPECT_RATIOS]
+    if bad:
+        raise ValueError(f"Unsupported aspect_ratio value(s): {', '.join(bad)} (use {', '.join(ASPECT_RATIOS)})")
+    return variables
+
+
+def placeholders(template: str) -> list[str]:
+    return list(dict.fromkeys(_PLACEHOLDER.findall(template)))
+
+
+def check_template(template: str, variables: dict[str, list[str]]) -> None:
+    """Raise for placeholders without values; warn about variables the template never uses."""
+    missing = [name for name in placeholders(template) if name not in variables]
+    if missing:
+        raise ValueError("No values given for " + ", ".join("{" + name + "}" for name in missing))
+    unused = [name for name in variables if name != ASPECT_VARIABLE and name not in placeholders(template)]
+    if unused:
+        print(f"Gemini sweep: variable(s) {', '.join(unused)} not used in the template; they still multiply the sweep")
+
+
+def combination_count(variables: dict[str, list[str]]) -> int:
+    total = 1
+    for values in variables.values():
+        total *= len(values)
+    return total
+
+
+def _combination(variables: dict[str, list[str]], index: int) -> dict[str, str]:
+    """The ``index``-th combination in product order (last variable varies fastest)."""
+    combo = {}
+    for name, values in reversed(list(variables.items())):
+        index, pick = divmod(index, len(values))
+        combo[name] = values[pick]
+    return {name: combo[name] for name in variables}
+
+
+def expand(variables: dict[str, list[str]], limit: int = 0, seed: int = 0) -> list[dict[str, str]]:
+    """Every combination, or a seeded sample of ``limit`` of them (0 for all)."""
+    if not variables:
+        return [{}]
+    total = combination_count(variables)
+    if not limit or limit >= total:
+        names = list(variables)
+        return [dict(zip(names, values)) for values in product(*variables.values())]
+    picks = sorted(random.Random(seed).sample(range(total), limit))
+    return [_combination(variables, index) for index in picks]
+
+
+def render(template: str, combo: dict[str, str]) -> str:
+    """Fill ``{name}`` placeholders from ``combo``; ``{{doubled}}`` and other braces are left as they are."""
+    return _PLACEHOLDER.sub(lambda m: combo.get(m.group(1), m.group(0)), template)
@@ -0,0 +1,116 @@
+"""Batch API submit, poll and collect against the fake batch endpoints."""
+
+import asyncio
+import uuid
+
+import pytest
+
+from . import batch_jobs, core, fake_backend
+from .batch_jobs import build_requests, describe, is_done, job_results, result_images, state_name, submit, wait_for
+from .core import GenerationSettings, acollect_batch_job, collect_batch_job, submit_batch_job
+from .fake_backend import FakeClient, FakeSettings
+
+
+def fake_client(batch_seconds: float = 0.0, error_rate: float = 0.0) -> FakeClient:
+    client = FakeClient("test", FakeSettings(latency_ms=0, error_rate=error_rate, image_size=8))
+    client.settings.batch_seconds = batch_seconds
+    return client
+
+
+def submitted(client, prompts=("a red fox", "a paper boat", "an owl")):
+    requests = build_requests(list(prompts), [], "Text and Image", "16:9")
+    return submit(client, "gemini-2.5-flash-image", requests)
+
+
+@pytest.fixture
+def fake_backend_env(monkeypatch):
+    monkeypatch.setenv("GEMINI_BACKEND", "fake")
+    monkeypatch.setenv("GEMINI_FAKE_LATENCY_MS", "0")
+    monkeypatch.setenv("GEMINI_FAKE_IMAGE_SIZE", "8")
+    monkeypatch.setenv("GEMINI_FAKE_BATCH_SECONDS", "0.2")
+    monkeypatch.setattr(core, "DEFAULT_POLL_SECONDS", 0.05)
+    # A fresh key gets a fresh fake client (and its own job list) from the pool
+    return f"test-{uuid.uuid4().hex}"
+
+
+def test_build_requests_carries_prompt_references_and_config():
+    reference = type("Ref", (), {"data": b"png", "mime_type": "image/png"})()
+    (request,) = build_requests(["a fox"], [reference], "Image", "3:4")
+    assert request["contents"][0]["parts"] == [{"text": "a fox"}, {"inline_data": {"data": b"png", "mime_type": "image/png"}}]
+    assert request["config"] == {"response_modalities": ["IMAGE"], "image_config": {"aspect_ratio": "3:4"}}
+
+
+def test_submit_poll_and_collect():
+    client = fake_client(batch_seconds=0.2)
+    job = submitted(client)
+    assert state_name(job) == "JOB_STATE_PENDING"
+    done = wait_for(client, job.name, timeout=5, interval=0.05)
+    assert is_done(done) and state_name(done) == "JOB_STATE_SUCCEEDED"
+    results = job_results(done)
+    assert [error for _, error in results] == [None, None, None]
+    assert len(result_images(results)) == 3
+    assert "3 of 3 requests returned images" in describe(done, results)
+
+
+def test_per_request_errors_are_reported_by_index(monkeypatch):
+    client = fake_client(error_rate=0.5)
+    job = submitted(client)
+    # Only the second request draws a simulated 503
+    monkeypatch.setattr(fake_backend.random, "random", iter([0.9, 0.1, 0.9]).__next__)
+    results = job_results(wait_for(client, job.name, timeout=5, interval=0.05))
+    assert [error is None for _, error in results] == [True, False, True]
+    assert len(result_images(results)) == 2
+    status = describe(client.batches.get(job.name), results)
+    assert "2 of 3 requests returned images" in status
+    assert "[1] Error: 503 UNAVAILABLE (simulated)" in status
+
+
+def test_wait_gives_up_at_the_timeout():
+    client = fake_client(batch_seconds=60)
+    job = submitted(client)
+    running = wait_for(client, job.name, timeout=0.1, interval=0.05)
+    assert state_name(running) == "JOB_STATE_RUNNING"
+    assert job_results(running) == []
+
+
+def test_interrupt_stops_the_wait(monkeypatch, fake_backend_env):
+    monkeypatch.setenv("GEMINI_FAKE_BATCH_SECONDS", "60")
+    settings = GenerationSettings("gemini-2.5-flash-image", "1:1", "Image")
+    handle, name = submit_batch_job(settings, fake_backend_env, "a red fox").outputs
+
+    def interrupted():
+        raise InterruptedError("Interrupted")
+
+    monkeypatch.setattr(batch_jobs, "check_interrupted", interrupted)
+    # Interrupt is re-raised by the node run rather than reported as a status
+    with pytest.raises(InterruptedError):
+        collect_batch_job(True, 60, handle)
+    with pytest.raises(InterruptedError):
+        asyncio.run(acollect_batch_job(True, 60, job_name=name, api_key=fake_backend_env))
+
+
+def test_empty_prompt_is_not_submitted(fake_backend_env):
+    run = submit_batch_job(GenerationSettings("gemini-2.5-flash-image", "1:1", "Image"), fake_backend_env, " \n\n ")
+    assert run.message == "At least one prompt line is required"
+    assert run.outputs == (None, "")
+
+
+def test_node_runs_submit_then_collect(fake_backend_env):
+    pytest.importorskip("torch")
+    settings = GenerationSettings("gemini-2.5-flash-image", "1:1", "Image")
+    run = submit_batch_job(settings, fake_backend_env, "a red fox\n\na paper boat\n")
+    handle, name = run.outputs
+    assert not run.message and handle.count == 2 and name == handle.name
+
+    pending = collect_batch_job(False, 0, handle)
+    assert pending.level == "warning" and "JOB_STATE_RUNNING" in pending.message
+
+    collected = asyncio.run(acollect_batch_job(True, 1, job_name=name, api_key=fake_backend_env))
+    image, status = collected.outputs
+    assert not collected.message and int(image.shape[0]) == 2
+    assert "2 of 2 requests returned images" in status
+
+
+def test_collect_reports_a_missing_job(fake_backend_env):
+    run = collect_batch_job(True, 1, job_name="batches/missing", api_key=fake_backend_env)
+    assert "not found" in run.message
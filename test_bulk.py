@@ -0,0 +1,168 @@
+"""Prompt file parsing, and resume, change detection and Interrupt for bulk runs against the fake backend."""
+
+import json
+import os
+import uuid
+
+import pytest
+
+from .bulk import MANIFEST_NAME, make_fingerprint, make_generate, read_rows, run_bulk
+from .core import Engine, GenerationSettings
+
+
+@pytest.fixture(autouse=True)
+def fake_backend(monkeypatch):
+    monkeypatch.setenv("GEMINI_BACKEND", "fake")
+    monkeypatch.setenv("GEMINI_FAKE_LATENCY_MS", "0")
+    monkeypatch.setenv("GEMINI_FAKE_IMAGE_SIZE", "8")
+
+
+def settings(aspect_ratio: str = "1:1") -> GenerationSettings:
+    return GenerationSettings("gemini-2.5-flash-image", aspect_ratio, "Image")
+
+
+def engine() -> Engine:
+    pytest.importorskip("google.genai")
+    # A fresh key gets a fresh fake client from the pool
+    return Engine.connect(f"test-{uuid.uuid4().hex}")
+
+
+def bulk(prompt_file, output_dir, request=None, generate=None, workers=2):
+    request = request or settings()
+    generate = generate or make_generate(engine(), request)
+    return run_bulk(read_rows(str(prompt_file)), generate, str(output_dir), workers,
+                    fingerprint=make_fingerprint(request))
+
+
+def manifest(output_dir) -> list[dict]:
+    with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_full_rerun_skips_every_row(tmp_path):
+    prompts = tmp_path / "prompts.txt"
+    prompts.write_text("a red fox\nan old lighthouse\n# comment\na paper boat\n", encoding="utf-8")
+    first = bulk(prompts, tmp_path / "out")
+    assert (first["done"], first["skipped"], first["images"]) == (3, 0, 3)
+    again = bulk(prompts, tmp_path / "out")
+    assert (again["done"], again["skipped"]) == (0, 3)
+
+
+def test_partial_manifest_resumes_the_missing_rows(tmp_path):
+    prompts = tmp_path / "prompts.txt"
+    prompts.write_text("".join(f"prompt {i}\n" for i in range(6)), encoding="utf-8")
+    out = tmp_path / "out"
+    bulk(prompts, out)
+    entries = manifest(out)
+    # Keep two finished rows and a line cut short by a crash; delete one kept row's image
+    with open(out / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        for entry in entries[:3]:
+            f.write(json.dumps(entry) + "\n")
+        f.write(json.dumps(entries[3])[:20])
+    os.remove(out / entries[2]["files"][0])
+    resumed = bulk(prompts, out)
+    assert (resumed["done"], resumed["skipped"], resumed["failed"]) == (4, 2, 0)
+
+
+def test_reordered_text_file_regenerates_moved_rows(tmp_path):
+    prompts = tmp_path / "prompts.txt"
+    prompts.write_text("a red fox\nan old lighthouse\na paper boat\n", encoding="utf-8")
+    bulk(prompts, tmp_path / "out")
+    # Text rows are identified by position, so every row now asks for a different prompt
+    prompts.write_text("a paper boat\na red fox\nan old lighthouse\n", encoding="utf-8")
+    resumed = bulk(prompts, tmp_path / "out")
+    assert (resumed["done"], resumed["skipped"]) == (3, 0)
+
+
+def test_edited_row_with_an_id_is_the_only_one_regenerated(tmp_path):
+    prompts = tmp_path / "prompts.csv"
+    prompts.write_text("id,prompt\nfox,a red fox\nboat,a paper boat\nowl,an owl\n", encoding="utf-8")
+    bulk(prompts, tmp_path / "out")
+    prompts.write_text("id,prompt\nowl,an owl\nfox,a red fox at night\nboat,a paper boat\n", encoding="utf-8")
+    resumed = bulk(prompts, tmp_path / "out")
+    assert (resumed["done"], resumed["skipped"]) == (1, 2)
+    assert manifest(tmp_path / "out")[-1]["prompt"] == "a red fox at night"
+
+
+def test_changed_settings_regenerate_every_row(tmp_path):
+    prompts = tmp_path / "prompts.txt"
+    prompts.write_text("a red fox\na paper boat\n", encoding="utf-8")
+    bulk(prompts, tmp_path / "out")
+    resumed = bulk(prompts, tmp_path / "out", request=settings("16:9"))
+    assert (resumed["done"], resumed["skipped"]) == (2, 0)
+
+
+def test_interrupt_stops_the_run_without_failing_rows(tmp_path):
+    prompts = tmp_path / "prompts.txt"
+    prompts.write_text("".join(f"prompt {i}\n" for i in range(12)), encoding="utf-8")
+    out = tmp_path / "out"
+    request = settings()
+    fetch = make_generate(engine(), request)
+    calls = []
+
+    def generate(row):
+        calls.append(row.row_id)
+        if len(calls) == 3:
+            # What the scheduler raises once ComfyUI's Interrupt is pressed
+            raise InterruptedError("Interrupted")
+        return fetch(row)
+
+    with pytest.raises(InterruptedError):
+        bulk(prompts, out, request, generate)
+    entries = manifest(out) if os.path.exists(out / MANIFEST_NAME) else []
+    assert all(entry["status"] == "done" for entry in entries)
+    # The rest of the window was dropped rather than sent
+    assert len(calls) < 12
+    resumed = bulk(prompts, out, request)
+    assert resumed["failed"] == 0
+    assert resumed["done"] + resumed["skipped"] == 12
+    # Rows already sent may still land after the run stopped; none is lost or counted twice
+    assert resumed["skipped"] >= len(entries)
+
+
+def test_interrupt_between_completions_drops_queued_rows(tmp_path, monkeypatch):
+    from . import bulk as bulk_module
+
+    prompts = tmp_path / "prompts.txt"
+    prompts.write_text("".join(f"prompt {i}\n" for i in range(20)), encoding="utf-8")
+    out = tmp_path / "out"
+    request = settings()
+    fetch = make_generate(engine(), request)
+    calls = []
+
+    def generate(row):
+        calls.append(row.row_id)
+        return fetch(row)
+
+    def check_interrupted():
+        # Interrupt pressed once the first rows are back
+        if len(calls) >= 2:
+            raise InterruptedError("Interrupted")
+
+    original = bulk_module.check_interrupted
+    monkeypatch.setattr(bulk_module, "check_interrupted", check_interrupted)
+    with pytest.raises(InterruptedError):
+        bulk(prompts, out, request, generate, workers=2)
+    # At most one window (2 x workers) was ever submitted
+    assert len(calls) <= 4
+    monkeypatch.setattr(bulk_module, "check_interrupted", original)
+    resumed = bulk(prompts, out, request)
+    assert resumed["failed"] == 0 and resumed["done"] + resumed["skipped"] == 20
+
+
+def test_excel_csv_with_byte_order_mark(tmp_path):
+    prompts = tmp_path / "prompts.csv"
+    prompts.write_bytes("prompt,id\na red fox,fox\n".encode("utf-8-sig"))
+    (row,) = read_rows(str(prompts))
+    assert row.prompt == "a red fox" and row.row_id == "fox"
+
+
+@pytest.mark.parametrize("name, content", [
+    ("prompts.csv", "text,id\na red fox,fox\n"),
+    ("prompts.jsonl", '{"text": "a red fox"}\n{"caption": "an owl"}\n'),
+])
+def test_file_without_a_prompt_column_is_an_error(tmp_path, name, content):
+    prompts = tmp_path / name
+    prompts.write_text(content, encoding="utf-8")
+    with pytest.raises(ValueError, match="prompt"):
+        read_rows(str(prompts))
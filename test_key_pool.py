@@ -0,0 +1,106 @@
+"""Unit tests for API-key pool rotation and quarantine."""
+
+from types import SimpleNamespace
+
+from .key_pool import KeyPool, get_key_pool
+
+
+def http_error(code: int, retry: str | None = None):
+    error = Exception(f"HTTP {code}")
+    error.code = code
+    error.response = SimpleNamespace(headers={"retry-after": retry} if retry else {})
+    return error
+
+
+def pool_of(*keys: str) -> KeyPool:
+    pool = KeyPool()
+    pool.sync({f"k{i}": key for i, key in enumerate(keys)})
+    return pool
+
+
+def test_round_robin_cycles_through_keys():
+    pool = pool_of("key-aaaa-1111", "key-bbbb-2222", "key-cccc-3333")
+    assert [pool.acquire() for _ in range(6)] == ["key-aaaa-1111", "key-bbbb-2222", "key-cccc-3333"] * 2
+
+
+def test_sync_drops_duplicates_and_empty_keys():
+    pool = KeyPool()
+    pool.sync({"node": "key-aaaa-1111", "default": "key-aaaa-1111", "empty": "", "named": "key-bbbb-2222"})
+    assert len(pool) == 2
+
+
+def test_throttled_key_is_skipped_and_reported():
+    pool = pool_of("key-aaaa-1111", "key-bbbb-2222")
+    key = pool.acquire()
+    throttled = http_error(429)
+    pool.report_error(key, throttled)
+    assert pool.can_switch(throttled)
+    assert [pool.acquire() for _ in range(3)] == ["key-bbbb-2222"] * 3
+    stats = pool.stats()["k0 (...1111)"]
+    assert stats["quarantined"] and stats["throttles"] == 1
+
+
+def test_other_errors_do_not_quarantine():
+    pool = pool_of("key-aaaa-1111", "key-bbbb-2222")
+    server_error = http_error(500)
+    pool.report_error("key-aaaa-1111", server_error)
+    assert not pool.can_switch(server_error)
+    assert not pool.stats()["k0 (...1111)"]["quarantined"]
+    assert pool.acquire() == "key-aaaa-1111"
+
+
+def test_least_throttled_prefers_keys_never_throttled():
+    pool = pool_of("key-aaaa-1111", "key-bbbb-2222")
+    pool.report_error("key-bbbb-2222", http_error(429, retry="0"))
+    # The quarantine is over, but the key was throttled more recently than the other
+    assert pool.acquire("Least Throttled") == "key-aaaa-1111"
+    assert pool.acquire("Least Throttled") == "key-aaaa-1111"
+
+
+def test_all_quarantined_uses_the_key_free_first():
+    pool = pool_of("key-aaaa-1111", "key-bbbb-2222")
+    pool.report_error("key-aaaa-1111", http_error(429, retry="120"))
+    pool.report_error("key-bbbb-2222", http_error(429, retry="30"))
+    assert not pool.can_switch(http_error(429))
+    assert pool.acquire() == "key-bbbb-2222"
+
+
+class Store:
+    def __init__(self, default: str = "", named: dict | None = None):
+        self.default = default
+        self.named = named or {}
+
+    def load_api_key(self) -> str:
+        return self.default
+
+    def named_keys(self) -> dict:
+        return dict(self.named)
+
+
+def test_pools_are_kept_per_key_set(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEYS", raising=False)
+    store = Store("key-dddd-4444", {"team": "key-eeee-5555"})
+    first = get_key_pool(store, "key-ffff-6666")
+    assert first.keys() == ["key-ffff-6666", "key-dddd-4444", "key-eeee-5555"]
+    first.report_error("key-dddd-4444", http_error(429, retry="120"))
+    # Another node key gets its own pool and leaves the first one's keys alone
+    other = get_key_pool(store, "key-gggg-7777")
+    assert other is not first and "key-ffff-6666" in first.keys()
+    # The same key set comes back with its quarantine history
+    again = get_key_pool(store, "key-ffff-6666")
+    assert again is first and again.stats()["default (...4444)"]["quarantined"]
+
+
+def test_env_keys_join_the_pool(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEYS", " key-hhhh-8888, ,key-iiii-9999 ")
+    assert get_key_pool(Store()).keys() == ["key-hhhh-8888", "key-iiii-9999"]
+
+
+def test_a_single_env_key_degrades_to_single_key(monkeypatch):
+    from . import core
+
+    monkeypatch.setenv("GEMINI_BACKEND", "fake")
+    monkeypatch.setenv("GEMINI_API_KEYS", "key-jjjj-0000")
+    monkeypatch.setattr(core, "get_key_store", lambda: Store())
+    engine = core.Engine.connect("", "Round Robin")
+    assert engine.key_pool is None and engine.client.api_key == "key-jjjj-0000"
@@ -0,0 +1,60 @@
+"""Unit tests for memory-capped staging and assembly of batch outputs."""
+
+import pytest
+
+from .output_buffer import OutputBuffer
+
+torch = pytest.importorskip("torch")
+
+MB = 1024 * 1024
+
+
+def frames(count: int, value: float, size: int = 256):
+    # 256x256x3 float32 is 0.75 MB per frame
+    return torch.full((count, size, size, 3), value, dtype=torch.float32)
+
+
+@pytest.fixture(autouse=True)
+def spill_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("GEMINI_SPILL_DIR", str(tmp_path))
+
+
+def test_without_budget_everything_stays_in_memory():
+    buffer = OutputBuffer(0)
+    slots = [buffer.add(frames(1, 0.25)), buffer.add(frames(2, 0.5))]
+    image = buffer.assemble(slots)
+    assert tuple(image.shape) == (3, 256, 256, 3)
+    assert buffer.spilled == 0 and buffer.mapped_output == 0
+    assert buffer.images == 3
+
+
+def test_results_over_budget_spill_and_assemble_in_order():
+    buffer = OutputBuffer(1)
+    slots = [buffer.add(frames(1, 0.25)), buffer.add(frames(1, 0.5)), buffer.add(frames(1, 0.75))]
+    assert slots[0].tensor is not None
+    assert slots[1].tensor is None and slots[2].tensor is None
+    assert buffer.spilled == 2 * 256 * 256 * 3 * 4
+    image = buffer.assemble(slots)
+    assert [float(image[i].mean()) for i in range(3)] == pytest.approx([0.25, 0.5, 0.75])
+    # Three frames do not fit in 1 MB either, so the batch itself is file backed
+    assert buffer.mapped_output == 3 * 256 * 256 * 3 * 4
+    assert buffer.peak <= 1 * MB
+
+
+def test_failed_items_become_black_frames_and_sizes_are_padded():
+    buffer = OutputBuffer(1)
+    slots = [buffer.add(frames(1, 1.0, size=128)), buffer.add(None), buffer.add(frames(1, 0.5))]
+    assert slots[1] is None
+    image = buffer.assemble(slots)
+    assert tuple(image.shape) == (3, 256, 256, 3)
+    assert float(image[0, :128, :128].mean()) == pytest.approx(1.0)
+    assert float(image[0, 128:].max()) == 0
+    assert float(image[1].max()) == 0
+    assert float(image[2].mean()) == pytest.approx(0.5)
+
+
+def test_describe_reports_spilled_and_mapped_bytes():
+    buffer = OutputBuffer(1)
+    buffer.assemble([buffer.add(frames(1, 0.1)), buffer.add(frames(1, 0.2))])
+    line = buffer.describe()
+    assert "2 image(s)" in line and "spilled to disk" in line and "memory-mapped" in line
@@ -0,0 +1,94 @@
+"""Unit tests for the on-disk response cache and how the engine uses it per cache mode."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from . import core
+from .core import Engine, GenerationSettings
+from .metrics import RequestMetrics
+from .response_cache import ResponseCache
+from .response_parts import ResponseParts
+
+
+def parts(data: bytes = b"png", text: str = "") -> ResponseParts:
+    return ResponseParts(images=[data], mime_types=["image/png"], texts=[text] if text else [])
+
+
+def response(data: bytes):
+    inline = SimpleNamespace(data=data, mime_type="image/png")
+    part = SimpleNamespace(text=None, inline_data=inline)
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), 1024 * 1024)
+    monkeypatch.setattr(core, "get_cache", lambda: cache)
+    return cache
+
+
+def test_miss_then_hit(cache):
+    assert cache.get("ab12") is None
+    cache.put("ab12", parts(b"image bytes", "caption"))
+    hit = cache.get("ab12")
+    assert hit.images == [b"image bytes"] and hit.texts == ["caption"] and hit.mime_types == ["image/png"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_entries_survive_a_new_instance(cache, tmp_path):
+    cache.put("ab12", parts())
+    reopened = ResponseCache(str(tmp_path), 1024 * 1024)
+    assert reopened.get("ab12").images == [b"png"]
+
+
+def test_empty_answers_are_not_cached(cache):
+    cache.put("ab12", ResponseParts(texts=["no image"]))
+    assert cache.get("ab12") is None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), 2500)
+    cache.put("aa01", parts(b"x" * 1000))
+    cache.put("bb02", parts(b"y" * 1000))
+    cache.get("aa01")
+    cache.put("cc03", parts(b"z" * 1000))
+    assert cache.get("bb02") is None
+    assert cache.get("aa01") is not None and cache.get("cc03") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_refresh_overwrites_an_entry_and_its_size(cache):
+    cache.put("ab12", parts(b"s" * 1000))
+    cache.put("ab12", parts(b"fresh"))
+    assert cache.get("ab12").images == [b"fresh"]
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] < 1000
+
+
+def test_use_cache_replays_a_stored_response(cache):
+    settings = GenerationSettings("model", "1:1", "Image", cache_mode="Use Cache")
+    cache.put("ab12", parts(b"stored"))
+    metrics = RequestMetrics("v1")
+    assert Engine._cached(settings, "ab12", metrics).images == [b"stored"]
+    assert metrics.cached
+
+
+def test_refresh_skips_the_lookup_and_overwrites_the_entry(cache):
+    settings = GenerationSettings("model", "1:1", "Image", cache_mode="Refresh")
+    cache.put("ab12", parts(b"stale"))
+    metrics = RequestMetrics("v1")
+    assert Engine._cached(settings, "ab12", metrics) is None
+    Engine._parse(settings, response(b"fresh"), "ab12", metrics)
+    assert cache.get("ab12").images == [b"fresh"]
+
+
+def test_bypass_and_sessions_never_touch_the_cache(cache):
+    cache.put("ab12", parts(b"stored"))
+    session = SimpleNamespace(session_id="chat")
+    for settings in (GenerationSettings("model", "1:1", "Image", cache_mode="Bypass"),
+                     GenerationSettings("model", "1:1", "Image", cache_mode="Use Cache", session=session)):
+        metrics = RequestMetrics("v1")
+        assert Engine._cached(settings, "ab12", metrics) is None
+        Engine._parse(settings, response(b"fresh"), "ab12", metrics)
+    assert cache.get("ab12").images == [b"stored"]
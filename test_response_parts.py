@@ -0,0 +1,48 @@
+"""Unit tests for reducing Gemini responses to text and image parts."""
+
+from types import SimpleNamespace
+
+from .fake_backend import FakeClient, FakeSettings
+from .response_parts import ResponseParts
+
+
+def candidate(*parts, index=None):
+    return SimpleNamespace(index=index, content=SimpleNamespace(parts=list(parts)))
+
+
+def text(value: str):
+    return SimpleNamespace(text=value, inline_data=None)
+
+
+def image(data: bytes):
+    return SimpleNamespace(text=None, inline_data=SimpleNamespace(data=data, mime_type="image/jpeg"))
+
+
+def test_candidates_are_separated_by_newlines():
+    result = SimpleNamespace(candidates=[candidate(text("a fox"), image(b"1")), candidate(text("an owl"), image(b"2"))])
+    parts = ResponseParts.from_result(result)
+    assert parts.texts == ["a fox", "an owl"] and parts.text == "a fox\nan owl"
+    assert parts.images == [b"1", b"2"] and parts.mime_types == ["image/jpeg"] * 2
+
+
+def test_text_parts_of_one_candidate_are_concatenated():
+    parts = ResponseParts.from_result(SimpleNamespace(candidates=[candidate(text("a red "), text("fox"))]))
+    assert parts.text == "a red fox"
+
+
+def test_streamed_chunks_join_their_candidate():
+    parts = ResponseParts()
+    for chunk in ([candidate(text("a red "), index=0)], [candidate(text("an "), index=1)],
+                  [candidate(text("fox"), index=0)], [candidate(text("owl"), index=1)]):
+        parts.add_candidates(chunk)
+    assert parts.text == "a red fox\nan owl"
+
+
+def test_fake_stream_keeps_each_candidate_apart():
+    client = FakeClient("test", FakeSettings(latency_ms=0, image_size=8))
+    config = SimpleNamespace(candidate_count=3)
+    parts = ResponseParts()
+    for chunk in client.models.generate_content_stream(model="m", contents="a fox", config=config):
+        parts.add_candidates(chunk.candidates)
+    assert parts.text == "fake image\nfake image\nfake image"
+    assert len(parts.images) == 3
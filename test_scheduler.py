@@ -0,0 +1,116 @@
+"""Unit tests for the request scheduler's budget reservation and settlement."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from . import scheduler as scheduler_module
+from .scheduler import RequestScheduler
+
+
+def usage(total: int):
+    return SimpleNamespace(usage_metadata=SimpleNamespace(total_token_count=total))
+
+
+def test_unlimited_budgets_never_wait():
+    scheduler = RequestScheduler()
+    assert all(scheduler._reserve(10_000) == 0 for _ in range(100))
+
+
+def test_rpm_budget_runs_out_then_waits():
+    scheduler = RequestScheduler(rpm=2)
+    assert scheduler._reserve(0) == 0
+    assert scheduler._reserve(0) == 0
+    # One request refills every 30 s at 2 RPM
+    assert scheduler._reserve(0) == pytest.approx(30, abs=0.1)
+
+
+def test_tpm_reservation_is_capped_at_capacity():
+    scheduler = RequestScheduler(tpm=1000)
+    # A request bigger than the whole budget must still go out once the bucket is full
+    assert scheduler._reserve(5000) == 0
+    assert scheduler._tokens.level == pytest.approx(0, abs=1)
+
+
+def test_settle_refunds_overestimated_tokens():
+    scheduler = RequestScheduler(tpm=1000)
+    assert scheduler._reserve(600) == 0
+    scheduler._settle(600, usage(100))
+    assert scheduler._tokens.level == pytest.approx(900, abs=1)
+    # 900 left, so 800 more fits without waiting
+    assert scheduler._reserve(800) == 0
+
+
+def test_settle_charges_underestimated_tokens_and_caps_refunds():
+    scheduler = RequestScheduler(tpm=1000)
+    scheduler._reserve(100)
+    scheduler._settle(100, usage(700))
+    assert scheduler._tokens.level == pytest.approx(300, abs=1)
+    assert scheduler._reserve(500) > 0
+    scheduler._settle(1000, usage(0))
+    assert scheduler._tokens.level == pytest.approx(1000)
+
+
+def test_settle_ignores_missing_usage():
+    scheduler = RequestScheduler(tpm=1000)
+    scheduler._reserve(400)
+    scheduler._settle(400, SimpleNamespace())
+    assert scheduler._tokens.level == pytest.approx(600, abs=1)
+
+
+def test_call_retries_retryable_errors(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    scheduler = RequestScheduler(max_retries=2)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("dropped")
+        return "ok"
+
+    assert scheduler.call(flaky) == "ok"
+    assert scheduler.stats()["retries"] == 2
+
+
+def test_call_raises_other_errors_at_once():
+    scheduler = RequestScheduler()
+
+    def rejected():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.call(rejected)
+    assert scheduler.stats()["retries"] == 0
+    assert scheduler.stats()["failures"] == 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_interrupt_stops_retries(monkeypatch, use_async):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    scheduler = RequestScheduler(max_retries=5)
+    attempts = []
+
+    def interrupt_after_first_attempt():
+        if attempts:
+            raise InterruptedError("Interrupted")
+
+    def flaky():
+        attempts.append(1)
+        raise ConnectionError("dropped")
+
+    async def aflaky():
+        flaky()
+
+    async def no_wait(seconds):
+        pass
+
+    monkeypatch.setattr(scheduler_module, "check_interrupted", interrupt_after_first_attempt)
+    monkeypatch.setattr(scheduler_module.asyncio, "sleep", no_wait)
+    with pytest.raises(InterruptedError):
+        if use_async:
+            asyncio.run(scheduler.acall(aflaky))
+        else:
+            scheduler.call(flaky)
+    assert len(attempts) == 1
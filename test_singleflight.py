@@ -0,0 +1,135 @@
+"""Unit tests for single-flight coalescing and cancellation."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from .singleflight import SingleFlight
+
+
+def slow(calls: list, result=42, delay: float = 0.1):
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+
+    return fn
+
+
+def test_concurrent_callers_share_one_call():
+    async def main():
+        flights, calls = SingleFlight(), []
+        results = await asyncio.gather(*(flights.ado("k", slow(calls)) for _ in range(3)))
+        assert results == [(42, False), (42, True), (42, True)]
+        assert calls == [1]
+        assert flights.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 2}
+
+    asyncio.run(main())
+
+
+def test_cancelled_leader_does_not_fail_followers():
+    async def main():
+        flights, calls = SingleFlight(), []
+        leader = asyncio.create_task(flights.ado("k", slow(calls)))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flights.ado("k", slow(calls)))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        # The call keeps running for the follower, which gets its result
+        assert await follower == (42, True)
+        assert calls == [1]
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(main())
+
+
+def test_call_is_cancelled_once_every_caller_left():
+    async def main():
+        flights, calls, finished = SingleFlight(), [], []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            finished.append(1)
+            return 42
+
+        caller = asyncio.create_task(flights.ado("k", fn))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.01)
+        assert flights.stats()["in_flight"] == 0
+        # Nobody waits for the old call any more; the next caller leads a fresh one
+        assert await flights.ado("k", fn) == (42, False)
+        assert calls == [1, 1]
+        assert finished == [1]
+
+    asyncio.run(main())
+
+
+def test_errors_are_shared_with_followers():
+    async def main():
+        flights = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise ValueError("rejected")
+
+        outcomes = await asyncio.gather(flights.ado("k", failing), flights.ado("k", failing),
+                                        return_exceptions=True)
+        assert [type(outcome) for outcome in outcomes] == [ValueError, ValueError]
+        assert flights.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_threads_share_one_call():
+    flights, calls, results = SingleFlight(), [], []
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 7
+
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", fetch)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do("k", fetch)))
+    follower.start()
+    while flights.stats()["coalesced"] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert sorted(results, key=lambda r: r[1]) == [(7, False), (7, True)]
+    assert calls == [1]
+
+
+def test_thread_follower_retries_when_the_flight_is_cancelled():
+    flights, calls = SingleFlight(), []
+    results = []
+
+    async def leader():
+        task = asyncio.create_task(flights.ado("k", slow(calls, delay=0.2)))
+        await asyncio.sleep(0.05)
+        follower.start()
+        await asyncio.sleep(0.05)
+        # The thread still waits, so the call outlives its caller until asyncio.run cancels it on exit
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert flights.stats()["in_flight"] == 1
+
+    def fetch():
+        calls.append(1)
+        return 7
+
+    follower = threading.Thread(target=lambda: results.append(flights.do("k", fetch)))
+    asyncio.run(leader())
+    follower.join(5)
+    assert results == [(7, False)]
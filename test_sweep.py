@@ -0,0 +1,80 @@
+"""Unit tests for prompt sweep template parsing and expansion."""
+
+import pytest
+
+from .sweep import check_template, combination_count, expand, parse_variables, placeholders, render
+
+
+def test_parse_variables_keeps_order_and_skips_comments():
+    text = "# subjects\nsubject = a red fox | an old lighthouse\n\nstyle = watercolor|  | pixel art\n"
+    assert parse_variables(text) == {
+        "subject": ["a red fox", "an old lighthouse"],
+        "style": ["watercolor", "pixel art"],
+    }
+
+
+@pytest.mark.parametrize("text, message", [
+    ("subject a | b", "expected 'name = value | value'"),
+    ("two words = a", "expected 'name = value | value'"),
+    ("subject = | ", "has no values"),
+    ("subject = a\nsubject = b", "defined twice"),
+    ("aspect_ratio = 1:1 | 2:1", "Unsupported aspect_ratio"),
+])
+def test_parse_variables_rejects_bad_lines(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_variables(text)
+
+
+def test_placeholders_ignore_doubled_braces():
+    assert placeholders("{subject} in {style}, {{literal}} {subject}") == ["subject", "style"]
+
+
+def test_check_template_requires_every_placeholder():
+    with pytest.raises(ValueError, match=r"\{style\}"):
+        check_template("{subject} in {style}", {"subject": ["fox"]})
+    # Unused variables only warn; aspect_ratio never needs a placeholder
+    check_template("{subject}", {"subject": ["fox"], "mood": ["calm"], "aspect_ratio": ["1:1"]})
+
+
+def test_expand_is_the_product_in_order():
+    variables = {"subject": ["fox", "cat"], "style": ["ink", "oil", "pixel"]}
+    combos = expand(variables)
+    assert combination_count(variables) == len(combos) == 6
+    assert combos[:3] == [
+        {"subject": "fox", "style": "ink"},
+        {"subject": "fox", "style": "oil"},
+        {"subject": "fox", "style": "pixel"},
+    ]
+    assert expand({}) == [{}]
+
+
+def test_expand_sample_is_seeded_and_keeps_product_order():
+    variables = {"a": [str(i) for i in range(10)], "b": [str(i) for i in range(10)]}
+    full = expand(variables)
+    sample = expand(variables, limit=7, seed=3)
+    assert sample == expand(variables, limit=7, seed=3)
+    assert len(sample) == 7
+    assert sorted(sample, key=full.index) == sample
+    assert all(combo in full for combo in sample)
+    assert expand(variables, limit=1000) == full
+
+
+def test_render_fills_known_placeholders_only():
+    combo = {"subject": "a fox", "style": "ink"}
+    assert render("{subject} in {style}, {{style}} {other}", combo) == "a fox in ink, {{style}} {other}"
+
+
+def test_prompts_line_up_with_every_returned_image():
+    torch = pytest.importorskip("torch")
+    from .core import _swept
+
+    outcomes = [
+        (torch.zeros((2, 8, 8, 3), dtype=torch.float32), None),
+        (None, ValueError("blocked")),
+        (torch.zeros((1, 8, 8, 3), dtype=torch.float32), None),
+    ]
+    run = _swept(["fox", "cat", "owl"], outcomes)
+    image, prompts = run.outputs
+    assert prompts == ["fox", "fox", "cat", "owl"]
+    assert int(image.shape[0]) == len(prompts)
+    assert run.level == "warning" and "1 of 3 combinations failed" in run.message
@@ -0,0 +1,47 @@
+"""Unit tests for the byte-bounded cache of encoded reference images."""
+
+import pytest
+
+from . import upload_encoder
+from .upload_encoder import encode_reference
+
+torch = pytest.importorskip("torch")
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(upload_encoder, "_encoded", upload_encoder.OrderedDict())
+    monkeypatch.setattr(upload_encoder, "_encoded_bytes", 0)
+
+
+def frames(count: int):
+    return torch.stack([torch.full((16, 16, 3), i / count) for i in range(count)])
+
+
+def test_same_frame_and_settings_reuse_the_payload(monkeypatch):
+    monkeypatch.setattr(upload_encoder, "_max_bytes", 1024 * 1024)
+    images = frames(2)
+    first = encode_reference(images, 0)
+    assert encode_reference(images, 0) is first
+    assert encode_reference(images, 0, fmt="JPEG") is not first
+    assert encode_reference(images, 1) is not first
+
+
+def test_cache_is_bounded_by_bytes(monkeypatch):
+    images = frames(4)
+    sizes = [len(encode_reference(images, i).data) for i in range(4)]
+    monkeypatch.setattr(upload_encoder, "_encoded", upload_encoder.OrderedDict())
+    monkeypatch.setattr(upload_encoder, "_encoded_bytes", 0)
+    monkeypatch.setattr(upload_encoder, "_max_bytes", sizes[2] + sizes[3])
+    encoded = [encode_reference(images, i) for i in range(4)]
+    assert upload_encoder._encoded_bytes == sizes[2] + sizes[3]
+    # The oldest frames were evicted, the newest are still reused
+    assert encode_reference(images, 3) is encoded[3]
+    assert encode_reference(images, 2) is encoded[2]
+    assert encode_reference(images, 0) is not encoded[0]
+
+
+def test_payload_larger_than_the_bound_is_not_kept(monkeypatch):
+    monkeypatch.setattr(upload_encoder, "_max_bytes", 1)
+    encode_reference(frames(1), 0)
+    assert not upload_encoder._encoded and upload_encoder._encoded_bytes == 0
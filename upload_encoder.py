@@ -0,0 +1,174 @@
+"""Encoding of reference images before upload.
+
+Handing the SDK a full-resolution PIL image makes it serialize a large PNG
+on every call. Here a reference frame can be downscaled to the size Gemini
+will generate for the selected aspect ratio (it gains nothing from more
+pixels) and encoded as PNG, JPEG or WebP. Encoded payloads are kept in an
+in-memory LRU bounded by ``GEMINI_ENCODE_CACHE_MB`` (default 64), so
+re-sending the same tensor with the same settings skips the encode entirely. Several reference frames are encoded
+concurrently; Pillow releases the GIL while resizing and compressing.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+from .fingerprint import bytes_digest, tensor_digest
+from .image_convert import tensor_to_pil
+
+REFERENCE_RESIZE = ["Original", "Match Output Size"]
+REFERENCE_FORMATS = ["PNG", "JPEG", "WEBP"]
+DEFAULT_QUALITY = 90
+
+# Output resolution Gemini 2.5 Flash Image produces for each aspect ratio
+OUTPUT_SIZES = {
+    "1:1": (1024, 1024),
+    "3:4": (864, 1184),
+    "4:3": (1184, 864),
+    "9:16": (768, 1344),
+    "16:9": (1344, 768),
+}
+
+_MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+DEFAULT_CACHE_MB = 64
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    data: bytes
+    mime_type: str
+    size: tuple[int, int]
+    raw_bytes: int
+
+    @property
+    def digest(self) -> str:
+        return bytes_digest(self.data)
+
+
+_lock = threading.Lock()
+_encoded: "OrderedDict[tuple, EncodedImage]" = OrderedDict()
+_encoded_bytes = 0
+_max_bytes: int | None = None
+
+
+def _cache_limit() -> int:
+    """Byte bound of the payload cache, read from the environment on first use."""
+    global _max_bytes
+    if _max_bytes is None:
+        try:
+            max_mb = float(os.environ.get("GEMINI_ENCODE_CACHE_MB", DEFAULT_CACHE_MB))
+        except ValueError:
+            max_mb = DEFAULT_CACHE_MB
+        _max_bytes = int(max_mb * 1024 * 1024)
+    return _max_bytes
+
+
+def _remember(key: tuple, encoded: EncodedImage) -> None:
+    """Add a payload, evicting least recently used ones until the cache fits its byte bound."""
+    global _encoded_bytes
+    limit = _cache_limit()
+    if len(encoded.data) > limit:
+        return
+    with _lock:
+        previous = _encoded.pop(key, None)
+        if previous is not None:
+            _encoded_bytes -= len(previous.data)
+        _encoded[key] = encoded
+        _encoded_bytes += len(encoded.data)
+        while _encoded_bytes > limit:
+            _, evicted = _encoded.popitem(last=False)
+            _encoded_bytes -= len(evicted.data)
+
+
+def _max_side(aspect_ratio: str) -> int:
+    return max(OUTPUT_SIZES.get(aspect_ratio, (1024, 1024)))
+
+
+def _encode(pil_img, fmt: str, quality: int) -> bytes:
+    buf = BytesIO()
+    if fmt == "JPEG":
+        pil_img.convert("RGB").save(buf, format="JPEG", quality=quality, optimize=False)
+    elif fmt == "WEBP":
+        pil_img.save(buf, format="WEBP", quality=quality, method=4)
+    else:
+        pil_img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def encode_reference(
+    image,
+    index: int,
+    aspect_ratio: str = "1:1",
+    resize: str = "Original",
+    fmt: str = "PNG",
+    quality: int = DEFAULT_QUALITY,
+) -> EncodedImage:
+    """Encode frame ``index`` of an IMAGE tensor for upload, reusing prior work."""
+    from PIL import Image  # type: ignore
+
+    fmt = fmt if fmt in _MIME_TYPES else "PNG"
+    key = (
+        tensor_digest(image[index]),
+        aspect_ratio if resize == "Match Output Size" else None,
+        fmt,
+        quality if fmt != "PNG" else None,
+    )
+    with _lock:
+        cached = _encoded.get(key)
+        if cached is not None:
+            _encoded.move_to_end(key)
+    if cached is not None:
+        print(f"Reference image: reusing encoded {cached.size[0]}x{cached.size[1]} {fmt}, "
+              f"{len(cached.data) / 1024:.0f} KiB")
+        return cached
+
+    pil_img = tensor_to_pil(image, index)
+    original = pil_img.size
+    if resize == "Match Output Size":
+        limit = _max_side(aspect_ratio)
+        if max(original) > limit:
+            scale = limit / max(original)
+            target = (max(1, round(original[0] * scale)), max(1, round(original[1] * scale)))
+            pil_img = pil_img.resize(target, Image.LANCZOS)
+
+    encoded = EncodedImage(
+        data=_encode(pil_img, fmt, quality),
+        mime_type=_MIME_TYPES[fmt],
+        size=pil_img.size,
+        raw_bytes=original[0] * original[1] * len(pil_img.getbands()),
+    )
+    print(f"Reference image: {original[0]}x{original[1]} -> {encoded.size[0]}x{encoded.size[1]} {fmt}, "
+          f"{encoded.raw_bytes / 1024:.0f} KiB raw -> {len(encoded.data) / 1024:.0f} KiB sent")
+    _remember(key, encoded)
+    return encoded
+
+
+def encode_references(
+    images,
+    aspect_ratio: str = "1:1",
+    resize: str = "Original",
+    fmt: str = "PNG",
+    quality: int = DEFAULT_QUALITY,
+    workers: int = 4,
+) -> list[EncodedImage]:
+    """Encode every frame of an IMAGE batch concurrently, in batch order."""
+    if images is None:
+        return []
+    count = int(images.shape[0])
+    if count == 1:
+        return [encode_reference(images, 0, aspect_ratio, resize, fmt, quality)]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, count)), thread_name_prefix="gemini-encode") as pool:
+        return list(pool.map(
+            lambda i: encode_reference(images, i, aspect_ratio, resize, fmt, quality),
+            range(count),
+        ))
+
+
+def to_part(encoded: EncodedImage):
+    """Wrap an encoded payload as a google-genai ``Part``."""
+    from google.genai import types  # type: ignore
+
+    return types.Part.from_bytes(data=encoded.data, mime_type=encoded.mime_type)
@@ -2,12 +2,21 @@
 // - Masks the api_key input as a password field
 // - Adds small UX niceties
 
+const MASKED_NODES = [
+  "Gemini Image Generator (Custom API)",
+  "Gemini Chat Session (Custom API)",
+  "Gemini Bulk Generator (Custom API)",
+  "Gemini Prompt Sweep (Custom API)",
+  "Gemini Batch Submit (Custom API)",
+  "Gemini Batch Collect (Custom API)",
+];
+
 app.registerExtension({
   name: "GeminiCustomAPI.MaskKey",
   async nodeCreated(node) {
     try {
       if (!node || !node.widgets || !node.title) return;
-      if (!String(node.title).includes("Gemini Image Generator (Custom API)")) return;
+      if (!MASKED_NODES.some((name) => String(node.title).includes(name))) return;
       const w = node.widgets.find((w) => w && w.name === "api_key");
       if (w && w.inputEl) {
         w.inputEl.type = "password";
@@ -19,7 +28,7 @@ app.registerExtension({
   },
   async beforeRegisterNodeDef(nodeType, nodeData, app) {
     try {
-      if (!nodeData || nodeData.name !== "Gemini Image Generator (Custom API)") return;
+      if (!nodeData || !MASKED_NODES.includes(nodeData.name)) return;
       const onCreated = nodeType.prototype.onNodeCreated;
       nodeType.prototype.onNodeCreated = function () {
         const r = onCreated ? onCreated.apply(this, arguments) : undefined;